@@ -1,5 +1,7 @@
 from CrystalMatch.dls_util.config.config import Config
-from CrystalMatch.dls_util.config.item import IntConfigItem
+from CrystalMatch.dls_focusstack.focus.fusion_mode import FusionMode
+from CrystalMatch.dls_util.config.item import IntConfigItem, EnumConfigItem, RangeFloatConfigItem, \
+    RangeIntConfigItem
 
 
 class FocusConfig(Config):
@@ -12,5 +14,26 @@ class FocusConfig(Config):
         self.blur_radius = add(IntConfigItem, "Laplacian Blur Radius", default=5, extra_arg='px')
         self.pyramid_min_size = add(IntConfigItem, "Pyramid Minimum Size", default=32, extra_arg='px') #defalt =32
         self.number_to_stack = add(IntConfigItem, "Number of images to stack", default=12)
+        self.fusion_mode = add(EnumConfigItem, "Pyramid Fusion Buffer", default=FusionMode.SHARED_MEMORY,
+                               extra_arg=FusionMode.LIST_ALL)
+        self.fusion_mode.set_comment("How the laplacians of each pyramid level are passed to the worker processes "
+                                     "which fuse them. 'Shared Memory' keeps them in one memory mapped buffer, "
+                                     "'Pickle' sends each process its own copy.")
+        self.fft_downsample = add(RangeIntConfigItem, "FFT Downsample Factor", default=1, extra_arg=[1, 8])
+        self.fft_downsample.set_comment("The images are shrunk by this factor to score their sharpness, only the "
+                                        "images which are stacked are read at full resolution. 2, 4 and 8 are "
+                                        "fastest for jpeg images.")
+        self.worker_processes = add(IntConfigItem, "Worker Processes", default=0)
+        self.worker_processes.set_comment("Number of processes shared by the fft and pyramid fusion stages. "
+                                          "0 starts one per cpu, 1 runs every stage in the main process.")
+        self.stream_poll_interval = add(RangeFloatConfigItem, "Stream Poll Interval (s)", default=0.05,
+                                        extra_arg=[0.001, None])
+        self.stream_settle_time = add(RangeFloatConfigItem, "Stream Settle Time (s)", default=0.2,
+                                      extra_arg=[0.0, None])
+        self.stream_settle_time.set_comment("When the stack is streamed an image is processed once its file has "
+                                            "not changed for this time.")
+        self.stream_timeout = add(RangeFloatConfigItem, "Stream Timeout (s)", default=10.0, extra_arg=[0.0, None])
+        self.stream_timeout.set_comment("A streamed stack is finished when the stack directory has not changed for "
+                                        "this time (or sooner if the number of images is given).")
 
         self.initialize_from_file()
@@ -12,31 +12,63 @@ from os.path import join, abspath
 
 from CrystalMatch.dls_focusstack.focus.pyramid_manager import PyramidManager
 from CrystalMatch.dls_focusstack.focus.sharpness_detector import SharpnessDetector
+from CrystalMatch.dls_focusstack.focus.stack_watcher import StackWatcher
+from CrystalMatch.dls_focusstack.focus.worker_pool import WorkerPool
 
 
 class FocusStack:
     CONFIG_FILE_NAME = "focus_stack.ini"
 
-    def __init__(self, images, config_dir):
+    def __init__(self, images, config_dir, pool=None):
+        """:param pool: WorkerPool shared by all the stages of the stack. If not given a pool with the number of
+        processes set in the config is started for the stack and stopped when it finishes."""
         self._image_file_list = images
         self._config = FocusConfig(abspath(join(abspath(config_dir), self.CONFIG_FILE_NAME)))
+        self._pool = pool
+        self._watcher = None
         self.fft_images = None
 
+    def stream_from(self, directory, expected_count=None, timeout=None):
+        """Take the images from a stack directory which may still be being written to, instead of the image list.
+        The fft of each image is calculated as soon as its file is complete.
+        :param expected_count: number of images in the stack, if known - otherwise the stack is only finished after
+        the directory has not changed for the timeout
+        :param timeout: time (in seconds) without any change after which the stack is finished, the stream timeout
+        of the config if None"""
+        cfg = self._config
+        if timeout is None:
+            timeout = cfg.stream_timeout.value()
+        self._watcher = StackWatcher(directory, expected_count, cfg.stream_poll_interval.value(),
+                                     cfg.stream_settle_time.value(), timeout)
+
 
     def composite(self):
+        if self._pool is None:
+            with WorkerPool(self._config.worker_processes.value()) as pool:
+                return self._composite(pool)
+        return self._composite(self._pool)
+
+    def _composite(self, pool):
         log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
         log.addFilter(logconfig.ThreadContextFilter())
         extra = self._config.all_to_json()
         log = logging.LoggerAdapter(log, extra)
-        log.info("Focusstack Started, first image, " + self._image_file_list[0].name)
+        if self._watcher is None:
+            log.info("Focusstack Started, first image, " + self._image_file_list[0].name)
+        else:
+            log.info("Focusstack Started, streaming from, " + self._watcher.directory())
         log.debug(extra)
 
         start_t = time.time()
+        pool.reset_stage_times()
 
         t1 = time.time()
-        man = ImageFFTManager(self._image_file_list)
-        man.read_ftt_images()
-        sd = SharpnessDetector(man.get_fft_images(), self._config)
+        man = ImageFFTManager(self._image_file_list, self._config.fft_downsample.value())
+        if self._watcher is None:
+            man.read_ftt_images(pool)
+        else:
+            man.stream_ftt_images(self._watcher, pool)
+        sd = SharpnessDetector(man.get_fft_images(), self._config, pool)
 
         images = sd.images_to_stack()
         self.fft_images = sd.get_fft_images_to_stack()
@@ -54,13 +86,14 @@ class FocusStack:
         #aligned_images, gray_images = self.align(images)
 
         #stacked_image = pyramid(aligned_images, self._config).get_pyramid_fusion()
-        stacked_image = PyramidManager(images, self._config).get_pyramid_fusion()
+        stacked_image = PyramidManager(images, self._config, pool).get_pyramid_fusion()
 
         stacked_image  = cv2.convertScaleAbs(stacked_image)
         backtorgb = cv2.cvtColor(stacked_image, cv2.COLOR_GRAY2RGB)
 
         calculation_time = time.time() - start_t
-        extra = {'stack_time': calculation_time}
+        extra = {'stack_time': calculation_time, 'worker_processes': pool.workers()}
+        extra.update((stage + '_time', t) for stage, t in pool.stage_times().items())
         log = logging.LoggerAdapter(log, extra)
         log.info("Stacking Finished")
         log.debug(extra)
@@ -1,12 +1,94 @@
+import threading
+from collections import OrderedDict
 
 import cv2
 import numpy as np
 
+
+class BandpassMaskCache:
+    """Least recently used cache of the band-pass masks used by Fourier, keyed by the shape of the fft.
+    All the slices of a stack (and all the regions cropped around a point) have the same shape, so the mask only
+    has to be built once for each of them. Masks are evicted when the cache holds more than max_bytes.
+    :param max_bytes: memory limit of the cache"""
+
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self._max_bytes = max_bytes
+        self._masks = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, shape):
+        """The band-pass mask of an fft of the given (height, width) - built and cached if it is not held."""
+        with self._lock:
+            mask = self._masks.pop(shape, None)
+            if mask is not None:
+                self._hits += 1
+                self._masks[shape] = mask
+                return mask
+            self._misses += 1
+
+        mask = bandpass_mask(*shape)
+        mask.flags.writeable = False
+        with self._lock:
+            if shape not in self._masks and mask.nbytes <= self._max_bytes:
+                self._masks[shape] = mask
+                self._bytes += mask.nbytes
+                while self._bytes > self._max_bytes:
+                    _, evicted = self._masks.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+        return mask
+
+    def hits(self):
+        return self._hits
+
+    def misses(self):
+        return self._misses
+
+    def size(self):
+        """Memory (in bytes) used by the cached masks."""
+        return self._bytes
+
+    def clear(self):
+        with self._lock:
+            self._masks = OrderedDict()
+            self._bytes = 0
+            self._hits = 0
+            self._misses = 0
+
+
+def bandpass_mask(h, w):
+    """Boolean mask of the frequencies counted by Fourier.fourier_bandpass for an rfft2 of shape (h, w)."""
+    l = int(min(h/2, w)) # rfft2 returns half the width of fft2
+    min_l = 0.2 * l
+    max_l = 0.6 * l
+
+    def filter_indices(x, y, max_x, max_y):
+        x2, y2 = x*x, y*y
+        return (x > 0.05 * max_x) \
+                & (y > 0.05 * max_y) \
+                & (min_l * min_l < x2 + y2) \
+                & (x2 + y2 < max_l * max_l)
+
+    # count values in a band around the "origin"
+    # positive offsets start at [0, 0], negative at [h, 0] and go backwards
+    indices = np.fromfunction(lambda y, x: filter_indices(y, x, h/2., w), (h, w))
+    indices |= np.fromfunction(lambda y, x: filter_indices(h - y, x, h/2., w), (h, w))
+    return indices
+
+
 class Fourier:
     """
     Initialise a new fourier object.
     :param input_array: input for the fourier transform calculation
     """
+    MASK_CACHE = BandpassMaskCache()
+    # limit on the size of the padded arrays transformed together by fourier_bandpass_batch (16 MB of float64)
+    MAX_BATCH_ELEMENTS = 2 * 1024 * 1024
+
     def __init__(self, input_array):
         self.array = input_array
 
@@ -25,20 +107,28 @@ class Fourier:
         data_fft = np.fft.rfft2(nimg)
         fft_abs = np.abs(data_fft)
 
-        h, w = fft_abs.shape
-        l = int(min(h/2, w)) # rfft2 returns half the width of fft2
-        min_l = 0.2 * l
-        max_l = 0.6 * l
-
-        def filter_indices(x, y, max_x, max_y):
-            x2, y2 = x*x, y*y
-            return (x > 0.05 * max_x) \
-                    & (y > 0.05 * max_y) \
-                    & (min_l * min_l < x2 + y2) \
-                    & (x2 + y2 < max_l * max_l)
-
-        # count values in a band around the "origin"
-        # positive offsets start at [0, 0], negative at [h, 0] and go backwards
-        indices = np.fromfunction(lambda y, x: filter_indices(y, x, h/2., w), (h, w))
-        indices |= np.fromfunction(lambda y, x: filter_indices(h - y, x, h/2., w), (h, w))
+        indices = self.MASK_CACHE.get(fft_abs.shape)
         return np.sum(fft_abs[indices])
+
+    @staticmethod
+    def fourier_bandpass_batch(arrays):
+        """Same as fourier_bandpass for a stack of arrays of the same shape. The arrays are transformed together by
+        batched rfft2 calls and share one band-pass mask.
+        :param arrays: array of shape (n, rows, cols)
+        :return: array of the n band-pass sums"""
+        n, rows, cols = arrays.shape
+        nrows = cv2.getOptimalDFTSize(rows)
+        ncols = cv2.getOptimalDFTSize(cols)
+        batch_size = max(1, Fourier.MAX_BATCH_ELEMENTS // max(nrows * ncols, 1))
+
+        sums = np.zeros(n, dtype=np.float64)
+        for start in range(0, n, batch_size):
+            batch = arrays[start:start + batch_size]
+            nimg = np.zeros((len(batch), nrows, ncols))
+            nimg[:, :rows, :cols] = batch
+
+            fft_abs = np.abs(np.fft.rfft2(nimg))
+            indices = Fourier.MASK_CACHE.get(fft_abs.shape[1:])
+            # one sum per row - np.sum(axis=1) rounds differently from the 1D sums of fourier_bandpass
+            sums[start:start + len(batch)] = [np.sum(row) for row in fft_abs[:, indices]]
+        return sums
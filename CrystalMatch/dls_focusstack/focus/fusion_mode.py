@@ -0,0 +1,10 @@
+class FusionMode:
+    """ How the laplacians of each pyramid level are passed to the worker processes which fuse them (see
+    PyramidCollection.fuse()). """
+    def __init__(self):
+        pass
+
+    SHARED_MEMORY = "Shared Memory"
+    PICKLE = "Pickle"
+
+    LIST_ALL = [SHARED_MEMORY, PICKLE]
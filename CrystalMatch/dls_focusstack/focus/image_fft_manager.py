@@ -1,22 +1,22 @@
 import logging
-from multiprocessing import Pool
-
-import cv2
-import numpy as np
+from os.path import basename
 
 from CrystalMatch.dls_focusstack.focus.fourier import Fourier
 from CrystalMatch.dls_imagematch import logconfig
-from CrystalMatch.dls_focusstack.focus.imagefft import ImageFFT
+from CrystalMatch.dls_focusstack.focus.imagefft import ImageFFT, read_gray_image
+from CrystalMatch.dls_focusstack.focus.stack_watcher import image_number_key
+from CrystalMatch.dls_focusstack.focus.worker_pool import WorkerPool
 
 
 def fft(param):
-    "Function that reads an image of a given name and  starts fft calculation."
-    #read as soon as it appears
+    """Function that reads an image of a given name and  starts fft calculation.
+    Only the score is sent back - the image is not kept, it is read again at full resolution if it is stacked.
+    The image can be shrunk by an optional downsample factor (the third parameter) to speed up the calculation."""
     name = param[0]
     count = param[1]
-    img_color = cv2.imread(name)
-    img = cv2.cvtColor(img_color.astype(np.float32), cv2.COLOR_BGR2GRAY)
-    image_fft = ImageFFT(img, count, name)
+    downsample = param[2] if len(param) > 2 else 1
+    img = read_gray_image(name, downsample)
+    image_fft = ImageFFT(None, count, name)
     level= Fourier(img).runFFT()
     image_fft.setFFT(level)
     log = logging.getLogger(".".join([__name__]))
@@ -30,27 +30,65 @@ def fft(param):
 
 class ImageFFTManager:
     """Class which manages fft calculations."""
-    def __init__(self, name_list):
+    STAGE_FFT = "fft"
+    STAGE_READ = "read"
+
+    def __init__(self, name_list, downsample=1):
+        """:param downsample: factor the images are shrunk by for the fft calculation"""
         self._image_file_list = name_list
+        self._downsample = downsample
         self.fft_images = []
 
-    def read_ftt_images(self):
+    def read_ftt_images(self, pool=None):
         """Function which starts fft calculation for each input image name.
         Multiprocessing is used to speed up the calculation.
-        One process for one input image name."""
+        The images are shared between the processes of the pool.
+        :param pool: WorkerPool to run the calculation in, a temporary one is used if not given"""
+        if pool is None:
+            with WorkerPool() as pool:
+                return self.read_ftt_images(pool)
+
         log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
         log.addFilter(logconfig.ThreadContextFilter())
         parameters = []
         for idx, file_obj in enumerate(self._image_file_list):
             #first image has index 0 
-            param = (file_obj.name, idx)
+            param = (file_obj.name, idx, self._downsample)
             parameters.append(param)
 
-        pool = Pool()
-        results = pool.map_async(fft, parameters)
-        self.fft_images = results.get()
-        pool.close()
-        pool.join()
+        self.fft_images = pool.map(fft, parameters, self.STAGE_FFT)
+
+    def stream_ftt_images(self, watcher, pool=None):
+        """Same as read_ftt_images() but the images are taken from a StackWatcher: the fft of each image is
+        calculated as soon as it has been written, while the rest of the stack is still being acquired.
+        :param watcher: StackWatcher of the stack directory
+        :param pool: WorkerPool to run the calculation in, a temporary one is used if not given"""
+        if pool is None:
+            with WorkerPool() as pool:
+                return self.stream_ftt_images(watcher, pool)
+
+        log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
+        log.addFilter(logconfig.ThreadContextFilter())
+        parameters = ((name, idx, self._downsample) for idx, name in enumerate(watcher.files()))
+        fft_images = pool.map_stream(fft, parameters, self.STAGE_FFT)
+        if len(fft_images) == 0:
+            raise IOError("No images were written to " + watcher.directory())
+
+        # images can be completed out of order - number them by their position in the stack
+        fft_images.sort(key=lambda image_fft: image_number_key(basename(image_fft.get_image_name())))
+        for idx, image_fft in enumerate(fft_images):
+            image_fft.set_image_number(idx)
+        log.info("Calculated fft for " + str(len(fft_images)) + " streamed images")
+        self.fft_images = fft_images
+
+    @staticmethod
+    def read_images(fft_images, pool):
+        """Read the full resolution image of each of the fft images which does not hold it yet.
+        :param pool: WorkerPool the images are read in"""
+        to_read = [image_fft for image_fft in fft_images if not image_fft.has_image()]
+        images = pool.map(read_gray_image, [image_fft.get_image_name() for image_fft in to_read], ImageFFTManager.STAGE_READ)
+        for image_fft, img in zip(to_read, images):
+            image_fft.set_image(img)
 
     def get_fft_images(self):
         return self.fft_images
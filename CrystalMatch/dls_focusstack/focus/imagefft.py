@@ -1,8 +1,29 @@
 
+import cv2
+import numpy as np
+
+# decoders which can skip pixels (e.g. jpeg) are much faster with these than reading and resizing the image
+READ_REDUCED_FLAGS = dict((factor, getattr(cv2, "IMREAD_REDUCED_COLOR_" + str(factor)))
+                          for factor in [2, 4, 8] if hasattr(cv2, "IMREAD_REDUCED_COLOR_" + str(factor)))
+
+
+def read_gray_image(name, downsample=1):
+    """Read an image file as a float32 grayscale array.
+    :param downsample: integer factor to shrink the image by - 2, 4 and 8 are decoded at the reduced size"""
+    if downsample in READ_REDUCED_FLAGS:
+        img_color = cv2.imread(name, READ_REDUCED_FLAGS[downsample])
+    else:
+        img_color = cv2.imread(name)
+        if downsample > 1 and img_color is not None:
+            img_color = cv2.resize(img_color, None, fx=1.0 / downsample, fy=1.0 / downsample,
+                                   interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(img_color.astype(np.float32), cv2.COLOR_BGR2GRAY)
+
+
 class ImageFFT:
     """Class which holds the image, mean_fft_value and image index in a sequence of images.
      Mean value of the image FFT is held in the fft_level parameter.
-     :param input_img: an image array
+     :param input_img: an image array, or None to read it from the file the first time it is needed
      :param number: index of th image in the list of images passed
      :param name: names of the file - an absolute path"""
 
@@ -19,8 +40,20 @@ class ImageFFT:
         return self.fft_level
 
     def get_image(self):
+        if self.img is None:
+            self.img = read_gray_image(self.name)
         return self.img
 
+    def has_image(self):
+        """True if the image is held in memory, False if it will be read from the file."""
+        return self.img is not None
+
+    def set_image(self, img):
+        self.img = img
+
+    def set_image_number(self, number):
+        self.image_number = number
+
     def get_image_number(self):
         #first image has index 0
         return self.image_number
@@ -0,0 +1,75 @@
+import os
+import tempfile
+from os.path import isdir
+
+import numpy as np
+
+
+class LaplacianBuffer:
+    """Memory mapped buffer which holds the laplacians of all the layers for a number of pyramid levels, and space
+    for the fused result of each level. The buffer is backed by a file in shared memory (/dev/shm) when available,
+    so worker processes can map it and only need to be sent a small descriptor of the level they fuse instead of
+    a pickled copy of the laplacians.
+    :param layers: number of layers (images) in the pyramid collection
+    :param level_shapes: list of (level_number, (height, width)) pairs"""
+
+    DTYPE = np.float64
+    SHARED_MEMORY_DIR = "/dev/shm"
+
+    def __init__(self, layers, level_shapes):
+        self._descriptors = {}
+
+        item_size = np.dtype(self.DTYPE).itemsize
+        offset = 0
+        for level, shape in level_shapes:
+            height, width = shape[:2]
+            fused_offset = offset + layers * height * width * item_size
+            self._descriptors[level] = (offset, fused_offset, layers, height, width)
+            offset = fused_offset + height * width * item_size
+
+        directory = self.SHARED_MEMORY_DIR if isdir(self.SHARED_MEMORY_DIR) else None
+        handle, self._path = tempfile.mkstemp(prefix="laplacians_", suffix=".dat", dir=directory)
+        os.close(handle)
+        self._size = offset
+        self._map = np.memmap(self._path, dtype=np.uint8, mode='w+', shape=(max(offset, 1),))
+
+    def size(self):
+        """Size of the buffer in bytes."""
+        return self._size
+
+    def laplacians(self, level):
+        """Array of shape (layers, height, width) which holds the laplacians of the level."""
+        laplacian_offset, _, layers, height, width = self._descriptors[level]
+        return self._view(laplacian_offset, (layers, height, width))
+
+    def fused(self, level):
+        """Array of shape (height, width) which holds the fused laplacian of the level."""
+        _, fused_offset, _, height, width = self._descriptors[level]
+        return self._view(fused_offset, (height, width))
+
+    def descriptor(self, level):
+        """Picklable description of where a level is held in the buffer - used by open_level() in a worker."""
+        return (self._path,) + self._descriptors[level]
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        """Release the buffer and remove its backing file."""
+        del self._map
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+    def _view(self, offset, shape):
+        count = int(np.prod(shape)) * np.dtype(self.DTYPE).itemsize
+        return self._map[offset:offset + count].view(self.DTYPE).reshape(shape)
+
+    @staticmethod
+    def open_level(descriptor):
+        """Map one level of a buffer created in another process.
+        :return: the laplacians of the level (read only) and the array to write the fused laplacian to"""
+        path, laplacian_offset, fused_offset, layers, height, width = descriptor
+        dtype = LaplacianBuffer.DTYPE
+        laplacians = np.memmap(path, dtype=dtype, mode='r', offset=laplacian_offset, shape=(layers, height, width))
+        fused = np.memmap(path, dtype=dtype, mode='r+', offset=fused_offset, shape=(height, width))
+        return laplacians, fused
@@ -1,5 +1,11 @@
+from collections import OrderedDict
+
+import numpy as np
+
 from CrystalMatch.dls_focusstack.focus.fourier import Fourier
 from CrystalMatch.dls_focusstack.focus.pointfft import PointFFT
+from CrystalMatch.dls_util.imaging import Window
+
 
 class PointFFTManager:
     """
@@ -26,3 +32,29 @@ class PointFFTManager:
                 fftpois.append(pointfft)
             max_poi =  max(fftpois, key=lambda fftpoint: fftpoint.getFFT())
             return max_poi.get_image_number()
+
+    @staticmethod
+    def find_z_levels_for_points(fftimages, points, z_level_region_size):
+        """Same as find_z_level_for_point for a list of points, but the regions of all the points in all the images
+        are cropped into one array and their ffts are calculated in a batch.
+        Points whose regions are cut by the edge of the image have smaller regions - they are batched separately.
+        :return: list of z levels (image numbers) in the same order as the points"""
+        if fftimages is None:
+            return [None] * len(points)
+
+        images = [image.get_image() for image in fftimages]
+        numbers = [image.get_image_number() for image in fftimages]
+
+        windows_by_shape = OrderedDict()
+        for index, point in enumerate(points):
+            window = Window.from_center(images[0], point, z_level_region_size, z_level_region_size)
+            windows_by_shape.setdefault(window.shape(), []).append((index, window))
+
+        z_levels = [None] * len(points)
+        for shape, windows in windows_by_shape.items():
+            squares = np.concatenate([window.stack(images) for _, window in windows])
+            levels = Fourier.fourier_bandpass_batch(squares)
+            best = np.argmax(levels.reshape((len(windows), len(images))), axis=1)
+            for (index, _), image_index in zip(windows, best):
+                z_levels[index] = numbers[image_index]
+        return z_levels
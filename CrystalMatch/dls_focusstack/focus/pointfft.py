@@ -1,6 +1,5 @@
 
-from CrystalMatch.dls_util.imaging import Image
-from CrystalMatch.dls_util.shape import Rectangle
+from CrystalMatch.dls_util.imaging import Window
 
 
 class PointFFT:
@@ -26,9 +25,7 @@ class PointFFT:
         self.fft_level = level
 
     def crop_region_from_image(self):
-        region = Rectangle.from_center(self.point, self.region_size, self.region_size)
-        img = Image(self.img).crop(region)
-        return img.raw()
+        return Window.from_center(self.img, self.point, self.region_size, self.region_size).view()
 
     def set_image_number(self, num):
         self.image_number = num
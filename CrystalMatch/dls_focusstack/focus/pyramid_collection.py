@@ -1,13 +1,15 @@
 """This is code taken from https://github.com/sjawhar/focus-stacking
 which implements the methods described in http://www.ece.drexel.edu/courses/ECE-C662/notes/LaplacianPyramid/laplacian2011.pdf"""
-from multiprocessing import Queue, Process, Pool
 
 import numpy as np
 
 import logging
 
+from CrystalMatch.dls_focusstack.focus.fusion_mode import FusionMode
+from CrystalMatch.dls_focusstack.focus.laplacian_buffer import LaplacianBuffer
 from CrystalMatch.dls_focusstack.focus.pyramid import Pyramid
 from CrystalMatch.dls_focusstack.focus.pyramid_level import PyramidLevel
+from CrystalMatch.dls_focusstack.focus.worker_pool import WorkerPool
 from CrystalMatch.dls_imagematch import logconfig
 
 
@@ -33,6 +35,33 @@ def fused_laplacian(parameters):
     region_kernel = parameters[1]
     level = parameters[2]
 
+    fused = _fuse_laplacians(laplacians, region_kernel, level)
+
+    log = logging.getLogger(".".join([__name__]))
+    log.addFilter(logconfig.ThreadContextFilter())
+    log.debug("Level: " + str(level) + " fused!")
+
+    fused_level = PyramidLevel(fused,0,level)
+    return fused_level
+
+def fused_laplacian_from_buffer(parameters):
+    """Same as fused_laplacian but the laplacians are read from, and the result is written to, a LaplacianBuffer.
+    Only the buffer descriptor of the level is passed to and from the worker process."""
+    descriptor = parameters[0]
+    region_kernel = parameters[1]
+    level = parameters[2]
+
+    laplacians, fused = LaplacianBuffer.open_level(descriptor)
+    fused[:] = _fuse_laplacians(np.asarray(laplacians), region_kernel, level)
+    fused.flush()
+
+    log = logging.getLogger(".".join([__name__]))
+    log.addFilter(logconfig.ThreadContextFilter())
+    log.debug("Level: " + str(level) + " fused!")
+    return level
+
+def _fuse_laplacians(laplacians, region_kernel, level):
+    """For each pixel keep the laplacian of the layer with the highest region energy."""
     layers = laplacians.shape[0]
     region_energies = np.zeros(laplacians.shape[:3], dtype=np.float64)
 
@@ -46,15 +75,13 @@ def fused_laplacian(parameters):
     for layer in range(layers):
         fused += np.where(best_re[:, :] == layer, laplacians[layer], 0)
 
-    log = logging.getLogger(".".join([__name__]))
-    log.addFilter(logconfig.ThreadContextFilter())
-    log.debug("Level: " + str(level) + " fused!")
-
-    fused_level = PyramidLevel(fused,0,level)
-    return fused_level
+    return fused
 
 class PyramidCollection:
     """Pyramid collection: collection of pyramids."""
+    STAGE_BASE_FUSION = "base_fusion"
+    STAGE_LEVEL_FUSION = "level_fusion"
+
     def __init__(self):
         self.collection = []
 
@@ -72,18 +99,36 @@ class PyramidCollection:
         kernel = np.array([0.25 - a / 2.0, 0.25, a, 0.25, 0.25 - a / 2.0])
         return np.outer(kernel, kernel)
 
-    def fuse(self, kernel_size):
+    def fuse(self, kernel_size, fusion_mode=FusionMode.SHARED_MEMORY, pool=None):
         """Function which fuses each level of the pyramid using appropriate fusion operators
-        the output is one pyramid containing fused levels"""
+        the output is one pyramid containing fused levels.
+        :param fusion_mode: FusionMode.SHARED_MEMORY to pass the laplacians to the worker processes in a shared
+        LaplacianBuffer or FusionMode.PICKLE to send each process a pickled copy
+        :param pool: WorkerPool to run the fusion in, a temporary one is used if not given"""
+        if pool is None:
+            with WorkerPool() as pool:
+                return self.fuse(kernel_size, fusion_mode, pool)
+
         log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
         log.addFilter(logconfig.ThreadContextFilter())
 
-        base_level_fused = self.get_fused_base(kernel_size)
+        base_level_fused = self.get_fused_base(kernel_size, pool)
         depth = self.collection[0].get_depth()
         fused = Pyramid(0,depth)
         fused.add_lower_resolution_level(base_level_fused)
-        layers = len(self.collection)
         region_kernel = self.get_region_kernel()
+        if fusion_mode == FusionMode.PICKLE:
+            bunch = self._fuse_levels_pickled(depth, region_kernel, pool)
+        else:
+            bunch = self._fuse_levels_shared(depth, region_kernel, pool)
+
+        fused.add_bunch_of_levels(bunch)
+
+        fused.sort_levels()
+        return fused
+
+    def _fuse_levels_pickled(self, depth, region_kernel, pool):
+        layers = len(self.collection)
         parameters = []
         for level in range(depth - 2, -1, -1):
             sh = self.collection[0].get_level(level).get_array().shape
@@ -93,19 +138,36 @@ class PyramidCollection:
                 laplacians[layer] = new_level
             param = (laplacians, region_kernel,level)
             parameters.append(param)
-        pool = Pool()
-        results = pool.map_async(fused_laplacian, parameters)
-        bunch = results.get()
-        pool.close()
-        pool.join()
-
-        fused.add_bunch_of_levels(bunch)
+        return pool.map(fused_laplacian, parameters, self.STAGE_LEVEL_FUSION)
 
-        fused.sort_levels()
-        return fused
-
-    def get_fused_base(self, kernel_size):
-        """Fuses the base of the pyramid - the one with the lowest resolution."""
+    def _fuse_levels_shared(self, depth, region_kernel, pool):
+        layers = len(self.collection)
+        levels = list(range(depth - 2, -1, -1))
+        shapes = [(level, self.collection[0].get_level(level).get_array().shape) for level in levels]
+        laplacian_buffer = LaplacianBuffer(layers, shapes)
+        try:
+            parameters = []
+            for level in levels:
+                laplacians = laplacian_buffer.laplacians(level)
+                for layer in range(0, layers):
+                    laplacians[layer] = self.collection[layer].get_level(level).get_array()
+                param = (laplacian_buffer.descriptor(level), region_kernel, level)
+                parameters.append(param)
+            laplacian_buffer.flush()
+
+            pool.map(fused_laplacian_from_buffer, parameters, self.STAGE_LEVEL_FUSION)
+
+            bunch = [PyramidLevel(np.array(laplacian_buffer.fused(level)), 0, level) for level in levels]
+        finally:
+            laplacian_buffer.close()
+        return bunch
+
+    def get_fused_base(self, kernel_size, pool=None):
+        """Fuses the base of the pyramid - the one with the lowest resolution.
+        :param pool: WorkerPool to run the fusion in, a temporary one is used if not given"""
+        if pool is None:
+            with WorkerPool() as pool:
+                return self.get_fused_base(kernel_size, pool)
 
         layers = len(self.collection)
         sh = self.collection[0].get_top_level().get_array().shape
@@ -120,11 +182,7 @@ class PyramidCollection:
             layer = PyramidLevel(top_pyramid_level.get_array(), layer, top_level_number)
             param = (layer, kernel_size)
             parameters.append(param)
-        pool = Pool()
-        results = pool.map_async(entropy_diviation, parameters)
-        result_layers = results.get()
-        pool.close()
-        pool.join()
+        result_layers = pool.map(entropy_diviation, parameters, self.STAGE_BASE_FUSION)
         for l in result_layers:
             entropies[l.get_layer_number()] = l.get_entropies()
             deviations[l.get_layer_number()] = l.get_deviations()
@@ -2,6 +2,8 @@ import cv2
 import numpy as np
 from scipy import ndimage
 
+from CrystalMatch.dls_focusstack.focus.sliding_window import window_entropy, window_deviation
+
 class PyramidLevel:
     """Pyramid layer - part of a pyramid of a particular level and layer.
     Operators used in the laplacian pyramid fusion process(flattening pyramid along layers)
@@ -42,16 +44,10 @@ class PyramidLevel:
         return -1. * (levels * np.log(probabilities[levels])).sum()
 
     def entropy(self, kernel_size):
-        """Entropy operator used during laplacian pyramid fusion on the base level."""
+        """Entropy operator used during laplacian pyramid fusion on the base level.
+        Gives the value of _area_entropy for the padded area around each pixel, calculated for all pixels at once."""
         probabilities = self.get_probabilities()
-        entropies = np.zeros(self.array.shape[:2], dtype=np.float64)
-        pad_amount, padded_image, offset = self.padding(kernel_size)
-        for row in range(entropies.shape[0]):
-            for column in range(entropies.shape[1]):
-                area = padded_image[row + pad_amount + offset[:, np.newaxis], column + pad_amount + offset]
-                entropies[row, column] = self._area_entropy(area, probabilities)
-
-        self.entropies = entropies
+        self.entropies = window_entropy(self.array, kernel_size, probabilities)
 
     def get_entropies(self):
         return self.entropies
@@ -62,15 +58,9 @@ class PyramidLevel:
         return np.square(area - average).sum() / area.size
 
     def deviation(self, kernel_size):
-        """Deviation operator used during laplacian pyramid fusion on the base level."""
-        deviations = np.zeros(self.array.shape[:2], dtype=np.float64)
-        pad_amount, padded_image, offset = self.padding(kernel_size)
-        for row in range(deviations.shape[0]):
-            for column in range(deviations.shape[1]):
-                area = padded_image[row + pad_amount + offset[:, np.newaxis], column + pad_amount + offset]
-                deviations[row, column] = self._area_deviation(area)
-
-        self.deviations = deviations
+        """Deviation operator used during laplacian pyramid fusion on the base level.
+        Gives the value of _area_deviation for the padded area around each pixel, calculated for all pixels at once."""
+        self.deviations = window_deviation(self.array, kernel_size)
 
     def get_deviations(self):
         return self.deviations
@@ -13,9 +13,10 @@ from CrystalMatch.dls_focusstack.focus.pyramid_collection import PyramidCollecti
 class PyramidManager:
     """This is a pyramid manages class."""
 
-    def __init__(self, aligned_images, config):
+    def __init__(self, aligned_images, config, pool=None):
         self.images = aligned_images
         self.config = config
+        self.pool = pool
 
     def get_pyramid_fusion(self):
         """This is the function which maintains the steps of pyramid processing.
@@ -29,7 +30,7 @@ class PyramidManager:
         #create pyramid
         pyramid_collection = self.laplacian_pyramid(depth)
         #fuse pyramid
-        fusion = pyramid_collection.fuse(kernel_size)
+        fusion = pyramid_collection.fuse(kernel_size, cfg.fusion_mode.value(), self.pool)
         #collaps pyramid
         return fusion.collapse()
 
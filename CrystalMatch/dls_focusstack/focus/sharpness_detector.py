@@ -1,6 +1,7 @@
 import logging
 import math
 
+from CrystalMatch.dls_focusstack.focus.image_fft_manager import ImageFFTManager
 from CrystalMatch.dls_imagematch import logconfig
 
 
@@ -8,16 +9,19 @@ class SharpnessDetector(object):
     """Class which applies the result of image FFT calculation to find images which will be stacked.
     This is an initial filtering step used currently in the process."""
 
-    def __init__(self, img_fft, config):
+    def __init__(self, img_fft, config, pool=None):
+        """:param pool: WorkerPool to read the images to stack in, if not given they are read one by one"""
         self.fft_img = img_fft
         self.config = config
+        self.pool = pool
         self.fft_images_to_stack = []
 
     def images_to_stack(self):
         """Function which finds the maximum of mean FFT values provided.
         It uses the maximum value to pick a subset of images from an initial set.
         The subset is later used by the stacking algorithm (pyramid) to create the all-in-focus-image.
-        The number of images to stack is defined by IMG_TO_STACK"""
+        The number of images to stack is defined by IMG_TO_STACK.
+        Only the images in the range are read at full resolution."""
         log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
         log.addFilter(logconfig.ThreadContextFilter())
 
@@ -38,12 +42,13 @@ class SharpnessDetector(object):
         log.info("Stacking " + str(self.config.number_to_stack.value()) + " images " +
                  " First img: " + str(range[0]) + " last img: " + str(range[-1]))
 
-        images = []
         for s in self.fft_img:
             if s.get_image_number() in range:
                 self.fft_images_to_stack.append(s)
-                images.append(s.get_image())
-        return images
+        if self.pool is not None:
+            ImageFFTManager.read_images(self.fft_images_to_stack, self.pool)
+
+        return [s.get_image() for s in self.fft_images_to_stack]
 
     def get_fft_images_to_stack(self):
         return self.fft_images_to_stack
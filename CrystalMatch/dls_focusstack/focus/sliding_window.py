@@ -0,0 +1,34 @@
+import cv2
+import numpy as np
+
+# The same border as PyramidLevel.padding() - the window around an edge pixel is mirrored into the image.
+BORDER_TYPE = cv2.BORDER_REFLECT101
+
+
+def window_sum(array, kernel_size):
+    """Sum of every kernel_size x kernel_size window of the array (one value per pixel, window centred on it).
+    An un-normalized box filter keeps a running sum along rows and columns, so the cost does not
+    depend on the kernel size."""
+    return cv2.boxFilter(array.astype(np.float64), cv2.CV_64F, (kernel_size, kernel_size),
+                         normalize=False, borderType=BORDER_TYPE)
+
+
+def window_deviation(array, kernel_size):
+    """Mean squared deviation from the window average for every window of the array.
+    Calculated in one pass as E[x^2] - E[x]^2. The array is centred on its global mean first, which does not
+    change the deviation but keeps the two terms small and the subtraction accurate."""
+    area_size = float(kernel_size * kernel_size)
+    centred = array.astype(np.float64) - np.average(array)
+    mean = window_sum(centred, kernel_size) / area_size
+    mean_square = window_sum(np.square(centred), kernel_size) / area_size
+    return np.maximum(mean_square - np.square(mean), 0)
+
+
+def window_entropy(array, kernel_size, probabilities):
+    """Entropy operator for every window of the array. The entropy of an area is the sum of a value which
+    only depends on the grey level of each pixel, so it is calculated once per pixel and summed over
+    the windows. This needs no per-window histogram.
+    :param probabilities: probability of each of the 256 grey levels in the whole array"""
+    levels = array.astype(np.uint8)
+    pixel_entropy = levels * np.log(probabilities[levels])
+    return -1. * window_sum(pixel_entropy, kernel_size)
@@ -0,0 +1,82 @@
+import logging
+import time
+from os import listdir, stat
+from os.path import join, isdir
+
+from CrystalMatch.dls_imagematch import logconfig
+
+
+def image_number_key(file_name):
+    """Sort key which orders the images of a stack by the number in their file names."""
+    return int("".join(c for c in file_name if c.isdigit()))
+
+
+class StackWatcher:
+    """Watches the directory a z-stack is being written to and yields the path of each image as soon as the file
+    is complete, so the images can be processed while the rest of the stack is still being acquired.
+    A file is complete when its size and modification time have not changed for settle_time seconds.
+    :param directory: the stack directory - it does not have to exist yet
+    :param expected_count: number of images in the stack, if not known the stack is finished when no file has
+    changed for timeout seconds
+    :param poll_interval: time (in seconds) between two listings of the directory
+    :param settle_time: time (in seconds) a file has to stay unchanged to be complete
+    :param timeout: time (in seconds) without any change to the directory after which the watcher gives up"""
+
+    def __init__(self, directory, expected_count=None, poll_interval=0.05, settle_time=0.2, timeout=10.0):
+        self._directory = directory
+        self._expected_count = expected_count
+        self._poll_interval = poll_interval
+        self._settle_time = settle_time
+        self._timeout = timeout
+
+    def directory(self):
+        return self._directory
+
+    def files(self):
+        """Generator of the paths of the complete images. When several images are complete at the same time they
+        are yielded in the order of their numbers."""
+        log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
+        log.addFilter(logconfig.ThreadContextFilter())
+
+        changes = {}  # file name -> (size and modification time, time of the last change)
+        done = set()
+        last_activity = time.time()
+        while True:
+            now = time.time()
+            complete = []
+            for name in self._list_images():
+                if name in done:
+                    continue
+                try:
+                    file_stat = stat(join(self._directory, name))
+                except OSError:
+                    continue  # removed since the listing
+                state = (file_stat.st_size, file_stat.st_mtime)
+                previous = changes.get(name)
+                if previous is None or previous[0] != state:
+                    changes[name] = (state, now)
+                    last_activity = now
+                elif file_stat.st_size > 0 and now - previous[1] >= self._settle_time:
+                    complete.append(name)
+
+            for name in sorted(complete, key=image_number_key):
+                done.add(name)
+                last_activity = now
+                log.debug("Image complete: " + name)
+                yield join(self._directory, name)
+                if self._expected_count is not None and len(done) >= self._expected_count:
+                    return
+
+            if now - last_activity > self._timeout:
+                if self._expected_count is not None:
+                    log.warning("Timed out waiting for the stack in " + self._directory + ", found " +
+                                str(len(done)) + " of " + str(self._expected_count) + " images")
+                return
+
+            time.sleep(self._poll_interval)
+
+    def _list_images(self):
+        if not isdir(self._directory):
+            return []
+        return [name for name in listdir(self._directory)
+                if not name.startswith(".") and any(c.isdigit() for c in name)]
@@ -8,7 +8,7 @@ import cv2
 import os
 from unittest import TestCase
 
-from mock import MagicMock, Mock
+from mock import MagicMock, Mock, patch
 from CrystalMatch.dls_focusstack.focus.focus_stack_lap_pyramid import FocusStack
 
 
@@ -30,3 +30,11 @@ class TestFocusStackLapPyramid(TestCase):
         self.assertEqual(result_img.channels(), 3) #rgb
         self.assertEqual(result_img.size(), (img.shape[1],img.shape[0]))
 
+    @patch('CrystalMatch.dls_focusstack.focus.focus_stack_lap_pyramid.StackWatcher')
+    def test_stream_timeout_overrides_the_config(self, watcher_class):
+        fs = FocusStack([], os.path.join("config"))
+        fs.stream_from("stack", 5, 1.5)
+        self.assertEqual(watcher_class.call_args[0][4], 1.5)
+
+        fs.stream_from("stack", 5)
+        self.assertEqual(watcher_class.call_args[0][4], fs._config.stream_timeout.value())
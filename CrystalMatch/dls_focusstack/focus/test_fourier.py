@@ -0,0 +1,94 @@
+from pkg_resources import require
+require("numpy>=1.11.1")
+
+from unittest import TestCase
+
+import numpy as np
+
+from CrystalMatch.dls_focusstack.focus.fourier import Fourier, BandpassMaskCache, bandpass_mask
+
+
+class TestFourier(TestCase):
+
+    def setUp(self):
+        self._random = np.random.RandomState(5)
+
+    def test_fourier_bandpass_sums_the_fft_within_the_mask(self):
+        array = self._random.uniform(0, 255, (45, 60))
+        fft_abs = np.abs(np.fft.rfft2(array))
+        expected = np.sum(fft_abs[bandpass_mask(*fft_abs.shape)])
+        self.assertAlmostEqual(Fourier(array).runFFT(), expected)
+
+    def test_fourier_bandpass_is_the_same_when_the_mask_is_cached(self):
+        array = self._random.uniform(0, 255, (50, 70))
+        Fourier.MASK_CACHE.clear()
+        first = Fourier(array).runFFT()
+        second = Fourier(array).runFFT()
+        self.assertEqual(first, second)
+        self.assertEqual(Fourier.MASK_CACHE.misses(), 1)
+        self.assertEqual(Fourier.MASK_CACHE.hits(), 1)
+
+    def test_fourier_bandpass_batch_is_identical_to_fourier_bandpass(self):
+        arrays = self._random.uniform(0, 255, (12, 37, 41)).astype(np.float32)
+        expected = [Fourier(array).runFFT() for array in arrays]
+        self.assertTrue(np.array_equal(Fourier.fourier_bandpass_batch(arrays), expected))
+
+    def test_fourier_bandpass_batch_splits_large_batches(self):
+        arrays = self._random.uniform(0, 255, (7, 20, 20))
+        expected = Fourier.fourier_bandpass_batch(arrays)
+        limit = Fourier.MAX_BATCH_ELEMENTS
+        Fourier.MAX_BATCH_ELEMENTS = 2 * 20 * 20
+        try:
+            self.assertTrue(np.array_equal(Fourier.fourier_bandpass_batch(arrays), expected))
+        finally:
+            Fourier.MAX_BATCH_ELEMENTS = limit
+
+    def test_bandpass_mask_has_the_shape_of_the_fft(self):
+        self.assertEqual(bandpass_mask(40, 21).shape, (40, 21))
+        self.assertEqual(bandpass_mask(40, 21).dtype, np.bool_)
+
+
+class TestBandpassMaskCache(TestCase):
+
+    def test_counts_hits_and_misses(self):
+        cache = BandpassMaskCache()
+        cache.get((10, 6))
+        cache.get((10, 6))
+        cache.get((12, 7))
+        self.assertEqual(cache.hits(), 1)
+        self.assertEqual(cache.misses(), 2)
+
+    def test_cached_masks_are_the_same_object_and_read_only(self):
+        cache = BandpassMaskCache()
+        mask = cache.get((10, 6))
+        self.assertIs(cache.get((10, 6)), mask)
+        self.assertFalse(mask.flags.writeable)
+        self.assertTrue(np.array_equal(mask, bandpass_mask(10, 6)))
+
+    def test_least_recently_used_mask_is_evicted_when_over_the_limit(self):
+        cache = BandpassMaskCache(max_bytes=2 * 10 * 10)
+        cache.get((10, 10))
+        cache.get((10, 11))  # evicts (10, 10)
+        self.assertEqual(cache.size(), 10 * 11)
+        cache.get((10, 10))  # evicts (10, 11)
+        self.assertEqual(cache.size(), 10 * 10)
+        self.assertEqual(cache.misses(), 3)
+
+        cache.get((5, 5))
+        self.assertEqual(cache.size(), 10 * 10 + 5 * 5)
+        cache.get((10, 10))
+        self.assertEqual(cache.hits(), 1)
+
+    def test_masks_larger_than_the_limit_are_not_cached(self):
+        cache = BandpassMaskCache(max_bytes=10)
+        cache.get((10, 10))
+        self.assertEqual(cache.size(), 0)
+        cache.get((10, 10))
+        self.assertEqual(cache.misses(), 2)
+
+    def test_clear_empties_the_cache(self):
+        cache = BandpassMaskCache()
+        cache.get((10, 6))
+        cache.clear()
+        self.assertEqual(cache.size(), 0)
+        self.assertEqual(cache.hits() + cache.misses(), 0)
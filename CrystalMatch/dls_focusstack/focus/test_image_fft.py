@@ -7,7 +7,9 @@ from unittest import TestCase
 
 import numpy as np
 
-from CrystalMatch.dls_focusstack.focus.imagefft import ImageFFT
+import os
+
+from CrystalMatch.dls_focusstack.focus.imagefft import ImageFFT, read_gray_image
 
 
 class TestImageFFT(TestCase):
@@ -42,10 +44,19 @@ class TestImageFFT(TestCase):
         sh = ImageFFT(self._img, 1, img_name)
         self.assertEqual(sh.get_image_name(), img_name)
 
-
-
-
-
-
-
-
+    def test_get_image_reads_the_file_when_the_image_is_not_held(self):
+        name = os.path.join(".", "system-tests", "resources", "A02.jpg")
+        sh = ImageFFT(None, 1, name)
+        self.assertFalse(sh.has_image())
+        self.assertTrue(np.array_equal(sh.get_image(), read_gray_image(name)))
+        self.assertTrue(sh.has_image())
+
+    def test_read_gray_image_shrinks_the_image_by_the_downsample_factor(self):
+        name = os.path.join(".", "system-tests", "resources", "A02.jpg")
+        full = read_gray_image(name)
+        self.assertEqual(full.dtype, np.float32)
+        self.assertEqual(len(full.shape), 2)
+        for factor in [2, 3, 4]:
+            shape = read_gray_image(name, factor).shape
+            self.assertLessEqual(abs(shape[0] - full.shape[0] / factor), 1)
+            self.assertLessEqual(abs(shape[1] - full.shape[1] / factor), 1)
@@ -9,9 +9,14 @@ from CrystalMatch.dls_focusstack.focus import image_fft_manager
 from unittest import TestCase
 
 from mock import MagicMock
+import cv2
 
 from CrystalMatch.dls_focusstack.focus.image_fft_manager import ImageFFTManager
+from CrystalMatch.dls_focusstack.focus.stack_watcher import StackWatcher
+from CrystalMatch.dls_focusstack.focus.worker_pool import WorkerPool
 import os
+import shutil
+import tempfile
 
 class TestImageFFTManager(TestCase):
 
@@ -62,3 +67,50 @@ class TestImageFFTManager(TestCase):
         image_fft = image_fft_manager.fft(param)
         self.assertIsNotNone(image_fft.getFFT())
         self.assertEqual(image_fft.get_image_number(), 10)
+
+    def test_stream_ftt_images_numbers_the_images_by_their_position_in_the_stack(self):
+        directory = tempfile.mkdtemp()
+        try:
+            shutil.copy(self._file2.name, os.path.join(directory, "FL2.jpg"))
+            shutil.copy(self._file1.name, os.path.join(directory, "FL1.jpg"))
+            watcher = StackWatcher(directory, expected_count=2, poll_interval=0.01, settle_time=0.02)
+            manager = ImageFFTManager([])
+            with WorkerPool(2) as pool:
+                manager.stream_ftt_images(watcher, pool)
+        finally:
+            shutil.rmtree(directory)
+
+        fft_images = manager.get_fft_images()
+        self.assertEqual([os.path.basename(f.get_image_name()) for f in fft_images], ["FL1.jpg", "FL2.jpg"])
+        self.assertEqual([f.get_image_number() for f in fft_images], [0, 1])
+        self.assertEqual(fft_images[0].getFFT(), image_fft_manager.fft((self._file1.name, 0)).getFFT())
+
+    def test_stream_ftt_images_raises_when_no_image_is_written(self):
+        directory = tempfile.mkdtemp()
+        try:
+            watcher = StackWatcher(directory, poll_interval=0.01, timeout=0.05)
+            with self.assertRaises(IOError):
+                ImageFFTManager([]).stream_ftt_images(watcher, WorkerPool(1))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_fft_method_does_not_send_back_the_image(self):
+        image_fft = image_fft_manager.fft((self._file1.name, 0))
+        self.assertFalse(image_fft.has_image())
+
+    def test_fft_method_scores_a_downsampled_image(self):
+        full = image_fft_manager.fft((self._file1.name, 0, 1)).getFFT()
+        downsampled = image_fft_manager.fft((self._file1.name, 0, 4)).getFFT()
+        self.assertIsNotNone(downsampled)
+        self.assertNotEqual(full, downsampled)
+
+    def test_read_images_reads_only_the_images_which_are_not_held(self):
+        held = MagicMock()
+        held.has_image.return_value = True
+        not_held = MagicMock()
+        not_held.has_image.return_value = False
+        not_held.get_image_name.return_value = self._file1.name
+        with WorkerPool(1) as pool:
+            ImageFFTManager.read_images([held, not_held], pool)
+        held.set_image.assert_not_called()
+        self.assertEqual(not_held.set_image.call_args[0][0].shape[:2], (cv2.imread(self._file1.name).shape[:2]))
@@ -0,0 +1,55 @@
+from pkg_resources import require
+require("numpy>=1.11.1")
+
+from os.path import exists
+from unittest import TestCase
+
+import numpy as np
+
+from CrystalMatch.dls_focusstack.focus.laplacian_buffer import LaplacianBuffer
+
+
+class TestLaplacianBuffer(TestCase):
+
+    def setUp(self):
+        self._buffer = LaplacianBuffer(3, [(1, (2, 5)), (0, (4, 10))])
+
+    def tearDown(self):
+        self._buffer.close()
+
+    def test_size_holds_laplacians_and_fused_result_of_each_level(self):
+        item_size = np.dtype(LaplacianBuffer.DTYPE).itemsize
+        self.assertEqual(self._buffer.size(), (4 * 2 * 5 + 4 * 4 * 10) * item_size)
+
+    def test_views_have_the_shape_of_the_level(self):
+        self.assertEqual(self._buffer.laplacians(0).shape, (3, 4, 10))
+        self.assertEqual(self._buffer.fused(0).shape, (4, 10))
+        self.assertEqual(self._buffer.laplacians(1).shape, (3, 2, 5))
+        self.assertEqual(self._buffer.fused(1).shape, (2, 5))
+
+    def test_levels_do_not_overlap(self):
+        self._buffer.laplacians(1)[:] = 1
+        self._buffer.fused(1)[:] = 2
+        self._buffer.laplacians(0)[:] = 3
+        self._buffer.fused(0)[:] = 4
+        self.assertTrue(np.all(self._buffer.laplacians(1) == 1))
+        self.assertTrue(np.all(self._buffer.fused(1) == 2))
+        self.assertTrue(np.all(self._buffer.laplacians(0) == 3))
+
+    def test_open_level_maps_the_same_data(self):
+        self._buffer.laplacians(0)[:] = np.arange(120).reshape((3, 4, 10))
+        self._buffer.flush()
+
+        laplacians, fused = LaplacianBuffer.open_level(self._buffer.descriptor(0))
+        self.assertTrue(np.array_equal(laplacians, np.arange(120).reshape((3, 4, 10))))
+
+        fused[:] = 7
+        fused.flush()
+        self.assertTrue(np.all(self._buffer.fused(0) == 7))
+
+    def test_close_removes_the_backing_file(self):
+        laplacian_buffer = LaplacianBuffer(1, [(0, (2, 2))])
+        path = laplacian_buffer.descriptor(0)[0]
+        self.assertTrue(exists(path))
+        laplacian_buffer.close()
+        self.assertFalse(exists(path))
@@ -49,3 +49,28 @@ class TestPointFFTManager(TestCase):
         region_size = 10
         number = PointFFTManager(fft_images, poi, region_size).find_z_level_for_point()
         self.assertEqual(number, 1)
+
+    def _random_fft_images(self, count, shape):
+        random = np.random.RandomState(7)
+        return [MagicMock(get_image=Mock(return_value=random.uniform(0, 255, shape).astype(np.float32)),
+                          get_image_number=Mock(return_value=number + 10),
+                          get_image_name=Mock(return_value='test' + str(number)))
+                for number in range(count)]
+
+    def test_find_z_levels_for_points_is_the_same_as_for_each_point(self):
+        fft_images = self._random_fft_images(8, (120, 150))
+        # includes points close to and outside the edge of the image and points with fractional coordinates
+        points = [Point(75, 60), Point(20.4, 100.6), Point(2, 3), Point(149, 119), Point(-5, 60), Point(75.5, 118)]
+        expected = [PointFFTManager(fft_images, point, 30).find_z_level_for_point() for point in points]
+        self.assertEqual(PointFFTManager.find_z_levels_for_points(fft_images, points, 30), expected)
+
+    def test_find_z_levels_for_points_returns_one_level_per_point_in_order(self):
+        img = MagicMock(get_image=Mock(return_value=np.ones((30, 30), dtype=np.float64)),
+                        get_image_number=Mock(return_value=10))
+        img1 = MagicMock(get_image=Mock(return_value=np.zeros((30, 30), dtype=np.float64)),
+                         get_image_number=Mock(return_value=0))
+        levels = PointFFTManager.find_z_levels_for_points([img, img1], [Point(15, 15), Point(1, 1)], 10)
+        self.assertEqual(levels, [10, 10])
+
+    def test_find_z_levels_for_points_without_images_returns_none_for_each_point(self):
+        self.assertEqual(PointFFTManager.find_z_levels_for_points(None, [Point(1, 1), Point(2, 2)], 10), [None, None])
@@ -7,6 +7,7 @@ require("mock>=1.0.1")
 
 from unittest import TestCase
 
+from CrystalMatch.dls_focusstack.focus.fusion_mode import FusionMode
 from CrystalMatch.dls_focusstack.focus.pyramid_collection import fused_laplacian, entropy_diviation, PyramidCollection
 
 from CrystalMatch.dls_focusstack.focus.pyramid import Pyramid
@@ -53,3 +54,17 @@ class TestPyramid(TestCase):
         entropy_diviation(param)
         layer.entropy.assert_called_once()
         layer.deviation.assert_called_once()
+
+    def test_shared_memory_and_pickle_fusion_give_the_same_pyramid(self):
+        random = np.random.RandomState(3)
+        collection = PyramidCollection()
+        for layer in range(3):
+            pyr = Pyramid(layer, 3)
+            for level, size in enumerate([8, 4, 2]):
+                pyr.add_lower_resolution_level(PyramidLevel(random.uniform(-50, 50, (size, size)), layer, level))
+            collection.add_pyramid(pyr)
+
+        shared = collection.fuse(self._kernel_size, FusionMode.SHARED_MEMORY)
+        pickled = collection.fuse(self._kernel_size, FusionMode.PICKLE)
+        for level in range(3):
+            self.assertTrue(np.array_equal(shared.get_level(level).get_array(), pickled.get_level(level).get_array()))
@@ -25,6 +25,26 @@ class TestSharpnessDetector(TestCase):
         images = sd.images_to_stack()
         self.assertEqual(images[0],100)
 
+    def test_image_stack_method_reads_only_the_images_within_the_range(self):
+        fft_images = []
+        for number, score in enumerate([1, 5, 9, 5, 1]):
+            fft_image = MagicMock()
+            fft_image.getFFT.return_value = score
+            fft_image.get_image_number.return_value = number
+            fft_image.has_image.return_value = False
+            fft_image.get_image_name.return_value = "image" + str(number)
+            fft_images.append(fft_image)
+        self._config.number_to_stack.value.return_value = 2
+        pool = MagicMock()
+        pool.map.return_value = ["img1", "img2"]
+
+        sd = SharpnessDetector(fft_images, self._config, pool)
+        sd.images_to_stack()
+        self.assertEqual(pool.map.call_args[0][1], ["image1", "image2"])
+        fft_images[1].set_image.assert_called_once_with("img1")
+        fft_images[2].set_image.assert_called_once_with("img2")
+        self.assertEqual(sd.get_fft_images_to_stack(), fft_images[1:3])
+
 #TODO: parametrization of the tests would reduce repetitions
     def test_returns_correct_when_even_number_passed(self):
         max = 10
@@ -0,0 +1,86 @@
+from pkg_resources import require
+
+require("numpy>=1.11.1")
+require("scipy>=0.19.1")
+from unittest import TestCase
+
+import numpy as np
+
+from CrystalMatch.dls_focusstack.focus.pyramid_level import PyramidLevel
+from CrystalMatch.dls_focusstack.focus.sliding_window import window_sum, window_deviation, window_entropy
+
+
+def loop_entropy(layer, kernel_size):
+    """Reference implementation: reduce the padded area around every pixel one at a time."""
+    probabilities = layer.get_probabilities()
+    pad_amount, padded_image, offset = layer.padding(kernel_size)
+    entropies = np.zeros(layer.get_array().shape[:2], dtype=np.float64)
+    for row in range(entropies.shape[0]):
+        for column in range(entropies.shape[1]):
+            area = padded_image[row + pad_amount + offset[:, np.newaxis], column + pad_amount + offset]
+            entropies[row, column] = PyramidLevel._area_entropy(area, probabilities)
+    return entropies
+
+
+def loop_deviation(layer, kernel_size):
+    """Reference implementation: reduce the padded area around every pixel one at a time."""
+    pad_amount, padded_image, offset = layer.padding(kernel_size)
+    deviations = np.zeros(layer.get_array().shape[:2], dtype=np.float64)
+    for row in range(deviations.shape[0]):
+        for column in range(deviations.shape[1]):
+            area = padded_image[row + pad_amount + offset[:, np.newaxis], column + pad_amount + offset]
+            deviations[row, column] = PyramidLevel._area_deviation(area)
+    return deviations
+
+
+class TestSlidingWindow(TestCase):
+
+    def setUp(self):
+        random = np.random.RandomState(12)
+        self._array = random.uniform(0, 255, (23, 31)).astype(np.float64)
+        self._other_array = random.uniform(0, 255, (23, 31)).astype(np.float64)
+
+    def test_window_sum_of_ones_is_kernel_area(self):
+        sums = window_sum(np.ones((10, 10), dtype=np.float64), 5)
+        self.assertTrue(np.all(sums == 25))
+
+    def test_window_sum_mirrors_the_border(self):
+        array = np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]], dtype=np.float64)
+        sums = window_sum(array, 3)
+        # the window of the top left corner is [[5, 4, 5], [2, 1, 2], [5, 4, 5]]
+        self.assertEqual(sums[0, 0], 33)
+        self.assertEqual(sums[1, 1], 45)
+
+    def test_window_deviation_of_flat_array_is_zero(self):
+        deviations = window_deviation(np.full((8, 8), 100, dtype=np.float64), 3)
+        self.assertTrue(np.all(deviations == 0))
+
+    def test_operators_do_not_change_array_size(self):
+        layer = PyramidLevel(self._array, 0, 0)
+        self.assertEqual(window_deviation(self._array, 7).shape, self._array.shape)
+        self.assertEqual(window_entropy(self._array, 7, layer.get_probabilities()).shape, self._array.shape)
+
+    def test_entropy_matches_loop_implementation(self):
+        layer = PyramidLevel(self._array, 0, 0)
+        for kernel_size in [3, 5, 7, 9]:
+            layer.entropy(kernel_size)
+            expected = loop_entropy(layer, kernel_size)
+            self.assertTrue(np.allclose(layer.get_entropies(), expected, rtol=1e-10, atol=1e-8))
+
+    def test_deviation_matches_loop_implementation(self):
+        layer = PyramidLevel(self._array, 0, 0)
+        for kernel_size in [3, 5, 7, 9]:
+            layer.deviation(kernel_size)
+            expected = loop_deviation(layer, kernel_size)
+            self.assertTrue(np.allclose(layer.get_deviations(), expected, rtol=1e-10, atol=1e-8))
+
+    def test_best_layer_choice_matches_loop_implementation(self):
+        layers = [PyramidLevel(self._array, 0, 0), PyramidLevel(self._other_array, 1, 0)]
+        for layer in layers:
+            layer.entropy(5)
+            layer.deviation(5)
+
+        best_entropy = np.argmax([l.get_entropies() for l in layers], axis=0)
+        best_deviation = np.argmax([l.get_deviations() for l in layers], axis=0)
+        self.assertTrue(np.array_equal(best_entropy, np.argmax([loop_entropy(l, 5) for l in layers], axis=0)))
+        self.assertTrue(np.array_equal(best_deviation, np.argmax([loop_deviation(l, 5) for l in layers], axis=0)))
@@ -0,0 +1,86 @@
+from pkg_resources import require
+require("mock>=1.0.1")
+
+import shutil
+import tempfile
+import threading
+import time
+from os.path import join
+from unittest import TestCase
+
+from CrystalMatch.dls_focusstack.focus.stack_watcher import StackWatcher, image_number_key
+
+
+def write_file(path, content="image"):
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class TestStackWatcher(TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def test_image_number_key_uses_the_digits_of_the_name(self):
+        names = ["FL10.tif", "FL2.tif", "FL1.tif"]
+        self.assertEqual(sorted(names, key=image_number_key), ["FL1.tif", "FL2.tif", "FL10.tif"])
+
+    def test_complete_images_are_yielded_in_number_order(self):
+        for name in ["FL10.tif", "FL2.tif", "FL1.tif"]:
+            write_file(join(self._directory, name))
+        watcher = StackWatcher(self._directory, expected_count=3, poll_interval=0.01, settle_time=0.02)
+        self.assertEqual(list(watcher.files()), [join(self._directory, name)
+                                                 for name in ["FL1.tif", "FL2.tif", "FL10.tif"]])
+
+    def test_hidden_files_and_files_without_a_number_are_ignored(self):
+        write_file(join(self._directory, ".FL1.tif.part"))
+        write_file(join(self._directory, "notes.txt"))
+        write_file(join(self._directory, "FL1.tif"))
+        watcher = StackWatcher(self._directory, poll_interval=0.01, settle_time=0.02, timeout=0.1)
+        self.assertEqual(list(watcher.files()), [join(self._directory, "FL1.tif")])
+
+    def test_empty_files_are_not_complete(self):
+        write_file(join(self._directory, "FL1.tif"), "")
+        watcher = StackWatcher(self._directory, poll_interval=0.01, settle_time=0.02, timeout=0.1)
+        self.assertEqual(list(watcher.files()), [])
+
+    def test_stops_after_timeout_when_the_expected_count_is_not_reached(self):
+        write_file(join(self._directory, "FL1.tif"))
+        watcher = StackWatcher(self._directory, expected_count=5, poll_interval=0.01, settle_time=0.02, timeout=0.1)
+        self.assertEqual(len(list(watcher.files())), 1)
+
+    def test_waits_for_a_directory_which_does_not_exist_yet(self):
+        directory = join(self._directory, "stack")
+        watcher = StackWatcher(directory, expected_count=1, poll_interval=0.01, settle_time=0.02, timeout=2)
+
+        def acquire():
+            time.sleep(0.1)
+            shutil.os.mkdir(directory)
+            write_file(join(directory, "FL1.tif"))
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertEqual(list(watcher.files()), [join(directory, "FL1.tif")])
+        thread.join()
+
+    def test_images_are_yielded_while_the_stack_is_being_written(self):
+        watcher = StackWatcher(self._directory, expected_count=2, poll_interval=0.01, settle_time=0.02, timeout=2)
+        first_yielded = []
+
+        def acquire():
+            write_file(join(self._directory, "FL1.tif"))
+            while len(first_yielded) == 0:
+                time.sleep(0.01)
+            write_file(join(self._directory, "FL2.tif"))
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        files = []
+        for path in watcher.files():
+            first_yielded.append(path)
+            files.append(path)
+        thread.join()
+        self.assertEqual(files, [join(self._directory, "FL1.tif"), join(self._directory, "FL2.tif")])
@@ -0,0 +1,70 @@
+from pkg_resources import require
+require("mock>=1.0.1")
+
+import os
+from multiprocessing import cpu_count
+from unittest import TestCase
+
+from mock import patch
+
+from CrystalMatch.dls_focusstack.focus.worker_pool import WorkerPool
+
+
+def square(parameters):
+    return parameters * parameters
+
+
+def process_id(parameters):
+    return os.getpid()
+
+
+class TestWorkerPool(TestCase):
+
+    def test_zero_workers_means_one_per_cpu(self):
+        self.assertEqual(WorkerPool(0).workers(), cpu_count())
+
+    def test_map_keeps_the_order_of_the_parameters(self):
+        with WorkerPool(2) as pool:
+            self.assertEqual(pool.map(square, list(range(10)), "stage"), [n * n for n in range(10)])
+
+    def test_map_stream_takes_a_generator(self):
+        with WorkerPool(2) as pool:
+            results = pool.map_stream(square, (n for n in range(10)), "stage")
+            self.assertEqual(results, [n * n for n in range(10)])
+            self.assertIn("stage", pool.stage_times())
+
+    def test_one_worker_runs_in_the_calling_process(self):
+        with WorkerPool(1) as pool:
+            self.assertTrue(pool.is_serial())
+            self.assertEqual(set(pool.map(process_id, list(range(4)), "stage")), {os.getpid()})
+
+    def test_processes_are_reused_between_stages(self):
+        with WorkerPool(2) as pool:
+            first = set(pool.map(process_id, list(range(8)), "first"))
+            second = set(pool.map(process_id, list(range(8)), "second"))
+            self.assertNotIn(os.getpid(), first)
+            self.assertLessEqual(len(first | second), 2)
+
+    def test_stage_times_are_recorded_in_order_and_accumulated(self):
+        with WorkerPool(1) as pool:
+            with patch("CrystalMatch.dls_focusstack.focus.worker_pool.time.time", side_effect=[0, 1, 1, 3, 3, 7]):
+                pool.map(square, [1], "fft")
+                pool.map(square, [1], "fusion")
+                pool.map(square, [1], "fft")
+            self.assertEqual(list(pool.stage_times().items()), [("fft", 5), ("fusion", 2)])
+
+            pool.reset_stage_times()
+            self.assertEqual(len(pool.stage_times()), 0)
+
+    def test_falls_back_to_serial_when_processes_cannot_be_started(self):
+        with patch("CrystalMatch.dls_focusstack.focus.worker_pool.Pool", side_effect=OSError("no semaphores")):
+            pool = WorkerPool(4)
+            self.assertEqual(pool.map(process_id, [1, 2], "stage"), [os.getpid(), os.getpid()])
+            self.assertTrue(pool.is_serial())
+
+    def test_pool_can_be_used_again_after_close(self):
+        pool = WorkerPool(2)
+        pool.map(square, [1, 2], "stage")
+        pool.close()
+        self.assertEqual(pool.map(square, [3], "stage"), [9])
+        pool.close()
@@ -0,0 +1,86 @@
+import logging
+import time
+from collections import OrderedDict
+from multiprocessing import Pool, cpu_count
+
+from CrystalMatch.dls_imagematch import logconfig
+
+
+class WorkerPool:
+    """Pool of worker processes which is shared by all the stages of a focus stack (fft, base fusion and
+    level fusion), so the processes are only started once per stack rather than once per stage.
+    The processes are started on the first call to map(). With one worker the functions are run in the calling
+    process and no processes are started at all.
+    The time spent in each stage is recorded and can be read with stage_times().
+    :param workers: number of worker processes, 0 for one per cpu"""
+
+    def __init__(self, workers=0):
+        self._workers = workers if workers > 0 else cpu_count()
+        self._pool = None
+        self._timings = OrderedDict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def workers(self):
+        return self._workers
+
+    def is_serial(self):
+        return self._workers == 1
+
+    def map(self, function, parameters, stage):
+        """Call the function with each item of parameters, in the worker processes if there is more than one.
+        :param stage: name of the stage the time of the call is added to
+        :return: list of results in the same order as parameters"""
+        start = time.time()
+        pool = self._get_pool()
+        if pool is None:
+            results = [function(param) for param in parameters]
+        else:
+            results = pool.map_async(function, parameters).get()
+
+        self._timings[stage] = self._timings.get(stage, 0) + time.time() - start
+        return results
+
+    def map_stream(self, function, parameters, stage):
+        """Same as map() but parameters can be a generator which is still producing items - each item is sent to
+        a worker as soon as it is produced instead of waiting for the whole list.
+        :return: list of results in the same order as parameters"""
+        start = time.time()
+        pool = self._get_pool()
+        if pool is None:
+            results = [function(param) for param in parameters]
+        else:
+            results = list(pool.imap(function, parameters))
+
+        self._timings[stage] = self._timings.get(stage, 0) + time.time() - start
+        return results
+
+    def stage_times(self):
+        """Time (in seconds) spent in each stage, in the order the stages were first run."""
+        return OrderedDict(self._timings)
+
+    def reset_stage_times(self):
+        self._timings = OrderedDict()
+
+    def close(self):
+        """Stop the worker processes. The pool can still be used afterwards - new processes are started."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None and not self.is_serial():
+            try:
+                self._pool = Pool(processes=self._workers)
+            except (OSError, ImportError) as e:
+                # e.g. no semaphore support on the host - run the stages in this process instead
+                log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
+                log.addFilter(logconfig.ThreadContextFilter())
+                log.warning("Could not start worker processes, running serially: " + str(e))
+                self._workers = 1
+        return self._pool
@@ -2,3 +2,4 @@ from .exception import ImageAlignmentError
 from .aligned_images import AlignedImages
 from .aligner import ImageAligner
 from .config import AlignConfig
+from .phase_correlation import PhaseCorrelation
@@ -41,6 +41,7 @@ class AlignedImages:
         self._translation = translation
         self._limit_low = align_config.metric_limit_low.value()
         self._limit_high = align_config.metric_limit_high.value()
+        self._metric_stride = align_config.metric_stride.value()
 
         self._real_offset = None
         self._pixel_offset = None
@@ -123,6 +124,10 @@ class AlignedImages:
         if self._metric is None:
             metric_calc = OverlapMetric(self.image1, self.image2, self._limit_high)
             # DEV NOTE: Overlayer uses the offset of image B from Image A - the translation must be inverted
-            self._metric = metric_calc.calculate_overlap_metric(-self._translation)
+            if self._metric_stride > 1:
+                self._metric = metric_calc.calculate_overlap_metric_fast(-self._translation, self._metric_stride,
+                                                                         [self._limit_low, self._limit_high])
+            else:
+                self._metric = metric_calc.calculate_overlap_metric(-self._translation)
         return self._metric
 
@@ -1,16 +1,26 @@
 import logging
+import time
+
+import cv2
 
 from CrystalMatch.dls_imagematch import logconfig
 from CrystalMatch.dls_imagematch.crystal.align.sized_image import SizedImage
-from CrystalMatch.dls_imagematch.feature import FeatureMatcher
-from CrystalMatch.dls_util.shape import Point
+from CrystalMatch.dls_imagematch.feature import FeatureMatcher, BoundedFeatureMatcher
+from CrystalMatch.dls_imagematch.feature.detector.factory import DetectorFactory
+from CrystalMatch.dls_util.imaging import Image
+from CrystalMatch.dls_util.shape import Point, Rectangle
 from CrystalMatch.dls_imagematch.crystal.align.aligned_images import AlignedImages
 from CrystalMatch.dls_imagematch.crystal.align.exception import ImageAlignmentError
+from CrystalMatch.dls_imagematch.crystal.align.phase_correlation import PhaseCorrelation
 
 
 class ImageAligner:
+    FEATURE_MATCHING = "Feature Matching"
+    PHASE_CORRELATION = "Phase Correlation"
+
+    METHODS = [FEATURE_MATCHING, PHASE_CORRELATION]
 
-    def __init__(self, image1, image2, align_config, detector_config=None):
+    def __init__(self, image1, image2, align_config, detector_config=None, prepared_image1=None, pixel_sizes=None):
         """
         Takes two images and uses feature detection to provide a best fit alignment. The scale of the images will be
         normalized by resizing image1 to the same resolution as image2.  Note that this does not mean the images
@@ -19,13 +29,14 @@ class ImageAligner:
         :param image2: The image used to align the sample.
         :param align_config: Configuration object for this process.
         :param detector_config: Configuration object for the feature detector.
+        :param prepared_image1: image1 as returned by prepare_image_1(), used instead of rescaling image1 again.
+        :param pixel_sizes: the pixel sizes (image 1, image 2) of the images, used instead of those of align_config.
         """
         log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
         log.addFilter(logconfig.ThreadContextFilter())
         assert(align_config is not None)
         # Create images with associated real sizes
-        px_size_1 = align_config.pixel_size_1.value()
-        px_size_2 = align_config.pixel_size_2.value()
+        px_size_1, px_size_2 = self._pixel_sizes(align_config, pixel_sizes)
         self._resolution = px_size_2  # The resolution of the second image will be the working resolution
         self._scale_factor = px_size_1 / px_size_2
 
@@ -37,13 +48,46 @@ class ImageAligner:
         log.info("Scale Factor calculated as " + str(self._scale_factor))
         log.debug(extra)
 
-        self._image1 = SizedImage.from_image(image1, px_size_1)
+        if prepared_image1 is None:
+            self._image1 = SizedImage.from_image(image1, px_size_1)
         self._image2 = SizedImage.from_image(image2, px_size_2)
 
         self._align_config = align_config
         self._detector_config = detector_config
 
-        self._rescale_image_1()
+        if prepared_image1 is None:
+            self._image1 = self._rescale_image_1(self._image1, self._scale_factor)
+        else:
+            self._image1 = prepared_image1
+
+    @staticmethod
+    def prepare_image_1(image1, align_config, detector_config, pixel_sizes=None):
+        """ Do the work on image 1 which doesn't need image 2, so it can be done before image 2 is available (e.g.
+        while the beamline stack is focused): rescale it to the working resolution and, for feature matching, detect
+        its features. Pass the result to the ImageAligner (with the same pixel_sizes) as prepared_image1. """
+        log = logging.getLogger(".".join([__name__, ImageAligner.__name__]))
+        log.addFilter(logconfig.ThreadContextFilter())
+        px_size_1, px_size_2 = ImageAligner._pixel_sizes(align_config, pixel_sizes)
+        prepared = ImageAligner._rescale_image_1(SizedImage.from_image(image1, px_size_1), px_size_1 / px_size_2)
+        mono = prepared.to_mono()
+
+        if align_config.use_alignment.value() and align_config.align_method.value() == ImageAligner.FEATURE_MATCHING:
+            # The features of the image the alignment matches first: the whole image or the top of the pyramid
+            levels = align_config.pyramid_levels.value()
+            first_image = ImageAligner._pyramid(mono, levels)[-1] if levels > 1 else mono
+            try:
+                detector = DetectorFactory.create(align_config.align_detector.value(), detector_config)
+                detector.detect_features_cached(first_image)
+            except Exception as e:
+                # Leave the error to be reported by the alignment
+                log.warning("Could not detect the features of image 1 in advance: " + str(e))
+        return prepared
+
+    @staticmethod
+    def _pixel_sizes(align_config, pixel_sizes):
+        if pixel_sizes is None:
+            return align_config.pixel_size_1.value(), align_config.pixel_size_2.value()
+        return pixel_sizes
 
     # -------- CONFIGURATION -------------------
     def set_align_config(self, config):  # pragma: no cover
@@ -52,14 +96,16 @@ class ImageAligner:
     def set_detector_config(self, config):  # pragma: no cover
         self._detector_config = config
 
-    def _rescale_image_1(self):
+    @staticmethod
+    def _rescale_image_1(image1, scale_factor):
         # Resize image A so it has the same size per pixel as image B
-        if self._scale_factor != 1:
-            self._image1 = self._image1.rescale(self._scale_factor)
-            log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
+        if scale_factor != 1:
+            image1 = image1.rescale(scale_factor)
+            log = logging.getLogger(".".join([__name__, ImageAligner.__name__]))
             log.addFilter(logconfig.ThreadContextFilter())
-            log.info("Rescaling image 1 by scale factor " + str(self._scale_factor) +
-                         ", new size: %d x %d", self._image1.width(), self._image1.height())
+            log.info("Rescaling image 1 by scale factor " + str(scale_factor) +
+                         ", new size: %d x %d", image1.width(), image1.height())
+        return image1
 
     # -------- FUNCTIONALITY -------------------
     def align(self):
@@ -69,6 +115,11 @@ class ImageAligner:
         if not self._align_config.use_alignment.value():
             return self._default_alignment()
 
+        if self._align_config.align_method.value() == self.PHASE_CORRELATION:
+            aligned_images = self._phase_correlation_alignment()
+            if aligned_images is not None:
+                return aligned_images
+
         detector = self._get_detector()
         match_result = self._perform_match(detector)
         aligned_images = self._generate_alignment(match_result, detector)
@@ -93,6 +144,30 @@ class ImageAligner:
         return AlignedImages(self._image1, self._image2, self._resolution, self._scale_factor,
                              translation, self._align_config, description)
 
+    def _phase_correlation_alignment(self):
+        """ Alignment from the phase correlation of the images, or None if the correlation peak is too weak (the
+        images are then aligned by feature matching instead). """
+        log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
+        log.addFilter(logconfig.ThreadContextFilter())
+
+        start_time = time.time()
+        translation, response = PhaseCorrelation(self._image1.to_mono(), self._image2.to_mono()).calculate()
+        extra = {'align_phase_time': "{:.4f}".format(time.time() - start_time),
+                 'align_phase_response': "{:.4f}".format(response)}
+        log = logging.LoggerAdapter(log, extra)
+        log.debug(extra)
+
+        min_response = self._align_config.phase_min_response.value()
+        if response < min_response:
+            log.warning("Phase correlation response " + "{:.4f}".format(response) + " is below " + str(min_response) +
+                        ", aligning by feature matching instead.")
+            return None
+
+        log.info("Phase correlation translation: " + str(translation))
+        description = "Phase correlation"
+        return AlignedImages(self._image1, self._image2, self._resolution, self._scale_factor,
+                             translation, self._align_config, description)
+
     def _check_config(self):
         log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
         log.addFilter(logconfig.ThreadContextFilter())
@@ -111,12 +186,101 @@ class ImageAligner:
 
     def _perform_match(self, detector):
         """ Perform feature matching between the two images. """
+        levels = self._align_config.pyramid_levels.value()
+        if levels > 1:
+            match_result = self._perform_pyramid_match(detector, levels)
+            if match_result is not None:
+                return match_result
+
         # Note images are passed in backwards - FeatureMatcher was written to map points from image 2 to image 1
         matcher = FeatureMatcher(self._image2.to_mono(), self._image1.to_mono(), self._detector_config)
+        matcher.set_cache_features(True)
+        return self._match_translation(matcher, detector)
+
+    def _match_translation(self, matcher, detector):
         matcher.set_detector(detector)
-        match_result = matcher.match_translation_only()
+        matcher.set_descriptor_matcher(self._align_config.descriptor_matcher.value())
+        return matcher.match_translation_only()
+
+    def _perform_pyramid_match(self, detector, levels):
+        """ Coarse to fine alignment. The translation is found between the images downsampled by a factor of 2 for
+        each level, then refined at each level above using only the regions around the overlap predicted by the level
+        below. Returns the match result of the full resolution level (with the times of all the levels), or None if
+        any level fails - the full images are then aligned at full resolution instead. """
+        log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
+        log.addFilter(logconfig.ThreadContextFilter())
+        margin = self._align_config.pyramid_margin.value()
+
+        pyramid1 = self._pyramid(self._image1.to_mono(), levels)
+        pyramid2 = self._pyramid(self._image2.to_mono(), levels)
+
+        translation = None
+        level_times = []
+        time_match = 0
+        time_transform = 0
+        for level in reversed(range(levels)):
+            start_time = time.time()
+            image1, image2 = pyramid1[level], pyramid2[level]
+            factor = 2 ** level
+
+            if translation is None:
+                matcher = FeatureMatcher(image2, image1, self._detector_config)
+                matcher.set_cache_features(True)
+            else:
+                rect1, rect2 = self._predicted_overlap(image1, image2, translation / factor, margin)
+                if rect1 is None:
+                    log.warning("Pyramid alignment predicted no overlap at level " + str(level) +
+                                ", aligning the full images instead.")
+                    return None
+                matcher = BoundedFeatureMatcher(image2, image1, self._detector_config, rect2, rect1)
+
+            match_result = self._match_translation(matcher, detector)
+            level_times.append(time.time() - start_time)
+            time_match += match_result.time_match()
+            time_transform += match_result.time_transform()
+
+            if not match_result.has_transform():
+                log.warning("Pyramid alignment failed at level " + str(level) + ", aligning the full images instead.")
+                return None
+            translation = match_result.transform().translation() * factor
+
+        extra = {'align_pyramid_level_times': ["{:.4f}".format(t) for t in level_times]}
+        log = logging.LoggerAdapter(log, extra)
+        log.info("Pyramid alignment of " + str(levels) + " levels took " + "{:.4f}".format(sum(level_times)) +
+                 "s (coarsest level first: " + ", ".join("{:.4f}s".format(t) for t in level_times) + ")")
+        log.debug(extra)
+
+        match_result.set_time_match(time_match)
+        match_result.set_time_transform(time_transform)
         return match_result
 
+    @staticmethod
+    def _pyramid(image, levels):
+        """ The pyramid of the image (see _build_pyramid()), kept with the image so it is only built once. """
+        return image.cached(("pyramid", levels), lambda img: ImageAligner._build_pyramid(img, levels))
+
+    @staticmethod
+    def _build_pyramid(image, levels):
+        """ The image followed by copies of it each downsampled by a factor of 2 from the one before. """
+        pyramid = [image]
+        for _ in range(1, levels):
+            pyramid.append(Image(cv2.pyrDown(pyramid[-1].raw())))
+        return pyramid
+
+    @staticmethod
+    def _predicted_overlap(image1, image2, translation, margin):
+        """ The regions of the two images which overlap if the translation maps a point in image 1 onto image 2, each
+        grown by the margin (and clipped to its image). Returns (None, None) if the images would not overlap. """
+        overlap1 = image1.bounds().intersection(image2.bounds().offset(-translation))
+        if overlap1.area() == 0:
+            return None, None
+
+        overlap2 = overlap1.offset(translation)
+        grow = Point(margin, margin)
+        rect1 = Rectangle(overlap1.top_left() - grow, overlap1.bottom_right() + grow).intersection(image1.bounds())
+        rect2 = Rectangle(overlap2.top_left() - grow, overlap2.bottom_right() + grow).intersection(image2.bounds())
+        return rect1, rect2
+
     def _generate_alignment(self, match_result, detector):
         """ Generate a translation that maps image 2 to image 1 based on the feature match results. """
         if not match_result.has_transform():
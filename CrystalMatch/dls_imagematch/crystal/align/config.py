@@ -1,8 +1,10 @@
 from os.path import join
 
+from CrystalMatch.dls_imagematch.crystal.align.aligner import ImageAligner
 from CrystalMatch.dls_imagematch.feature.detector import DetectorType
+from CrystalMatch.dls_imagematch.feature.match import DescriptorMatcherType
 from CrystalMatch.dls_util.config.config import Config
-from CrystalMatch.dls_util.config.item import EnumConfigItem, BoolConfigItem, RangeFloatConfigItem
+from CrystalMatch.dls_util.config.item import EnumConfigItem, BoolConfigItem, RangeFloatConfigItem, RangeIntConfigItem
 
 
 class AlignConfig(Config):
@@ -31,10 +33,47 @@ class AlignConfig(Config):
                                        "The alignment metric will still be calculated, indicating whether the fit is "
                                        "any good.")
 
+        self.align_method = add(EnumConfigItem, "Alignment Method", default=ImageAligner.FEATURE_MATCHING,
+                                extra_arg=ImageAligner.METHODS)
+        self.align_method.set_comment("Method used to find the translation between the images. 'Feature Matching' "
+                                      "matches the features found by the detector; 'Phase Correlation' finds the "
+                                      "peak of the phase correlation of the whole images, falling back to feature "
+                                      "matching if the peak is weak.")
+
+        self.phase_min_response = add(RangeFloatConfigItem, "Phase Correlation Min Response", default=0.1,
+                                      extra_arg=[0.0, 1.0])
+        self.phase_min_response.set_comment("Strength of the phase correlation peak (the fraction of the correlation "
+                                            "in the peak) below which the phase correlation alignment is rejected "
+                                            "and feature matching is used instead.")
+
         self.align_detector = add(EnumConfigItem, "Detector", default=DetectorType.ORB, extra_arg=DetectorType.LIST_ALL)
         self.align_detector.set_comment("Feature detection algorithm to be used for the initial image alignment "
                                         "process.")
 
+        self.descriptor_matcher = add(EnumConfigItem, "Descriptor Matcher", default=DescriptorMatcherType.BRUTE_FORCE,
+                                      extra_arg=DescriptorMatcherType.LIST_ALL)
+        self.descriptor_matcher.set_comment("Method used to match the feature descriptors of the two images. 'Brute "
+                                            "Force' compares every pair of features; 'FLANN LSH' uses an approximate "
+                                            "nearest neighbour index, which is faster for large numbers of features; "
+                                            "'kNN Ratio Test' rejects features which match more than one feature "
+                                            "almost equally well.")
+
+        self.pyramid_levels = add(RangeIntConfigItem, "Pyramid Levels", default=1, extra_arg=[1, 6])
+        self.pyramid_levels.set_comment("Number of resolutions used to align the images. With more than one level "
+                                        "the translation is first found on copies of the images downsampled by 2 for "
+                                        "each extra level, then refined at each higher resolution using only the "
+                                        "regions of the images around the predicted overlap. 1 aligns the full "
+                                        "images at full resolution.")
+
+        self.pyramid_margin = add(RangeIntConfigItem, "Pyramid Search Margin (px)", default=32, extra_arg=[0, None])
+        self.pyramid_margin.set_comment("Margin added around the predicted overlap of the images when refining the "
+                                        "alignment at each pyramid level, in pixels of that level.")
+
+        self.pipelined = add(BoolConfigItem, "Prepare Image 1 While Focusing", default=False)
+        self.pipelined.set_comment("If this option is enabled the formulatrix image is read, rescaled and (for "
+                                   "feature matching) has its features detected in a separate thread while the "
+                                   "beamline stack is focused, as none of this needs the beamline image.")
+
         self.pixel_size_1 = add(RangeFloatConfigItem, "Pixel Size 1 (um)", default=1.0, extra_arg=[0.01, None])
         self.pixel_size_1.set_comment("The real size (in micrometers) represented by a single pixel in Image 1 (the "
                                       "formulatrix image).")
@@ -58,4 +97,18 @@ class AlignConfig(Config):
                                            "then the fit is considered to have failed totally, i.e. the images are "
                                            "completely dissimilar.")
 
+        self.metric_stride = add(RangeIntConfigItem, "Metric Sample Stride", default=1, extra_arg=[1, 64])
+        self.metric_stride.set_comment("If more than 1, the alignment metric is estimated from every n-th pixel of "
+                                       "every n-th row of the overlap of the images. The estimate is used when it is "
+                                       "clearly above or below each of the metric limits, so the alignment status "
+                                       "is the same; when it is close to a limit the full metric is calculated. The "
+                                       "reported metric is then an estimate. 1 always calculates the full metric.")
+
         self.initialize_from_file()
+
+    def scale_pixel_sizes(self, scale):
+        """ The pixel sizes of the two images for a scale given with a match (see MatchRequest), limited in the same
+        way as the scale_override.
+        :param scale: tuple of the format ([formulatrix image pixel size], [beam line image pixel size])
+        """
+        return self.pixel_size_1.clean(scale[0]), self.pixel_size_2.clean(scale[1])
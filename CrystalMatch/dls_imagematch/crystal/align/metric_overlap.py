@@ -1,12 +1,17 @@
 from __future__ import division
 
+import math
+
 import cv2
-import numpy as np
 
 from CrystalMatch.dls_imagematch.crystal.align.overlay import Overlayer
 
 
 class OverlapMetric:
+    # An estimate is only used if it is at least this many standard errors from the limits
+    CONFIDENCE_Z = 3.0
+    # Estimates from fewer sampled pixels are not used
+    MIN_SAMPLES = 1000
 
     def __init__(self, image1, image2, metric_upper_limit):
         self.image1 = image1
@@ -27,6 +32,35 @@ class OverlapMetric:
         if absdiff_image is None:
             # The match has failed - return a value above the upper limit for the metric
             return self._metric_upper_limit + 10
-        metric = np.sum(absdiff_image) / absdiff_image.size
+        metric = sum(cv2.sumElems(absdiff_image)) / absdiff_image.size
 
         return metric
+
+    def calculate_overlap_metric_fast(self, offset, stride, limits):
+        """ Same as calculate_overlap_metric() but the metric is first estimated from a sample of the pixels (see
+        estimate_overlap_metric()). The estimate is returned if it is clearly on one side of each of the limits, so
+        it gives the same classification of the alignment as the full metric; otherwise the full metric is
+        calculated. """
+        estimate, bound = self.estimate_overlap_metric(offset, stride)
+        if bound is not None and any(abs(estimate - limit) <= bound for limit in limits):
+            return self.calculate_overlap_metric(offset)
+
+        return estimate
+
+    def estimate_overlap_metric(self, offset, stride):
+        """ Estimate the metric from every stride-th pixel of every stride-th row of the region of overlap. Returns
+        the estimate and the confidence bound on it (CONFIDENCE_Z standard errors, treating the sampled pixels as
+        independent). If fewer than MIN_SAMPLES pixels could be sampled the full metric is returned instead, with a
+        bound of None. """
+        cr1, cr2 = Overlayer.get_overlap_regions(self.image1, self.image2, offset)
+        width, height = cr1.width() // stride, cr1.height() // stride
+        if width * height < self.MIN_SAMPLES:
+            return self.calculate_overlap_metric(offset), None
+
+        sample1 = cv2.resize(cr1.raw(), (width, height), interpolation=cv2.INTER_NEAREST)
+        sample2 = cv2.resize(cr2.raw(), (width, height), interpolation=cv2.INTER_NEAREST)
+        means, std_devs = cv2.meanStdDev(cv2.absdiff(sample1, sample2))
+
+        estimate = float(means.mean())
+        bound = self.CONFIDENCE_Z * float(std_devs.max()) / math.sqrt(width * height)
+        return estimate, bound
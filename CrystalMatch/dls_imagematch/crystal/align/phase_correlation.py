@@ -0,0 +1,58 @@
+from __future__ import division
+
+import cv2
+import numpy as np
+
+from CrystalMatch.dls_util.shape import Point
+
+
+class PhaseCorrelation:
+    """ Finds the translation between two images from the peak of their phase correlation (the inverse Fourier
+    transform of the normalized cross power spectrum). Unlike feature matching the result is deterministic and
+    does not depend on the images having distinctive features, but it can only find a translation.
+
+    The images may be different sizes: each is tapered to zero at its edges (Hanning window), so the edges don't
+    correlate, and padded to a common size.
+    """
+    def __init__(self, image1, image2):
+        """
+        :param image1: the first (mono) image
+        :param image2: the second (mono) image, with the same resolution as the first
+        """
+        self._image1 = image1
+        self._image2 = image2
+
+    def calculate(self):
+        """ The translation which maps a point in image 1 onto image 2 and the response of the correlation peak,
+        the fraction of the correlation in the peak - close to 1 for a clear match and close to 0 when the images
+        don't match. """
+        height1, width1 = self._image1.raw().shape[:2]
+        height2, width2 = self._image2.raw().shape[:2]
+        size = (cv2.getOptimalDFTSize(max(width1, width2)), cv2.getOptimalDFTSize(max(height1, height2)))
+
+        padded1 = self._windowed(self._image1.raw(), size)
+        padded2 = self._windowed(self._image2.raw(), size)
+        (dx, dy), response = cv2.phaseCorrelate(padded1, padded2)
+
+        # The correlation is periodic - choose the shift for which the images overlap the most
+        x = self._unwrap(dx, size[0], width1, width2)
+        y = self._unwrap(dy, size[1], height1, height2)
+        return Point(x, y), response
+
+    @staticmethod
+    def _windowed(image, size):
+        """ The image with its mean subtracted and tapered to zero at the edges, padded with zeros to the size. """
+        height, width = image.shape[:2]
+        window = cv2.createHanningWindow((width, height), cv2.CV_32F)
+        image = image.astype(np.float32)
+        image = cv2.multiply(cv2.subtract(image, float(cv2.mean(image)[0])), window)
+        return cv2.copyMakeBorder(image, 0, size[1] - height, 0, size[0] - width, cv2.BORDER_CONSTANT, value=0)
+
+    @staticmethod
+    def _unwrap(shift, period, length1, length2):
+        """ The shift, or the shift plus or minus the period, which gives the largest overlap along the axis. """
+        def overlap(t):
+            # image 2 starts at -t in the coordinates of image 1
+            return min(length1, length2 - t) - max(0, -t)
+
+        return max([shift - period, shift, shift + period], key=overlap)
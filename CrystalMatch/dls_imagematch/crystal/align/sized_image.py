@@ -47,8 +47,8 @@ class SizedImage(Image):
         image = Image.rotate(self, angle, center)
         return self.from_image(image, self._pixel_size)
 
-    def to_mono(self):
-        image = Image.to_mono(self)
+    def _mono(self):
+        image = Image._mono(self)
         return self.from_image(image, self._pixel_size)
 
     def to_color(self):
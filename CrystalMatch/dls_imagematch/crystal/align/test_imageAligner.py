@@ -1,7 +1,10 @@
 from pkg_resources import require
 require("mock>=1.0.1")
+import logging
 from unittest import TestCase
 
+import cv2
+import numpy as np
 from mock import create_autospec, MagicMock, patch
 
 from CrystalMatch.dls_imagematch.crystal.align.aligned_images import AlignedImages
@@ -10,7 +13,11 @@ from CrystalMatch.dls_imagematch.crystal.align.exception import ImageAlignmentEr
 from CrystalMatch.dls_imagematch.crystal.align.sized_image import SizedImage
 from CrystalMatch.dls_imagematch.feature.detector.config import DetectorConfig
 from CrystalMatch.dls_imagematch.feature.detector.exception import FeatureDetectorError
+from CrystalMatch.dls_imagematch.feature.detector.opencv_detector_interface import OpencvDetectorInterface
+from CrystalMatch.dls_imagematch.feature.match import DescriptorMatcherType
+from CrystalMatch.dls_util.imaging import Image
 from CrystalMatch.dls_util.shape.point import Point
+from CrystalMatch.dls_util.shape.rectangle import Rectangle
 
 
 class TestImageAligner(TestCase):
@@ -23,9 +30,10 @@ class TestImageAligner(TestCase):
         align_config = MagicMock()
         align_config.pixel_size_1.value = MagicMock(return_value=image_1_pixel_size)
         align_config.pixel_size_2.value = MagicMock(return_value=image_2_pixel_size)
-        SizedImage.from_image = MagicMock()
-        SizedImage.from_image.side_effect = [image1, image2]
-        aligner = ImageAligner(image1, image2, align_config)
+        align_config.descriptor_matcher.value = MagicMock(return_value=DescriptorMatcherType.BRUTE_FORCE)
+        align_config.pyramid_levels.value = MagicMock(return_value=1)
+        with patch.object(SizedImage, "from_image", side_effect=[image1, image2]):
+            aligner = ImageAligner(image1, image2, align_config)
         return aligner, image1, image2
 
     def test_aligner_cannot_be_created_without_setting_config_file(self):
@@ -125,3 +133,169 @@ class TestImageAligner(TestCase):
         self.assertEqual(image2, aligned_images.image2)
         self.assertEqual(4, aligned_images._scale_factor)
         self.assertEqual(0.5, aligned_images.get_working_resolution())
+
+
+class TestPyramidAlignment(TestCase):
+    def setUp(self):
+        # other tests set the version to check the OpenCV 2 and 3 code paths
+        OpencvDetectorInterface.OPENCV_MAJOR = cv2.__version__[0]
+
+        # image 2 is a region of image 1, starting at (120, 70)
+        rng = np.random.RandomState(3)
+        texture = cv2.GaussianBlur(rng.randint(0, 255, (600, 800)).astype(np.uint8), (7, 7), 0)
+        self.image1 = Image(cv2.cvtColor(texture, cv2.COLOR_GRAY2BGR))
+        self.image2 = Image(cv2.cvtColor(texture[70:470, 120:520].copy(), cv2.COLOR_GRAY2BGR))
+
+    def _align(self, levels):
+        aligner = ImageAligner(self.image1, self.image2, _align_config(pyramid_levels=levels), _detector_config())
+        with patch("CrystalMatch.dls_imagematch.feature.detector.factory.DetectorFactory.create",
+                   side_effect=_create_default_detector):
+            return aligner.align()
+
+    def test_pyramid_gives_the_same_translation(self):
+        expected = self._align(1).pixel_offset()
+        self.assertEqual(expected, Point(-120, -70))
+        for levels in [2, 3]:
+            offset = self._align(levels).pixel_offset()
+            self.assertLessEqual(abs(offset.x - expected.x), 1)
+            self.assertLessEqual(abs(offset.y - expected.y), 1)
+
+    def test_pyramid_levels_halve_the_image(self):
+        pyramid = ImageAligner._build_pyramid(self.image1, 3)
+        self.assertEqual([image.size() for image in pyramid], [(800, 600), (400, 300), (200, 150)])
+
+    def test_predicted_overlap_includes_the_margin(self):
+        rect1, rect2 = ImageAligner._predicted_overlap(self.image1, self.image2, Point(-120, -70), 10)
+        self.assertEqual(rect1, Rectangle(Point(110, 60), Point(530, 480)))
+        self.assertEqual(rect2, Rectangle(Point(0, 0), Point(400, 400)))
+
+    def test_no_predicted_overlap(self):
+        self.assertEqual(ImageAligner._predicted_overlap(self.image1, self.image2, Point(-1000, 0), 10), (None, None))
+
+
+class TestPhaseCorrelationAlignment(TestCase):
+    def setUp(self):
+        OpencvDetectorInterface.OPENCV_MAJOR = cv2.__version__[0]
+        rng = np.random.RandomState(3)
+        texture = cv2.GaussianBlur(rng.randint(0, 255, (600, 800)).astype(np.uint8), (7, 7), 0)
+        self.image1 = Image(cv2.cvtColor(texture, cv2.COLOR_GRAY2BGR))
+        self.image2 = Image(cv2.cvtColor(texture[70:470, 120:520].copy(), cv2.COLOR_GRAY2BGR))
+
+    def _align(self, min_response):
+        align_config = _align_config(method=ImageAligner.PHASE_CORRELATION, min_response=min_response)
+        aligner = ImageAligner(self.image1, self.image2, align_config, _detector_config())
+        with patch("CrystalMatch.dls_imagematch.feature.detector.factory.DetectorFactory.create",
+                   side_effect=_create_default_detector):
+            return aligner.align()
+
+    def test_phase_correlation_alignment(self):
+        aligned = self._align(0.1)
+        self.assertEqual(aligned.method, "Phase correlation")
+        self.assertEqual(aligned.pixel_offset(), Point(-120, -70))
+        self.assertIsNone(aligned.feature_match_result)
+
+    def test_weak_response_falls_back_to_feature_matching(self):
+        aligned = self._align(1.0)
+        self.assertEqual(aligned.method, "Feature matching - ORB")
+        self.assertEqual(aligned.pixel_offset(), Point(-120, -70))
+
+
+class TestPreparedImage1(TestCase):
+    def setUp(self):
+        OpencvDetectorInterface.OPENCV_MAJOR = cv2.__version__[0]
+        rng = np.random.RandomState(3)
+        texture = cv2.GaussianBlur(rng.randint(0, 255, (600, 800)).astype(np.uint8), (7, 7), 0)
+        self.image1 = Image(cv2.cvtColor(texture, cv2.COLOR_GRAY2BGR))
+        self.image2 = Image(cv2.cvtColor(texture[70:470, 120:520].copy(), cv2.COLOR_GRAY2BGR))
+
+    def _align(self, align_config, prepared_image1=None):
+        with patch("CrystalMatch.dls_imagematch.feature.detector.factory.DetectorFactory.create",
+                   side_effect=_create_default_detector):
+            aligner = ImageAligner(self.image1, self.image2, align_config, _detector_config(),
+                                   prepared_image1=prepared_image1)
+            return aligner.align()
+
+    def _prepare(self, align_config):
+        with patch("CrystalMatch.dls_imagematch.feature.detector.factory.DetectorFactory.create",
+                   side_effect=_create_default_detector):
+            return ImageAligner.prepare_image_1(self.image1, align_config, _detector_config())
+
+    def test_prepared_image_gives_the_same_alignment(self):
+        for levels in [1, 2]:
+            align_config = _align_config(pyramid_levels=levels)
+            prepared = self._prepare(align_config)
+            self.assertEqual(self._align(align_config, prepared).pixel_offset(),
+                             self._align(align_config).pixel_offset())
+
+    def test_features_of_prepared_image_are_not_detected_again(self):
+        from CrystalMatch.dls_imagematch.feature.detector.detector_orb import OrbDetector
+        align_config = _align_config()
+        prepared = self._prepare(align_config)
+        detect_features = OrbDetector.detect_features
+        with patch.object(OrbDetector, "detect_features", autospec=True, side_effect=detect_features) as detect:
+            self._align(align_config, prepared)
+        detected_images = [call[0][1] for call in detect.call_args_list]
+        self.assertEqual(len(detected_images), 1)
+        self.assertIsNot(detected_images[0], prepared.to_mono())
+
+    def test_prepared_image_is_rescaled(self):
+        align_config = _align_config()
+        align_config.pixel_size_1.value = MagicMock(return_value=1.0)
+        align_config.pixel_size_2.value = MagicMock(return_value=2.0)
+        prepared = self._prepare(align_config)
+        self.assertEqual(prepared.size(), (400, 300))
+        self.assertEqual(prepared.pixel_size(), 2.0)
+
+    def test_pixel_sizes_are_used_in_place_of_the_configuration(self):
+        align_config = _align_config()
+        with patch("CrystalMatch.dls_imagematch.feature.detector.factory.DetectorFactory.create",
+                   side_effect=_create_default_detector):
+            prepared = ImageAligner.prepare_image_1(self.image1, align_config, _detector_config(),
+                                                    pixel_sizes=(1.0, 2.0))
+        self.assertEqual(prepared.size(), (400, 300))
+        self.assertEqual(prepared.pixel_size(), 2.0)
+
+        aligner = ImageAligner(self.image1, self.image2, align_config, pixel_sizes=(1.0, 2.0))
+        self.assertEqual(aligner._resolution, 2.0)
+        self.assertEqual(aligner._scale_factor, 0.5)
+
+    def test_rescaling_is_logged_the_same_when_prepared(self):
+        align_config = _align_config()
+        align_config.pixel_size_2.value = MagicMock(return_value=2.0)
+        rescale_messages = []
+        for prepare in [False, True]:
+            with patch.object(logging.Logger, "info") as log_info:
+                if prepare:
+                    self._prepare(align_config)
+                else:
+                    self._align(align_config)
+            rescale_messages.append([call[0] for call in log_info.call_args_list
+                                     if call[0][0].startswith("Rescaling image 1")])
+        self.assertEqual(len(rescale_messages[0]), 1)
+        self.assertEqual(rescale_messages[0], rescale_messages[1])
+
+
+def _align_config(pyramid_levels=1, method=ImageAligner.FEATURE_MATCHING, min_response=0.1):
+    align_config = MagicMock()
+    align_config.pixel_size_1.value = MagicMock(return_value=1.0)
+    align_config.pixel_size_2.value = MagicMock(return_value=1.0)
+    align_config.use_alignment.value = MagicMock(return_value=True)
+    align_config.align_method.value = MagicMock(return_value=method)
+    align_config.phase_min_response.value = MagicMock(return_value=min_response)
+    align_config.align_detector.value = MagicMock(return_value="ORB")
+    align_config.descriptor_matcher.value = MagicMock(return_value=DescriptorMatcherType.BRUTE_FORCE)
+    align_config.pyramid_levels.value = MagicMock(return_value=pyramid_levels)
+    align_config.pyramid_margin.value = MagicMock(return_value=32)
+    align_config.metric_stride.value = MagicMock(return_value=1)
+    return align_config
+
+
+def _detector_config():
+    detector_config = MagicMock()
+    detector_config.get_detector_options.return_value = None
+    return detector_config
+
+
+def _create_default_detector(det_type, options=None):
+    from CrystalMatch.dls_imagematch.feature.detector.detector_orb import OrbDetector
+    return OrbDetector()
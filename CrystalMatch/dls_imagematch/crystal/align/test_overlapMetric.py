@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from CrystalMatch.dls_imagematch.crystal.align.metric_overlap import OverlapMetric
+from CrystalMatch.dls_util.imaging import Image
+from CrystalMatch.dls_util.shape import Point
+
+
+class TestOverlapMetric(TestCase):
+    def setUp(self):
+        # image 2 is a noisy copy of a region of image 1, starting at (40, 30)
+        rng = np.random.RandomState(5)
+        texture = cv2.GaussianBlur(rng.randint(0, 255, (400, 500, 3)).astype(np.uint8), (5, 5), 0)
+        noise = rng.randint(0, 20, (300, 300, 3)).astype(np.uint8)
+        self.image1 = Image(texture)
+        self.image2 = Image(cv2.add(texture[30:330, 40:340], noise))
+        self.metric = OverlapMetric(self.image1, self.image2, 40.0)
+
+    def test_metric_is_the_mean_absolute_difference(self):
+        diff = np.abs(self.image1.raw()[30:330, 40:340].astype(np.int32) - self.image2.raw().astype(np.int32))
+        self.assertAlmostEqual(self.metric.calculate_overlap_metric(Point(40, 30)), diff.mean())
+
+    def test_no_overlap_is_above_the_upper_limit(self):
+        self.assertEqual(self.metric.calculate_overlap_metric(Point(1000, 0)), 50.0)
+
+    def test_estimate_is_within_its_bound(self):
+        full = self.metric.calculate_overlap_metric(Point(40, 30))
+        for stride in [2, 4, 8]:
+            estimate, bound = self.metric.estimate_overlap_metric(Point(40, 30), stride)
+            self.assertLessEqual(abs(estimate - full), bound)
+
+    def test_fast_metric_uses_the_estimate_far_from_the_limits(self):
+        estimate, _ = self.metric.estimate_overlap_metric(Point(40, 30), 4)
+        self.assertEqual(self.metric.calculate_overlap_metric_fast(Point(40, 30), 4, [30.0, 40.0]), estimate)
+
+    def test_fast_metric_is_the_full_metric_near_a_limit(self):
+        full = self.metric.calculate_overlap_metric(Point(40, 30))
+        estimate, _ = self.metric.estimate_overlap_metric(Point(40, 30), 4)
+        self.assertEqual(self.metric.calculate_overlap_metric_fast(Point(40, 30), 4, [estimate, 40.0]), full)
+
+    def test_small_overlap_is_not_estimated(self):
+        full = self.metric.calculate_overlap_metric(Point(40, 30))
+        self.assertEqual(self.metric.estimate_overlap_metric(Point(40, 30), 64), (full, None))
+        self.assertEqual(self.metric.calculate_overlap_metric_fast(Point(40, 30), 64, [30.0, 40.0]), full)
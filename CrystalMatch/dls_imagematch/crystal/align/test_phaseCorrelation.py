@@ -0,0 +1,39 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from CrystalMatch.dls_imagematch.crystal.align.phase_correlation import PhaseCorrelation
+from CrystalMatch.dls_util.imaging import Image
+
+
+class TestPhaseCorrelation(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(3)
+        self.texture = cv2.GaussianBlur(rng.randint(0, 255, (600, 800)).astype(np.uint8), (7, 7), 0)
+        self.noise = rng.randint(0, 255, (400, 400)).astype(np.uint8)
+
+    def assertTranslation(self, expected, translation, tolerance=0.1):
+        self.assertLess(abs(translation.x - expected[0]), tolerance)
+        self.assertLess(abs(translation.y - expected[1]), tolerance)
+
+    def test_translation_of_a_region_of_the_image(self):
+        region = self.texture[70:470, 120:520].copy()
+        translation, response = PhaseCorrelation(Image(self.texture), Image(region)).calculate()
+
+        self.assertTranslation((-120, -70), translation)
+        self.assertGreater(response, 0.3)
+
+    def test_translation_is_reversed_when_the_images_are_swapped(self):
+        region = self.texture[70:470, 120:520].copy()
+        translation, _ = PhaseCorrelation(Image(region), Image(self.texture)).calculate()
+        self.assertTranslation((120, 70), translation)
+
+    def test_shift_beyond_half_the_image_is_unwrapped(self):
+        region = self.texture[50:350, 500:780].copy()
+        translation, _ = PhaseCorrelation(Image(self.texture), Image(region)).calculate()
+        self.assertTranslation((-500, -50), translation)
+
+    def test_unrelated_images_have_a_weak_response(self):
+        _, response = PhaseCorrelation(Image(self.texture), Image(self.noise)).calculate()
+        self.assertLess(response, 0.1)
@@ -1,8 +1,11 @@
 from os.path import join
 
 from CrystalMatch.dls_imagematch.feature import TransformCalculator
+from CrystalMatch.dls_imagematch.feature.match import DescriptorMatcherType
+from CrystalMatch.dls_imagematch.feature.detector import DetectorType
 from CrystalMatch.dls_util.config.config import Config
-from CrystalMatch.dls_util.config.item import BoolConfigItem, EnumConfigItem, RangeIntConfigItem, RangeFloatConfigItem
+from CrystalMatch.dls_util.config.item import BoolConfigItem, EnumConfigItem, RangeIntConfigItem, RangeFloatConfigItem, \
+    StringItem
 from CrystalMatch.dls_imagematch.crystal.match.matcher import CrystalMatcher
 
 
@@ -65,4 +68,59 @@ class CrystalMatchConfig(Config):
         self.transform_method.set_comment("Method to be used to generate the transform mapping the crystal in first "
                                           "image to its location in the second image.")
 
+        self.descriptor_matcher = add(EnumConfigItem, "Descriptor Matcher", default=DescriptorMatcherType.BRUTE_FORCE,
+                                      extra_arg=DescriptorMatcherType.LIST_ALL)
+        self.descriptor_matcher.set_comment("Method used to match the feature descriptors of the POI regions. 'Brute "
+                                            "Force' compares every pair of features; 'FLANN LSH' uses an approximate "
+                                            "nearest neighbour index; 'kNN Ratio Test' rejects features which match "
+                                            "more than one feature almost equally well.")
+
+        self.feature_index = add(BoolConfigItem, "Feature Index", default=False)
+        self.feature_index.set_comment("If this option is enabled the features of each whole image are detected once "
+                                       "(per detector) and the features of each POI region are looked up in them, "
+                                       "instead of running the detectors on the region of every POI. This is faster "
+                                       "when there are many POI. Detectors which limit the number of features (e.g. "
+                                       "ORB n_features) may need the limit raising, as it then applies to the whole "
+                                       "image.")
+
+        self.feature_index_margin = add(RangeIntConfigItem, "Feature Index Margin (px)", default=0,
+                                        extra_arg=[0, None])
+        self.feature_index_margin.set_comment("Features closer than this to the edge of a POI region are not used "
+                                              "when the feature index is enabled. Set it to the edge threshold of "
+                                              "the detectors to use the same features as detecting on the region.")
+
+        self.detector_cascade = add(BoolConfigItem, "Detector Cascade", default=False)
+        self.detector_cascade.set_comment("If this option is enabled the detectors are run one at a time for each POI "
+                                          "(in the cascade order) until the transform is good enough, instead of "
+                                          "running all of them. The transform is good enough when it has at least "
+                                          "the cascade minimum number of inliers with no more than the cascade "
+                                          "maximum mean error.")
+
+        self.cascade_order = add(StringItem, "Cascade Detector Order", default=", ".join(DetectorType.LIST_ALL))
+        self.cascade_order.set_comment("Comma separated list of the detectors to run when the detector cascade is "
+                                       "enabled, in the order they are run. Detectors which are not in the list "
+                                       "are not used.")
+
+        self.cascade_min_inliers = add(RangeIntConfigItem, "Cascade Min Inliers",
+                                       default=CrystalMatcher.DEFAULT_CASCADE_MIN_INLIERS, extra_arg=[1, None])
+        self.cascade_min_inliers.set_comment("Minimum number of good matches (RANSAC inliers) of a transform for the "
+                                             "detector cascade to stop.")
+
+        self.cascade_max_error = add(RangeFloatConfigItem, "Cascade Max Error (px)",
+                                     default=CrystalMatcher.DEFAULT_CASCADE_MAX_ERROR, extra_arg=[0.0, None])
+        self.cascade_max_error.set_comment("Maximum mean reprojection error of the good matches of a transform "
+                                           "for the detector cascade to stop.")
+
+        self.poi_threads = add(RangeIntConfigItem, "POI Threads", default=CrystalMatcher.DEFAULT_POI_THREADS,
+                               extra_arg=[1, None])
+        self.poi_threads.set_comment("Number of POI matched at the same time, each in a thread of its own. Set it "
+                                     "up to the number of cores when there are many POI. The results are the same "
+                                     "as matching the POI one at a time.")
+
+        self.concurrent_detectors = add(BoolConfigItem, "Concurrent Detectors", default=False)
+        self.concurrent_detectors.set_comment("If this option is enabled the detectors of each POI are run at the "
+                                              "same time, each in a thread of its own, so a POI takes about as "
+                                              "long as its slowest detector. The results are the same. It has no "
+                                              "effect when the detector cascade is enabled.")
+
         self.initialize_from_file()
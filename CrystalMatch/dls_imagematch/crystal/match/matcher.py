@@ -1,8 +1,16 @@
 from __future__ import division
 
+import logging
+import time
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+from CrystalMatch.dls_imagematch import logconfig
 from CrystalMatch.dls_focusstack.focus.point_fft_manager import PointFFTManager
 from CrystalMatch.dls_util.shape import Rectangle, Point
-from CrystalMatch.dls_imagematch.feature import BoundedFeatureMatcher
+from CrystalMatch.dls_imagematch.feature import BoundedFeatureMatcher, IndexedFeatureMatcher
+from CrystalMatch.dls_imagematch.feature.detector import FeatureIndex, DetectorType
+from CrystalMatch.dls_imagematch.feature.detector.factory import DetectorFactory
 from CrystalMatch.dls_imagematch.crystal.match.match import CrystalMatch
 from .results import CrystalMatcherResults
 
@@ -13,6 +21,9 @@ class CrystalMatcher:
     DEFAULT_HEIGHT = 400
     DEFAULT_VERTICAL_SHIFT = 0.75
     DEFAULT_Z_LEVEL_REGION_SIZE = 80
+    DEFAULT_CASCADE_MIN_INLIERS = 10
+    DEFAULT_CASCADE_MAX_ERROR = 2.0
+    DEFAULT_POI_THREADS = 1
 
     def __init__(self, aligned_images, detector_config, crystal_config=None):
         self._perform_poi_analysis = True
@@ -24,7 +35,16 @@ class CrystalMatcher:
         self._z_level_region_size_real = self.DEFAULT_Z_LEVEL_REGION_SIZE
         self._transform_method = None
         self._transform_filter = None
+        self._descriptor_matcher = None
         self._fft_images = None
+        self._use_feature_index = False
+        self._feature_index_margin = 0
+        self._feature_indexes = None
+        self._cascade_order = None
+        self._cascade_min_inliers = self.DEFAULT_CASCADE_MIN_INLIERS
+        self._cascade_max_error = self.DEFAULT_CASCADE_MAX_ERROR
+        self._poi_threads = self.DEFAULT_POI_THREADS
+        self._concurrent_detectors = False
 
         self._detector_config = detector_config
         if crystal_config is not None:
@@ -39,10 +59,57 @@ class CrystalMatcher:
         self._search_vertical_shift = config.vertical_shift.value()
         self._transform_method = config.transform_method.value()
         self._transform_filter = config.transform_filter.value()
+        self._descriptor_matcher = config.descriptor_matcher.value()
         self._z_level_region_size_real = config.z_level_region_size.value()
+        self._use_feature_index = config.feature_index.value()
+        self._feature_index_margin = config.feature_index_margin.value()
+        if config.detector_cascade.value():
+            order = [det.strip() for det in config.cascade_order.value().split(",") if det.strip() != ""]
+            self.set_detector_cascade(order, config.cascade_min_inliers.value(), config.cascade_max_error.value())
+        else:
+            self.set_detector_cascade(None)
+        self.set_poi_threads(config.poi_threads.value())
+        self.set_concurrent_detectors(config.concurrent_detectors.value())
 
     def set_detector_config(self, config):
         self._detector_config = config
+        self._feature_indexes = None
+
+    def set_use_feature_index(self, use_index, margin=0):
+        self._use_feature_index = use_index
+        self._feature_index_margin = margin
+
+    def set_detector_cascade(self, detector_order, min_inliers=DEFAULT_CASCADE_MIN_INLIERS,
+                             max_error=DEFAULT_CASCADE_MAX_ERROR):
+        """ Run the detectors in the given order for each POI until the transform is good enough (see
+        FeatureMatcher.set_use_detector_cascade()), instead of running all of them. None runs all the detectors.
+        An empty order runs the cascade with every detector (DetectorType.LIST_ALL). """
+        if detector_order is not None:
+            detector_order = self._check_cascade_order(detector_order)
+        self._cascade_order = detector_order
+        self._cascade_min_inliers = min_inliers
+        self._cascade_max_error = max_error
+
+    def _check_cascade_order(self, detector_order):
+        unknown = [det for det in detector_order if det not in DetectorType.LIST_ALL]
+        if unknown:
+            raise ValueError("Unknown detector in the Cascade Detector Order: {}. The detectors are: {}"
+                             .format(", ".join(unknown), ", ".join(DetectorType.LIST_ALL)))
+        if len(detector_order) == 0:
+            log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
+            log.addFilter(logconfig.ThreadContextFilter())
+            log.warning("The Cascade Detector Order is empty - using all the detectors")
+            return list(DetectorType.LIST_ALL)
+        return list(detector_order)
+
+    def set_poi_threads(self, threads):
+        """ Match up to this many POI at the same time, each in a thread of its own. Most of the time matching a
+        POI is spent in OpenCV, which releases the GIL, so the threads run on separate cores. """
+        self._poi_threads = max(1, threads)
+
+    def set_concurrent_detectors(self, concurrent):
+        """ Run the detectors of each POI at the same time (when all the detectors are used, not the cascade). """
+        self._concurrent_detectors = concurrent
 
     def set_real_region_size(self, size):
         self._region_size_real = size
@@ -63,6 +130,9 @@ class CrystalMatcher:
     def set_transform_filter(self, filter_obj):
         self._transform_filter = filter_obj
 
+    def set_descriptor_matcher(self, matcher_type):
+        self._descriptor_matcher = matcher_type
+
     def set_fft_images_to_stack(self, fft_images):
         self._fft_images = fft_images
 
@@ -71,18 +141,54 @@ class CrystalMatcher:
         images = self._aligned_images
         match_results = CrystalMatcherResults(images)
 
+        if self._perform_poi_analysis and self._use_feature_index and len(image1_points) > 0:
+            self._build_feature_indexes()
+
+        results = self._match_points(image1_points)
+        #find z-level of all the points together
+        z_levels = PointFFTManager.find_z_levels_for_points(self._fft_images,
+                                                            [result.get_transformed_poi() for result in results],
+                                                            self._z_level_region_size_real)
+
         crystal_id = 1
-        for point in image1_points:
-            result = self._match_single_point(point)
-            #find z-level
-            z_level = PointFFTManager(self._fft_images, result.get_transformed_poi(), self._z_level_region_size_real).find_z_level_for_point()
+        for result, z_level in zip(results, z_levels):
             result.set_poi_z_level(z_level)
             result.print_to_log(crystal_id=crystal_id)
             match_results.append_match(result)
             crystal_id += 1
 
+        if self._perform_poi_analysis and len(results) > 0:
+            self._log_detector_contributions(results)
+
         return match_results
 
+    def _match_points(self, image1_points):
+        """ Match each of the points - in a pool of threads if there is more than one POI thread. The results are
+        in the order of the points. """
+        start = time.time()
+        threads = min(self._poi_threads, len(image1_points))
+        if threads > 1:
+            # Convert the images first, so the threads share the cached mono images
+            self._aligned_images.image1.to_mono()
+            self._aligned_images.image2.to_mono()
+            pool = ThreadPool(threads)
+            try:
+                timed_results = pool.map(self._match_single_point_timed, image1_points)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            timed_results = [self._match_single_point_timed(point) for point in image1_points]
+
+        if self._perform_poi_analysis and len(image1_points) > 0:
+            self._log_poi_times([poi_time for _, poi_time in timed_results], max(threads, 1), time.time() - start)
+        return [result for result, _ in timed_results]
+
+    def _match_single_point_timed(self, point):
+        start = time.time()
+        result = self._match_single_point(point)
+        return result, time.time() - start
+
     def _match_single_point(self, point):
         crystal_match = CrystalMatch(point, self._aligned_images, perform_poi=self._perform_poi_analysis)
 
@@ -91,24 +197,97 @@ class CrystalMatcher:
             image1_rect = self.make_target_region(crystal_match.get_poi_image_1())
             image2_rect = self.make_search_region(crystal_match.get_poi_image_2_pre_match())
 
-            feature_matcher = BoundedFeatureMatcher(self._aligned_images.image1.to_mono(),
-                                                    self._aligned_images.image2.to_mono(),
-                                                    self._detector_config,
-                                                    image1_rect,
-                                                    image2_rect)
+            if self._use_feature_index:
+                feature_matcher = IndexedFeatureMatcher(self._aligned_images.image1.to_mono(),
+                                                        self._aligned_images.image2.to_mono(),
+                                                        self._detector_config,
+                                                        image1_rect,
+                                                        image2_rect,
+                                                        self._feature_indexes,
+                                                        self._feature_index_margin)
+            else:
+                feature_matcher = BoundedFeatureMatcher(self._aligned_images.image1.to_mono(),
+                                                        self._aligned_images.image2.to_mono(),
+                                                        self._detector_config,
+                                                        image1_rect,
+                                                        image2_rect)
 
             result = self._perform_match(feature_matcher)
             crystal_match.set_feature_match_result(result)
 
         return crystal_match
 
+    def _build_feature_indexes(self):
+        """ Detect the features of both whole images once for each detector, to be shared by all the POI. """
+        if self._feature_indexes is not None:
+            return
+
+        image1 = self._aligned_images.image1.to_mono()
+        image2 = self._aligned_images.image2.to_mono()
+        indexes = {}
+        for detector in DetectorFactory.get_all_detectors(self._detector_config):
+            indexes[detector.detector_name()] = (FeatureIndex.from_image(detector, image1),
+                                                 FeatureIndex.from_image(detector, image2))
+        self._feature_indexes = indexes
+
     def _perform_match(self, feature_matcher):
-        feature_matcher.set_use_all_detectors()
+        if self._cascade_order is not None:
+            feature_matcher.set_use_detector_cascade(self._cascade_order, self._cascade_min_inliers,
+                                                     self._cascade_max_error)
+        else:
+            feature_matcher.set_use_all_detectors(concurrent=self._concurrent_detectors)
         feature_matcher.set_transform_method(self._transform_method)
         feature_matcher.set_transform_filter(self._transform_filter)
+        feature_matcher.set_descriptor_matcher(self._descriptor_matcher)
 
         return feature_matcher.match()
 
+    def _log_detector_contributions(self, results):
+        """ Log the totals for each detector over all the POI: how many times it was run, the matches and good
+        matches it found, the time taken and (for the cascade) how many times it was the last detector run. These
+        are used to choose the order of the detector cascade. """
+        totals = OrderedDict()
+        for result in results:
+            contributions = result.feature_match_result().detector_contributions()
+            for i, contribution in enumerate(contributions):
+                total = totals.setdefault(contribution['detector'], {'runs': 0, 'matches': 0, 'good_matches': 0,
+                                                                     'time': 0.0, 'last': 0})
+                total['runs'] += 1
+                total['matches'] += contribution['matches']
+                total['good_matches'] += contribution['good_matches']
+                total['time'] += contribution['time']
+                if self._cascade_order is not None and i == len(contributions) - 1:
+                    total['last'] += 1
+
+        log = logging.getLogger(".".join([__name__]))
+        log.addFilter(logconfig.ThreadContextFilter())
+        extra = {'detector_contributions': totals}
+        log = logging.LoggerAdapter(log, extra)
+        log.info("Detector contributions: " + ", ".join("{} {}/{}".format(name, total['good_matches'],
+                                                                          total['matches'])
+                                                        for name, total in totals.items()))
+        log.debug(extra)
+
+    @staticmethod
+    def _log_poi_times(poi_times, threads, wall_time):
+        """ Log the time taken to match the POI: the wall time, the total of the times of the individual POI and
+        the parallel efficiency - the fraction of the time of the threads spent matching (1.0 when the POI are
+        matched one at a time). With more threads than free cores the POI times include waiting for a core, so
+        compare the wall times of runs to see the real speed-up. """
+        poi_time = sum(poi_times)
+        efficiency = poi_time / (wall_time * threads) if wall_time > 0 else 1.0
+        log = logging.getLogger(".".join([__name__]))
+        log.addFilter(logconfig.ThreadContextFilter())
+        extra = {'poi_count': len(poi_times),
+                 'poi_threads': threads,
+                 'poi_wall_time': wall_time,
+                 'poi_total_time': poi_time,
+                 'poi_parallel_efficiency': efficiency}
+        log = logging.LoggerAdapter(log, extra)
+        log.info("POI matching took {:.3f}s for {} POI ({} threads, parallel efficiency {:.2f})".format(
+            wall_time, len(poi_times), threads, efficiency))
+        log.debug(extra)
+
     def make_target_region(self, center):
         size = self._region_size_pixels()
         return Rectangle.from_center(center, size, size)
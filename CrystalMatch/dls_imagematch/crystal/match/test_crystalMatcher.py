@@ -0,0 +1,106 @@
+import random
+import shutil
+import tempfile
+import threading
+import time
+from os.path import join, dirname, abspath
+from unittest import TestCase
+
+import cv2
+from mock import MagicMock, patch
+
+from CrystalMatch.dls_imagematch.crystal.align.aligned_images import AlignedImages
+from CrystalMatch.dls_imagematch.crystal.match.matcher import CrystalMatcher
+from CrystalMatch.dls_imagematch.feature.detector import DetectorType
+from CrystalMatch.dls_imagematch.feature.detector.config import DetectorConfig
+from CrystalMatch.dls_imagematch.feature.detector.opencv_detector_interface import OpencvDetectorInterface
+from CrystalMatch.dls_util.imaging import Image
+from CrystalMatch.dls_util.shape import Point
+
+RESOURCES = join(dirname(abspath(__file__)), "..", "..", "..", "..", "system-tests", "resources")
+
+
+def _align_config():
+    align_config = MagicMock()
+    align_config.metric_limit_low.value.return_value = 0
+    align_config.metric_limit_high.value.return_value = 100
+    align_config.metric_stride.value.return_value = 1
+    return align_config
+
+
+class TestCrystalMatcherThreads(TestCase):
+    def setUp(self):
+        # other tests set the version to check the OpenCV 2 and 3 code paths
+        OpencvDetectorInterface.OPENCV_MAJOR = cv2.__version__[0]
+        self.config_dir = tempfile.mkdtemp()
+        image1 = Image.from_file(join(RESOURCES, "A01_1.jpg"))
+        image2 = Image.from_file(join(RESOURCES, "A01_2.jpg"))
+        self.aligned_images = AlignedImages(image1, image2, 1.0, 1.0, Point(-3, -1), _align_config())
+        self.points = [Point(x, y) for x in range(200, 1000, 200) for y in range(200, 800, 200)]
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir)
+
+    def _matcher(self, threads):
+        matcher = CrystalMatcher(self.aligned_images, DetectorConfig(self.config_dir))
+        matcher.set_detector_cascade([DetectorType.ORB])
+        matcher.set_poi_threads(threads)
+        return matcher
+
+    def test_threads_give_the_same_results_in_the_same_order(self):
+        sequential = self._matcher(1).match(self.points).get_matches()
+        threaded = self._matcher(4).match(self.points).get_matches()
+
+        self.assertEqual([match.get_poi_image_1() for match in threaded], self.points)
+        self.assertEqual([match.get_transformed_poi() for match in threaded],
+                         [match.get_transformed_poi() for match in sequential])
+        self.assertEqual([match.get_status().code for match in threaded],
+                         [match.get_status().code for match in sequential])
+
+    def test_results_are_in_input_order_when_threads_finish_out_of_order(self):
+        matcher = self._matcher(4)
+        thread_names = set()
+        original = matcher._match_single_point
+
+        def slow_match(point):
+            thread_names.add(threading.current_thread().name)
+            time.sleep(random.uniform(0, 0.02))
+            return original(point)
+
+        with patch.object(matcher, "_match_single_point", side_effect=slow_match):
+            matches = matcher.match(self.points).get_matches()
+
+        self.assertEqual([match.get_poi_image_1() for match in matches], self.points)
+        self.assertGreater(len(thread_names), 1)
+
+    def test_crystal_ids_follow_the_input_order(self):
+        with patch("CrystalMatch.dls_imagematch.crystal.match.match.CrystalMatch.print_to_log") as print_to_log:
+            self._matcher(4).match(self.points)
+        self.assertEqual([call[1]['crystal_id'] for call in print_to_log.call_args_list],
+                         list(range(1, len(self.points) + 1)))
+
+
+class TestCrystalMatcherCascadeOrder(TestCase):
+    def setUp(self):
+        self.matcher = CrystalMatcher(None, None)
+
+    def _crystal_config(self, order):
+        config = MagicMock()
+        config.detector_cascade.value.return_value = True
+        config.cascade_order.value.return_value = order
+        config.poi_threads.value.return_value = 1
+        return config
+
+    def test_unknown_detector_is_a_config_error(self):
+        with self.assertRaises(ValueError) as context:
+            self.matcher.set_from_crystal_config(self._crystal_config("ORB, NOT_A_DETECTOR"))
+        self.assertIn("NOT_A_DETECTOR", str(context.exception))
+
+    def test_empty_order_uses_all_the_detectors(self):
+        for order in ["", " , "]:
+            self.matcher.set_from_crystal_config(self._crystal_config(order))
+            self.assertEqual(self.matcher._cascade_order, DetectorType.LIST_ALL)
+
+    def test_order_is_kept(self):
+        self.matcher.set_from_crystal_config(self._crystal_config("FAST, ORB"))
+        self.assertEqual(self.matcher._cascade_order, [DetectorType.FAST, DetectorType.ORB])
@@ -1,3 +1,5 @@
 from CrystalMatch.dls_imagematch.feature.detector.detector_types import DetectorType, ExtractorType
 from CrystalMatch.dls_imagematch.feature.detector.detector import Detector
 from CrystalMatch.dls_imagematch.feature.detector.config import DetectorConfig
+from CrystalMatch.dls_imagematch.feature.detector.feature_index import FeatureIndex
+from CrystalMatch.dls_imagematch.feature.detector.feature_set import FeatureSet
@@ -3,7 +3,7 @@ import logging
 from CrystalMatch.dls_imagematch import logconfig
 from CrystalMatch.dls_imagematch.feature.detector.opencv_detector_interface import OpencvDetectorInterface
 from CrystalMatch.dls_imagematch.feature.detector.detector_types import DetectorType, AdaptationType, ExtractorType
-from CrystalMatch.dls_imagematch.feature.detector.feature import Feature
+from CrystalMatch.dls_imagematch.feature.detector.feature_set import FeatureSet
 from CrystalMatch.dls_imagematch.feature.detector.exception import FeatureDetectorError
 
 
@@ -31,6 +31,7 @@ class Detector:
         self._extractor_name = self.DEFAULT_EXTRACTOR
         self._normalization = self._default_normalization()
         self._keypoint_limit = self.DEFAULT_KEYPOINT_LIMIT
+        self._instance_pool = None
 
     # -------- ACCESSORS -----------------------
 
@@ -72,28 +73,57 @@ class Detector:
         self.set_extractor(config.extractor.value())
         self.set_keypoint_limit(config.keypoint_limit.value())
 
+    def set_instance_pool(self, pool):
+        """ Share the OpenCV detector and extractor objects through the DetectorInstancePool instead of
+        creating them for every detection. """
+        self._instance_pool = pool
+
     # -------- FUNCTIONALITY -------------------
     def detect_features(self, image):
         """ Detect interesting features in the image and generate descriptors. A keypoint identifies the
         location and orientation of a feature, and a descriptor is a vector of numbers that describe the
         various attributes of the feature. By generating descriptors, we can compare the set of features
         on two images and find matches between them.
+        :return: FeatureSet of the features
         """
-        detector = self._create_detector()
+        pool = self._instance_pool
+        if pool is None:
+            return self._detect_features(image, self._create_detector(), self._create_extractor())
+
+        detector_key, extractor_key = self._detector_key(), self._extractor_key()
+        detector = pool.acquire(detector_key, self._create_detector)
+        extractor = pool.acquire(extractor_key, self._create_extractor)
+        try:
+            return self._detect_features(image, detector, extractor)
+        finally:
+            pool.release(detector_key, detector)
+            pool.release(extractor_key, extractor)
+
+    def detect_features_cached(self, image):
+        """ The same as detect_features(), but the features are kept with the image (see Image.cached()), so
+        detecting with the same configuration on the same image again returns the same FeatureSet - e.g. features
+        detected in advance, before the image they are matched against is available. """
+        key = ("features",) + self._detector_key() + self._extractor_key()
+        return image.cached(key, self.detect_features)
 
+    @staticmethod
+    def _detect_features(image, detector, extractor):
         keypoints = detector.detect(image.raw(), None)
-        extractor = self._create_extractor() # not good creates an object which is not always used
         keypoints, descriptors = OpencvDetectorInterface().compute(image.raw(), keypoints, extractor, detector)
 
-        features = []
-        if descriptors is None:
-            return features
+        return FeatureSet.from_cv2(keypoints, descriptors)
+
+    def _detector_key(self):
+        """ Identifies the OpenCV detector made by _create_detector() - detectors with the same key are
+        interchangeable. """
+        return (self.__class__.__name__, self._detector_name, self._adaptation) + self._detector_parameters()
 
-        for kp, descriptor in zip(keypoints, descriptors):
-            feature = Feature(kp, descriptor)
-            features.append(feature)
+    def _extractor_key(self):
+        return "extractor", self._extractor_name, self._detector_name
 
-        return features
+    def _detector_parameters(self):
+        """ The settings passed to the OpenCV detector by _create_detector(). """
+        return ()
 
     def _create_detector(self):
 
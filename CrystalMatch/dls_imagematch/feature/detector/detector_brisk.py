@@ -49,6 +49,9 @@ class BriskDetector(Detector):
         self.set_pattern_scale(config.pattern_scale.value())
 
     # -------- FUNCTIONALITY -------------------
+    def _detector_parameters(self):
+        return self._thresh, self._octaves, self._pattern_scale
+
     def _create_detector(self):
         constructor = OpencvDetectorInterface().brisk_constructor()
         detector = constructor(thresh=self._thresh,
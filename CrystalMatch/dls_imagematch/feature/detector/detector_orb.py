@@ -137,6 +137,10 @@ class OrbDetector(Detector):
         self.set_patch_size(config.patch_size.value())
 
     # -------- FUNCTIONALITY -------------------
+    def _detector_parameters(self):
+        return (self._n_features, self._scale_factor, self._n_levels, self._edge_threshold, self._first_level,
+                self._wta_k, self._score_type, self._patch_size)
+
     def _create_detector(self):
         constructor = OpencvDetectorInterface().orb_constructor()
 
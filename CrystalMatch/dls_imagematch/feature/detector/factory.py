@@ -4,9 +4,13 @@ from CrystalMatch.dls_imagematch.feature.detector.detector_types import Detector
 from CrystalMatch.dls_imagematch.feature.detector.detector import Detector
 from CrystalMatch.dls_imagematch.feature.detector.detector_orb import OrbDetector
 from CrystalMatch.dls_imagematch.feature.detector.detector_brisk import BriskDetector
+from CrystalMatch.dls_imagematch.feature.detector.instance_pool import DetectorInstancePool
 
 
 class DetectorFactory:
+    # OpenCV detector and extractor objects shared by all the detectors made by the factory
+    INSTANCE_POOL = DetectorInstancePool()
+
     def __init__(self):
         pass
 
@@ -26,6 +30,7 @@ class DetectorFactory:
             detector_options = options.get_detector_options(det_type)
             detector.set_from_config(detector_options)
 
+        detector.set_instance_pool(DetectorFactory.INSTANCE_POOL)
         return detector
 
     @staticmethod
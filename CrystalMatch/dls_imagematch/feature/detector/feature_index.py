@@ -0,0 +1,69 @@
+from __future__ import division
+
+import numpy as np
+
+
+class FeatureIndex:
+    """ The features detected in a whole image, held in a grid of square cells so that the features inside
+    any rectangle of the image can be found without detecting them again.
+
+    This lets many overlapping regions of the same image (e.g. the regions around each point of interest) share
+    one detection per detector.
+    """
+    DEFAULT_CELL_SIZE = 64
+
+    def __init__(self, features, cell_size=DEFAULT_CELL_SIZE):
+        """ :param features: FeatureSet of the features of the image """
+        self._features = features
+        self._cell_size = cell_size
+
+        points = features.points()
+        self._xs = points[:, 0]
+        self._ys = points[:, 1]
+
+        # Group the feature indices by cell - a stable sort keeps them in detection order within each cell
+        columns = (self._xs // cell_size).astype(int)
+        rows = (self._ys // cell_size).astype(int)
+        order = np.lexsort((rows, columns))
+        cells = np.column_stack((columns[order], rows[order]))
+        starts = np.flatnonzero(np.any(np.diff(cells, axis=0) != 0, axis=1)) + 1
+        starts = np.concatenate(([0], starts)) if len(order) > 0 else starts
+        ends = np.append(starts[1:], len(order))
+        self._cells = dict(((int(cells[s, 0]), int(cells[s, 1])), order[s:e]) for s, e in zip(starts, ends))
+
+    @staticmethod
+    def from_image(detector, image, cell_size=DEFAULT_CELL_SIZE):
+        """ Detect the features of the whole image with the detector and index them. """
+        return FeatureIndex(detector.detect_features(image), cell_size)
+
+    def features(self):
+        return self._features
+
+    def __len__(self):
+        return len(self._features)
+
+    def query(self, rect, margin=0):
+        """ FeatureSet of the features whose points are inside the rectangle, in the order they were detected.
+        :param rect: Rectangle in image coordinates - as for an image crop, the left and top edges are included
+        and the right and bottom edges are not.
+        :param margin: only features at least this far inside the rectangle are returned. A detector run on a crop
+        of the image does not find features close to the edge of the crop, setting the margin to the width of
+        that border (e.g. the ORB edge threshold) gives the same set of features as detecting on the crop.
+        """
+        x1, y1 = rect.x1 + margin, rect.y1 + margin
+        x2, y2 = rect.x2 - margin, rect.y2 - margin
+        if x2 <= x1 or y2 <= y1 or len(self._features) == 0:
+            return self._features.subset(np.zeros(0, dtype=int))
+
+        size = self._cell_size
+        candidates = [self._cells[(column, row)]
+                      for column in range(int(x1 // size), int((x2 - 1e-9) // size) + 1)
+                      for row in range(int(y1 // size), int((y2 - 1e-9) // size) + 1)
+                      if (column, row) in self._cells]
+        if len(candidates) == 0:
+            return self._features.subset(np.zeros(0, dtype=int))
+
+        indices = np.concatenate(candidates)
+        xs, ys = self._xs[indices], self._ys[indices]
+        inside = indices[(xs >= x1) & (xs < x2) & (ys >= y1) & (ys < y2)]
+        return self._features.subset(np.sort(inside))
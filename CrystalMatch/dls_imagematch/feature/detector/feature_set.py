@@ -0,0 +1,78 @@
+import cv2
+import numpy as np
+
+from CrystalMatch.dls_imagematch.feature.detector.feature import Feature
+
+
+class FeatureSet:
+    """ The features detected in an image, held as arrays rather than as one object per feature.
+
+    The keypoints are a structured array with the fields of KEYPOINT_DTYPE (one row per feature) and the
+    descriptors are a contiguous matrix with one row per feature (uint8 for the binary extractors, which are
+    matched with the Hamming norm). The matcher works on the arrays directly; indexing or iterating the set gives
+    Feature objects, which are only created when they are asked for.
+    """
+    KEYPOINT_DTYPE = np.dtype([('x', np.float32), ('y', np.float32), ('size', np.float32),
+                               ('angle', np.float32), ('response', np.float32), ('octave', np.int32)])
+
+    def __init__(self, keypoints, descriptors):
+        self._keypoints = keypoints
+        self._descriptors = descriptors
+
+    @staticmethod
+    def from_cv2(keypoints, descriptors):
+        """ Create a set from the keypoints and descriptors returned by the OpenCV detectors and extractors. """
+        if descriptors is None or len(keypoints) == 0:
+            return FeatureSet.empty()
+
+        rows = [(kp.pt[0], kp.pt[1], kp.size, kp.angle, kp.response, kp.octave) for kp in keypoints]
+        return FeatureSet(np.array(rows, dtype=FeatureSet.KEYPOINT_DTYPE), np.ascontiguousarray(descriptors))
+
+    @staticmethod
+    def empty():
+        return FeatureSet(np.zeros(0, dtype=FeatureSet.KEYPOINT_DTYPE), np.zeros((0, 0), dtype=np.uint8))
+
+    def __len__(self):
+        return len(self._keypoints)
+
+    def __getitem__(self, index):
+        """ Feature object for one of the features. """
+        row = self._keypoints[index]
+        keypoint = cv2.KeyPoint(float(row['x']), float(row['y']), float(row['size']), float(row['angle']),
+                                float(row['response']), int(row['octave']))
+        return Feature(keypoint, self._descriptors[index])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def keypoints(self):
+        """ Structured array of the keypoints, with the fields of KEYPOINT_DTYPE. """
+        return self._keypoints
+
+    def descriptors(self):
+        """ Matrix of the descriptors, one row per feature. """
+        return self._descriptors
+
+    def points(self):
+        """ Array of shape (n, 2) of the image coordinates of the features. """
+        return np.column_stack((self._keypoints['x'], self._keypoints['y'])).astype(np.float64)
+
+    def xs(self):
+        return self._keypoints['x']
+
+    def ys(self):
+        return self._keypoints['y']
+
+    def sizes(self):
+        return self._keypoints['size']
+
+    def angles(self):
+        return self._keypoints['angle']
+
+    def responses(self):
+        return self._keypoints['response']
+
+    def subset(self, indices):
+        """ New set of the features at the indices (or where the boolean mask is True), in that order. """
+        return FeatureSet(self._keypoints[indices], self._descriptors[indices])
@@ -0,0 +1,63 @@
+import logging
+import threading
+
+from CrystalMatch.dls_imagematch import logconfig
+
+
+class DetectorInstancePool:
+    """ Pool of the OpenCV detector and extractor objects used by Detector.detect_features(), so they are
+    created once for each configuration instead of on every detection.
+
+    Instances are keyed by the detector type and the values of its configuration (see Detector._detector_key()),
+    so detectors with different settings never share an instance. An OpenCV detector should not be used by two
+    threads at the same time, so an instance is taken out of the pool while it is in use (acquire) and put back
+    afterwards (release) - threads detecting at the same time get separate instances.
+    :param max_idle: most instances kept for each key, further released instances are dropped
+    """
+    DEFAULT_MAX_IDLE = 8
+
+    def __init__(self, max_idle=DEFAULT_MAX_IDLE):
+        self._max_idle = max_idle
+        self._idle = {}
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, key, factory):
+        """ An instance for the key - an idle one from the pool or, if there is none, a new one made by factory(). """
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self._hits += 1
+                return idle.pop()
+            self._misses += 1
+            hits, misses = self._hits, self._misses
+
+        log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
+        log.addFilter(logconfig.ThreadContextFilter())
+        log.debug("Creating detector instance for {} (pool hits: {}, misses: {})".format(key, hits, misses))
+        return factory()
+
+    def release(self, key, instance):
+        """ Return an instance from acquire() to the pool. """
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self._max_idle:
+                idle.append(instance)
+
+    def hits(self):
+        return self._hits
+
+    def misses(self):
+        return self._misses
+
+    def size(self):
+        """ Number of idle instances held by the pool. """
+        with self._lock:
+            return sum(len(idle) for idle in self._idle.values())
+
+    def clear(self):
+        with self._lock:
+            self._idle = {}
+            self._hits = 0
+            self._misses = 0
@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+import numpy as np
+from mock import Mock
+
+from CrystalMatch.dls_imagematch.feature.detector.feature_index import FeatureIndex
+from CrystalMatch.dls_imagematch.feature.detector.feature_set import FeatureSet
+from CrystalMatch.dls_util.shape import Point, Rectangle
+
+
+def _feature_set(points):
+    keypoints = np.zeros(len(points), dtype=FeatureSet.KEYPOINT_DTYPE)
+    keypoints['x'] = [x for x, _ in points]
+    keypoints['y'] = [y for _, y in points]
+    # the descriptor of each feature is its index, to identify the features returned by a query
+    descriptors = np.arange(len(points), dtype=np.int32).reshape(-1, 1)
+    return FeatureSet(keypoints, descriptors)
+
+
+def _ids(features):
+    return list(features.descriptors().reshape(-1))
+
+
+class TestFeatureIndex(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(3)
+        self.features = _feature_set(list(zip(rng.uniform(0, 500, 400), rng.uniform(0, 300, 400))))
+        self.points = self.features.points()
+        self.RECT_TEST_CASES = [Rectangle(Point(10, 20), Point(110, 120)),
+                                Rectangle(Point(63, 63), Point(129, 200)),
+                                Rectangle(Point(-50, -50), Point(30, 30)),
+                                Rectangle(Point(450, 250), Point(600, 400)),
+                                Rectangle(Point(0, 0), Point(500, 300)),
+                                Rectangle(Point(600, 0), Point(700, 100))]
+
+    def _brute_force(self, rect, margin):
+        return [i for i, (x, y) in enumerate(self.points)
+                if rect.x1 + margin <= x < rect.x2 - margin and rect.y1 + margin <= y < rect.y2 - margin]
+
+    def test_query_finds_same_features_as_brute_force(self):
+        index = FeatureIndex(self.features, cell_size=32)
+        for rect in self.RECT_TEST_CASES:
+            self.assertEqual(_ids(index.query(rect)), self._brute_force(rect, 0))
+
+    def test_query_with_margin_excludes_features_near_the_edge(self):
+        index = FeatureIndex(self.features)
+        for rect in self.RECT_TEST_CASES:
+            self.assertEqual(_ids(index.query(rect, margin=15)), self._brute_force(rect, 15))
+
+    def test_query_includes_top_left_edge_and_excludes_bottom_right_edge(self):
+        index = FeatureIndex(_feature_set([(10, 10), (20, 20), (19.5, 15)]), cell_size=8)
+        self.assertEqual(_ids(index.query(Rectangle(Point(10, 10), Point(20, 20)))), [0, 2])
+
+    def test_query_returns_features_in_detection_order(self):
+        index = FeatureIndex(_feature_set([(100, 100), (1, 1), (70, 2)]), cell_size=16)
+        self.assertEqual(_ids(index.query(Rectangle(Point(0, 0), Point(200, 200)))), [0, 1, 2])
+
+    def test_query_of_margin_larger_than_rect_is_empty(self):
+        index = FeatureIndex(self.features)
+        self.assertEqual(len(index.query(Rectangle(Point(10, 10), Point(30, 30)), margin=10)), 0)
+
+    def test_empty_index(self):
+        index = FeatureIndex(FeatureSet.empty())
+        self.assertEqual(len(index), 0)
+        self.assertEqual(len(index.query(Rectangle(Point(0, 0), Point(100, 100)))), 0)
+
+    def test_from_image_detects_features_once(self):
+        detector = Mock()
+        detector.detect_features.return_value = self.features
+        image = Mock()
+        index = FeatureIndex.from_image(detector, image)
+
+        index.query(self.RECT_TEST_CASES[0])
+        index.query(self.RECT_TEST_CASES[1])
+        detector.detect_features.assert_called_once_with(image)
+        self.assertIs(index.features(), self.features)
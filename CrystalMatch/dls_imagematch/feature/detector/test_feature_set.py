@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from CrystalMatch.dls_imagematch.feature.detector.feature_set import FeatureSet
+from CrystalMatch.dls_util.shape import Point
+
+
+def _feature_set(points):
+    keypoints = [cv2.KeyPoint(x, y, 7.0, 45.0, 0.5, 1) for x, y in points]
+    descriptors = np.arange(len(points) * 4, dtype=np.uint8).reshape(-1, 4)
+    return FeatureSet.from_cv2(keypoints, descriptors)
+
+
+class TestFeatureSet(TestCase):
+    def test_from_cv2_holds_keypoint_fields(self):
+        features = _feature_set([(1.5, 2.5), (3, 4)])
+        self.assertEqual(len(features), 2)
+        np.testing.assert_array_equal(features.points(), [[1.5, 2.5], [3, 4]])
+        np.testing.assert_array_equal(features.sizes(), [7, 7])
+        np.testing.assert_array_equal(features.responses(), [0.5, 0.5])
+        self.assertEqual(features.descriptors().dtype, np.uint8)
+        self.assertTrue(features.descriptors().flags['C_CONTIGUOUS'])
+
+    def test_no_descriptors_is_empty(self):
+        features = FeatureSet.from_cv2([cv2.KeyPoint(1, 2, 3)], None)
+        self.assertEqual(len(features), 0)
+
+    def test_feature_views(self):
+        features = _feature_set([(1.5, 2.5), (3, 4)])
+        feature = list(features)[1]
+        self.assertEqual(feature.point(), Point(3, 4))
+        self.assertEqual(feature.angle(), 45.0)
+        self.assertEqual(feature.strength(), 0.5)
+        self.assertEqual(feature.keypoint().octave, 1)
@@ -0,0 +1,109 @@
+import threading
+from unittest import TestCase
+
+import cv2
+import numpy as np
+from mock import MagicMock
+
+from CrystalMatch.dls_imagematch.feature.detector.detector_orb import OrbDetector
+from CrystalMatch.dls_imagematch.feature.detector.factory import DetectorFactory
+from CrystalMatch.dls_imagematch.feature.detector.instance_pool import DetectorInstancePool
+from CrystalMatch.dls_imagematch.feature.detector.opencv_detector_interface import OpencvDetectorInterface
+from CrystalMatch.dls_util.imaging import Image
+
+
+class TestDetectorInstancePool(TestCase):
+    def test_released_instance_is_reused(self):
+        pool = DetectorInstancePool()
+        factory = MagicMock(side_effect=lambda: object())
+        first = pool.acquire("key", factory)
+        pool.release("key", first)
+        second = pool.acquire("key", factory)
+
+        self.assertIs(first, second)
+        self.assertEqual(factory.call_count, 1)
+        self.assertEqual((pool.hits(), pool.misses()), (1, 1))
+
+    def test_keys_do_not_share_instances(self):
+        pool = DetectorInstancePool()
+        first = pool.acquire("a", object)
+        pool.release("a", first)
+        self.assertIsNot(pool.acquire("b", object), first)
+
+    def test_instance_in_use_is_not_shared(self):
+        pool = DetectorInstancePool()
+        first = pool.acquire("key", object)
+        self.assertIsNot(pool.acquire("key", object), first)
+
+    def test_idle_instances_are_limited(self):
+        pool = DetectorInstancePool(max_idle=2)
+        instances = [pool.acquire("key", object) for _ in range(4)]
+        for instance in instances:
+            pool.release("key", instance)
+        self.assertEqual(pool.size(), 2)
+
+    def test_threads_get_separate_instances(self):
+        pool = DetectorInstancePool()
+        in_use = []
+        errors = []
+        lock = threading.Lock()
+
+        def work():
+            for _ in range(200):
+                instance = pool.acquire("key", object)
+                with lock:
+                    if instance in in_use:
+                        errors.append(instance)
+                    in_use.append(instance)
+                with lock:
+                    in_use.remove(instance)
+                pool.release("key", instance)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(pool.hits() + pool.misses(), 800)
+
+
+class TestDetectorWithPool(TestCase):
+    def setUp(self):
+        # other tests set the version to check the OpenCV 2 and 3 code paths
+        OpencvDetectorInterface.OPENCV_MAJOR = cv2.__version__[0]
+        rng = np.random.RandomState(1)
+        self.image = Image(cv2.GaussianBlur(rng.randint(0, 255, (200, 240)).astype(np.uint8), (5, 5), 0))
+
+    def test_pooled_detection_finds_the_same_features(self):
+        detector = OrbDetector()
+        expected = detector.detect_features(self.image)
+
+        detector.set_instance_pool(DetectorInstancePool())
+        for _ in range(2):
+            features = detector.detect_features(self.image)
+            np.testing.assert_array_equal(features.keypoints(), expected.keypoints())
+            np.testing.assert_array_equal(features.descriptors(), expected.descriptors())
+
+    def test_changing_the_configuration_changes_the_key(self):
+        detector = OrbDetector()
+        key = detector._detector_key()
+        detector.set_n_features(100)
+        self.assertNotEqual(detector._detector_key(), key)
+
+    def test_factory_detectors_use_the_factory_pool(self):
+        pool = DetectorFactory.INSTANCE_POOL
+        hits = pool.hits()
+        detector = DetectorFactory.create("ORB")
+        detector.detect_features(self.image)
+        DetectorFactory.create("ORB").detect_features(self.image)
+        self.assertGreaterEqual(pool.hits(), hits + 2)
+
+    def test_cached_features_are_detected_once_for_each_configuration(self):
+        detector = OrbDetector()
+        features = detector.detect_features_cached(self.image)
+        self.assertIs(OrbDetector().detect_features_cached(self.image), features)
+
+        detector.set_n_features(100)
+        self.assertIsNot(detector.detect_features_cached(self.image), features)
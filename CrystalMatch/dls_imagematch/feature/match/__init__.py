@@ -1,2 +1,5 @@
 from .matcher import FeatureMatcher
 from .matcher_bounded import BoundedFeatureMatcher
+from .matcher_indexed import IndexedFeatureMatcher
+from .match_set import FeatureMatchSet
+from .descriptor_matcher import DescriptorMatcher, DescriptorMatcherType
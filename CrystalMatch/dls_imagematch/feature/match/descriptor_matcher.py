@@ -0,0 +1,126 @@
+import cv2
+import numpy as np
+
+
+class DescriptorMatcherType:
+    def __init__(self):
+        pass
+
+    BRUTE_FORCE = "Brute Force"
+    FLANN_LSH = "FLANN LSH"
+    KNN_RATIO = "kNN Ratio Test"
+
+    LIST_ALL = [BRUTE_FORCE, FLANN_LSH, KNN_RATIO]
+
+
+class DescriptorMatcher:
+    """ Strategy used by FeatureMatcher to find the matching pairs between two sets of feature descriptors.
+    Each pair is returned as an OpenCV DMatch (queryIdx into the first set, trainIdx into the second), or by
+    match_arrays() as arrays with one element per pair. """
+    def __init__(self):
+        pass
+
+    def matcher_name(self):
+        raise NotImplementedError()
+
+    def match(self, descriptors1, descriptors2, norm):
+        """ Find the matches between the two descriptor matrices using the distance norm of the detector. """
+        raise NotImplementedError()
+
+    def match_arrays(self, descriptors1, descriptors2, norm):
+        """ Same as match() but the matches are returned as three arrays: the indices into the first set, the
+        indices into the second set and the distances. """
+        return matches_to_arrays(self.match(descriptors1, descriptors2, norm))
+
+    @staticmethod
+    def create(matcher_type):
+        if matcher_type == DescriptorMatcherType.BRUTE_FORCE:
+            return BruteForceDescriptorMatcher()
+        elif matcher_type == DescriptorMatcherType.FLANN_LSH:
+            return FlannLshDescriptorMatcher()
+        elif matcher_type == DescriptorMatcherType.KNN_RATIO:
+            return KnnRatioDescriptorMatcher()
+        else:
+            raise ValueError("Unknown descriptor matcher type: {}".format(matcher_type))
+
+
+class BruteForceDescriptorMatcher(DescriptorMatcher):
+    """ Compares every descriptor with every other and keeps the pairs which are each other's nearest neighbour
+    (cross check). Exact, but the time taken grows with the product of the sizes of the two sets. """
+    def matcher_name(self):
+        return DescriptorMatcherType.BRUTE_FORCE
+
+    def match(self, descriptors1, descriptors2, norm):
+        matcher = cv2.BFMatcher(norm, crossCheck=True)
+        return matcher.match(descriptors1, descriptors2)
+
+    def match_arrays(self, descriptors1, descriptors2, norm):
+        # Same matches as BFMatcher.match(), without creating a DMatch object for each one
+        dtype = cv2.CV_32S if norm in (cv2.NORM_HAMMING, cv2.NORM_HAMMING2) else cv2.CV_32F
+        distances, nearest = cv2.batchDistance(descriptors1, descriptors2, dtype, normType=norm, K=1,
+                                               crosscheck=True)
+        indices1 = np.flatnonzero(nearest[:, 0] >= 0)
+        return indices1, nearest[indices1, 0].astype(np.intp), distances[indices1, 0].astype(np.float64)
+
+
+class FlannLshDescriptorMatcher(DescriptorMatcher):
+    """ Approximate nearest neighbours of binary descriptors using the FLANN locality sensitive hashing index,
+    keeping the pairs which are each other's nearest neighbour (the same cross check as the brute force matcher).
+    Much faster for large sets of features but may miss some of the matches. Descriptors which are not binary
+    (uint8) can't be hashed and are matched by brute force instead. """
+    FLANN_INDEX_LSH = 6
+    DEFAULT_TABLE_NUMBER = 6
+    DEFAULT_KEY_SIZE = 12
+    DEFAULT_MULTI_PROBE_LEVEL = 1
+    DEFAULT_CHECKS = 32
+
+    def matcher_name(self):
+        return DescriptorMatcherType.FLANN_LSH
+
+    def match(self, descriptors1, descriptors2, norm):
+        if descriptors1.dtype != np.uint8 or descriptors2.dtype != np.uint8:
+            return BruteForceDescriptorMatcher().match(descriptors1, descriptors2, norm)
+
+        forward = self._nearest(descriptors1, descriptors2)
+        backward = self._nearest(descriptors2, descriptors1)
+        backward_index = dict((m.queryIdx, m.trainIdx) for m in backward)
+        return [m for m in forward if backward_index.get(m.trainIdx) == m.queryIdx]
+
+    def _nearest(self, query, train):
+        index_params = dict(algorithm=self.FLANN_INDEX_LSH, table_number=self.DEFAULT_TABLE_NUMBER,
+                            key_size=self.DEFAULT_KEY_SIZE, multi_probe_level=self.DEFAULT_MULTI_PROBE_LEVEL)
+        matcher = cv2.FlannBasedMatcher(index_params, dict(checks=self.DEFAULT_CHECKS))
+        # LSH finds no neighbour for some descriptors - knnMatch returns an empty list for those
+        return [neighbours[0] for neighbours in matcher.knnMatch(query, train, k=1) if len(neighbours) > 0]
+
+
+class KnnRatioDescriptorMatcher(DescriptorMatcher):
+    """ Finds the two nearest neighbours of each descriptor and keeps the nearest one only if it is clearly
+    closer than the second (Lowe's ratio test). This rejects ambiguous matches, e.g. on repeated texture. """
+    DEFAULT_RATIO = 0.8
+
+    def __init__(self, ratio=DEFAULT_RATIO):
+        DescriptorMatcher.__init__(self)
+        self._ratio = ratio
+
+    def matcher_name(self):
+        return DescriptorMatcherType.KNN_RATIO
+
+    def match(self, descriptors1, descriptors2, norm):
+        matcher = cv2.BFMatcher(norm, crossCheck=False)
+        matches = []
+        for neighbours in matcher.knnMatch(descriptors1, descriptors2, k=2):
+            if len(neighbours) == 1:
+                matches.append(neighbours[0])
+            elif len(neighbours) == 2 and neighbours[0].distance < self._ratio * neighbours[1].distance:
+                matches.append(neighbours[0])
+        return matches
+
+
+def matches_to_arrays(matches):
+    """ Arrays of the query indices, train indices and distances of a list of OpenCV DMatch. """
+    n = len(matches)
+    indices1 = np.fromiter((m.queryIdx for m in matches), dtype=np.intp, count=n)
+    indices2 = np.fromiter((m.trainIdx for m in matches), dtype=np.intp, count=n)
+    distances = np.fromiter((m.distance for m in matches), dtype=np.float64, count=n)
+    return indices1, indices2, distances
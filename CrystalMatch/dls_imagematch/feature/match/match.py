@@ -2,75 +2,65 @@ from CrystalMatch.dls_util.shape import Point
 
 
 class FeatureMatch:
-    """ Wrapper for the match and keypoint objects produced by the OpenCV feature matching routines. Makes
-    it easier to use and pass around this data.
+    """ One of the matches of a FeatureMatchSet. The match data is held in the arrays of the set, this object is
+    a view of one row of them which gives it as Points - it is created when the set is indexed or iterated, and
+    changes made through it are made to the set.
     """
-    def __init__(self, match, feature1, feature2, detector):
-        self._match = match
-        self._feature1 = feature1
-        self._feature2 = feature2
-        self._detector = detector
-        self._offset1 = Point(0, 0)
-        self._offset2 = Point(0, 0)
-        self._point2_projected = None
-        self._included_in_transformation = True
+    def __init__(self, match_set, index):
+        self._set = match_set
+        self._index = index
 
     def method(self):
-        return self._detector.detector_name()
+        return self._set.detector(self._index).detector_name()
 
     def reprojection_error(self):
-        if self._point2_projected is not None:
-            return self.point2().distance_to(self._point2_projected)
-        else:
-            return 1e6
+        return float(self._set.reprojection_errors()[self._index])
 
     def is_in_transformation(self):
-        return self._included_in_transformation
+        return bool(self._set.in_transformation()[self._index])
 
     def distance(self):
-        return self._match.distance * self._detector.extractor_distance_factor()
+        return float(self._set.distances()[self._index])
 
     def point1(self):
-        return self.image_point1() + self._offset1
+        return self.image_point1() + self._offset1()
 
     def point2(self):
-        return self.image_point2() + self._offset2
+        return self.image_point2() + self._offset2()
 
     def point2_projected(self):
-        return self._point2_projected
+        x, y = self._set.projected_points2()[self._index]
+        if x != x:  # NaN - not projected
+            return None
+        return Point(float(x), float(y))
 
     def image_point1(self):
-        return self._feature1.point()
+        return _point(self._set.image_points1()[self._index])
 
     def image_point2(self):
-        return self._feature2.point()
+        return _point(self._set.image_points2()[self._index])
+
+    def feature1(self):
+        return self._set.feature1(self._index)
+
+    def feature2(self):
+        return self._set.feature2(self._index)
 
     def set_offsets(self, offset1, offset2):
-        self._offset1 = offset1
-        self._offset2 = offset2
+        self._set.set_match_offsets(self._index, offset1, offset2)
 
     def set_point2_projected(self, point):
-        self._point2_projected = point
+        self._set.set_match_point2_projected(self._index, point)
 
     def set_in_transformation(self, in_transformation):
-        self._included_in_transformation = in_transformation
-
-    @staticmethod
-    def from_cv2_matches(cv2_matches, features1, features2, detector):
-        func = FeatureMatch.from_cv2_match
-        single_matches = [func(match, features1, features2, detector) for match in cv2_matches]
-
-        # Filter out matches whose keypoint distances are too large
-        filtered = []
-        for match in single_matches:
-            if match.distance() < detector.keypoint_limit():
-                filtered.append(match)
-
-        return filtered
-
-    @staticmethod
-    def from_cv2_match(cv2_match, features1, features2, detector):
-        f1 = features1[cv2_match.queryIdx]
-        f2 = features2[cv2_match.trainIdx]
-        cv2_match = FeatureMatch(cv2_match, f1, f2, detector)
-        return cv2_match
+        self._set.set_match_in_transformation(self._index, in_transformation)
+
+    def _offset1(self):
+        return _point(self._set.offsets1()[self._index])
+
+    def _offset2(self):
+        return _point(self._set.offsets2()[self._index])
+
+
+def _point(row):
+    return Point(float(row[0]), float(row[1]))
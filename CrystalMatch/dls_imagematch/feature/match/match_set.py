@@ -0,0 +1,192 @@
+import numpy as np
+
+from CrystalMatch.dls_imagematch.feature.match.descriptor_matcher import matches_to_arrays
+from CrystalMatch.dls_imagematch.feature.match.match import FeatureMatch
+
+
+class FeatureMatchSet:
+    """ The matches found between the features of two images, held as arrays with one row per match: the
+    indices of the matched features in their FeatureSets, the match distances, the positions of the features and
+    the state set by the transform calculation (projected points and whether each match was used).
+
+    A set can hold the matches of several detectors (see concatenate()); each row records which detector (and
+    which pair of FeatureSets) it came from. Indexing or iterating the set gives FeatureMatch views of the rows.
+    """
+    NOT_PROJECTED_ERROR = 1e6
+
+    def __init__(self, indices1, indices2, distances, image_points1, image_points2, part_ids, parts):
+        """
+        :param indices1: index of the feature of each match in its first FeatureSet
+        :param indices2: index of the feature of each match in its second FeatureSet
+        :param distances: distance of each match, scaled by the extractor distance factor
+        :param image_points1: array of shape (n, 2) of the points of the first features
+        :param image_points2: array of shape (n, 2) of the points of the second features
+        :param part_ids: index into parts of each match
+        :param parts: list of (features1, features2, detector) that the matches came from
+        """
+        n = len(indices1)
+        self._indices1 = indices1
+        self._indices2 = indices2
+        self._distances = distances
+        self._image_points1 = image_points1
+        self._image_points2 = image_points2
+        self._part_ids = part_ids
+        self._parts = parts
+
+        self._offsets1 = np.zeros((n, 2))
+        self._offsets2 = np.zeros((n, 2))
+        self._projected2 = np.full((n, 2), np.nan)
+        self._in_transformation = np.ones(n, dtype=bool)
+
+    @staticmethod
+    def from_cv2_matches(cv2_matches, features1, features2, detector):
+        """ Create a set from the matches returned by an OpenCV matcher for the two FeatureSets. Matches
+        whose distance is not below the keypoint limit of the detector are left out. """
+        indices1, indices2, distances = matches_to_arrays(cv2_matches)
+        return FeatureMatchSet.from_arrays(indices1, indices2, distances, features1, features2, detector)
+
+    @staticmethod
+    def from_arrays(indices1, indices2, raw_distances, features1, features2, detector):
+        """ Same as from_cv2_matches() for matches given as arrays of feature indices and (unscaled) distances. """
+        distances = raw_distances * detector.extractor_distance_factor()
+
+        # Filter out matches whose keypoint distances are too large
+        keep = distances < detector.keypoint_limit()
+        indices1, indices2 = indices1[keep], indices2[keep]
+        points1 = features1.points()[indices1] if len(indices1) > 0 else np.zeros((0, 2))
+        points2 = features2.points()[indices2] if len(indices2) > 0 else np.zeros((0, 2))
+
+        part_ids = np.zeros(len(indices1), dtype=np.intp)
+        return FeatureMatchSet(indices1, indices2, distances[keep], points1, points2, part_ids,
+                               [(features1, features2, detector)])
+
+    @staticmethod
+    def empty():
+        return FeatureMatchSet.concatenate([])
+
+    @staticmethod
+    def concatenate(match_sets):
+        """ One set of all the matches of the sets, in order. """
+        parts = []
+        part_ids = []
+        for match_set in match_sets:
+            part_ids.append(match_set._part_ids + len(parts))
+            parts.extend(match_set._parts)
+
+        def join(name, shape, dtype):
+            arrays = [getattr(s, name) for s in match_sets]
+            return np.concatenate(arrays) if len(arrays) > 0 else np.zeros(shape, dtype=dtype)
+
+        combined = FeatureMatchSet(join("_indices1", 0, np.intp), join("_indices2", 0, np.intp),
+                                   join("_distances", 0, np.float64), join("_image_points1", (0, 2), np.float64),
+                                   join("_image_points2", (0, 2), np.float64),
+                                   np.concatenate(part_ids) if len(part_ids) > 0 else np.zeros(0, dtype=np.intp),
+                                   parts)
+        combined._offsets1 = join("_offsets1", (0, 2), np.float64)
+        combined._offsets2 = join("_offsets2", (0, 2), np.float64)
+        combined._projected2 = join("_projected2", (0, 2), np.float64)
+        combined._in_transformation = join("_in_transformation", 0, bool)
+        return combined
+
+    def __len__(self):
+        return len(self._indices1)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Match index out of range")
+        return FeatureMatch(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield FeatureMatch(self, i)
+
+    def subset(self, indices):
+        """ New set of the matches at the indices (or where the boolean mask is True), in that order. """
+        subset = FeatureMatchSet(self._indices1[indices], self._indices2[indices], self._distances[indices],
+                                 self._image_points1[indices], self._image_points2[indices],
+                                 self._part_ids[indices], self._parts)
+        subset._offsets1 = self._offsets1[indices]
+        subset._offsets2 = self._offsets2[indices]
+        subset._projected2 = self._projected2[indices]
+        subset._in_transformation = self._in_transformation[indices]
+        return subset
+
+    # -------- ARRAYS -------------------
+    def indices1(self):
+        return self._indices1
+
+    def indices2(self):
+        return self._indices2
+
+    def distances(self):
+        return self._distances
+
+    def image_points1(self):
+        """ Array of shape (n, 2) of the positions of the first features, in the coordinates they were detected in. """
+        return self._image_points1
+
+    def image_points2(self):
+        return self._image_points2
+
+    def offsets1(self):
+        return self._offsets1
+
+    def offsets2(self):
+        return self._offsets2
+
+    def points1(self):
+        """ Array of shape (n, 2) of the positions of the first features in the first image. """
+        return self._image_points1 + self._offsets1
+
+    def points2(self):
+        return self._image_points2 + self._offsets2
+
+    def projected_points2(self):
+        """ Array of shape (n, 2) of the first points projected by the transform - NaN where they were not. """
+        return self._projected2
+
+    def reprojection_errors(self):
+        """ Distance between the second point and the projected first point of each match. """
+        delta = self.points2() - self._projected2
+        errors = np.sqrt(delta[:, 0] ** 2 + delta[:, 1] ** 2)
+        errors[np.isnan(errors)] = self.NOT_PROJECTED_ERROR
+        return errors
+
+    def in_transformation(self):
+        """ Boolean array, True for the matches used to calculate the transform. """
+        return self._in_transformation
+
+    # -------- PER MATCH -------------------
+    def detector(self, index):
+        return self._parts[self._part_ids[index]][2]
+
+    def feature1(self, index):
+        return self._parts[self._part_ids[index]][0][self._indices1[index]]
+
+    def feature2(self, index):
+        return self._parts[self._part_ids[index]][1][self._indices2[index]]
+
+    # -------- STATE -------------------
+    def set_offsets(self, offset1, offset2):
+        """ Offsets (Points) added to the feature positions of all the matches, e.g. the positions of the image
+        regions the features were detected in. """
+        self._offsets1[:] = (offset1.x, offset1.y)
+        self._offsets2[:] = (offset2.x, offset2.y)
+
+    def set_projected_points2(self, points):
+        self._projected2 = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+    def set_in_transformation(self, mask):
+        self._in_transformation = np.asarray(mask, dtype=bool).reshape(-1)
+
+    def set_match_offsets(self, index, offset1, offset2):
+        self._offsets1[index] = (offset1.x, offset1.y)
+        self._offsets2[index] = (offset2.x, offset2.y)
+
+    def set_match_point2_projected(self, index, point):
+        self._projected2[index] = (np.nan, np.nan) if point is None else (point.x, point.y)
+
+    def set_match_in_transformation(self, index, in_transformation):
+        self._in_transformation[index] = in_transformation
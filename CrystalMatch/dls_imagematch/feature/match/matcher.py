@@ -1,12 +1,18 @@
 from __future__ import division
 
+import atexit
+import os
+import threading
 import time
-import cv2
+from multiprocessing.pool import ThreadPool
+
 import numpy as np
 
 from CrystalMatch.dls_imagematch.feature.transform.calculator import TransformCalculator, TransformCalculationError
+from CrystalMatch.dls_imagematch.feature.detector.detector_types import DetectorType
 from CrystalMatch.dls_imagematch.feature.detector.factory import DetectorFactory
-from CrystalMatch.dls_imagematch.feature.match.match import FeatureMatch
+from CrystalMatch.dls_imagematch.feature.match.descriptor_matcher import DescriptorMatcher, DescriptorMatcherType
+from CrystalMatch.dls_imagematch.feature.match.match_set import FeatureMatchSet
 from CrystalMatch.dls_imagematch.feature.match.result import FeatureMatcherResult
 
 
@@ -24,25 +30,63 @@ class FeatureMatcher:
     _MAX_MATCHES = 200
     _DEFAULT_TRANSFORM = TransformCalculator.DEFAULT_METHOD
     _DEFAULT_FILTER = TransformCalculator.DEFAULT_FILTER
+    _DEFAULT_DESCRIPTOR_MATCHER = DescriptorMatcherType.BRUTE_FORCE
+
+    # Pool (with the id of the process it was made in) for running the detectors concurrently
+    _detector_pool = None
+    _detector_pool_lock = threading.Lock()
 
     def __init__(self, image1, image2, detector_config=None):
         self._use_all_detectors = False
+        self._concurrent_detectors = False
+        self._cache_features = False
         self._detector = None
+        self._cascade_detectors = None
+        self._cascade_min_inliers = 0
+        self._cascade_max_error = 0
         self._transform_method = self._DEFAULT_TRANSFORM
         self._transform_filter = self._DEFAULT_FILTER
+        self._descriptor_matcher = DescriptorMatcher.create(self._DEFAULT_DESCRIPTOR_MATCHER)
 
         self.image1 = image1
         self.image2 = image2
         self._config = detector_config
 
     # -------- CONFIGURATION -------------------
-    def set_use_all_detectors(self):
+    def set_use_all_detectors(self, concurrent=False):
+        """ Run all the detectors and use the matches of all of them.
+        :param concurrent: run the detectors at the same time, in a pool of threads shared by all feature matchers.
+        The matches are still combined in the order of the detectors, so the result is the same.
+        """
         self._use_all_detectors = True
+        self._concurrent_detectors = concurrent
+        self._detector = None
+        self._cascade_detectors = None
+
+    def set_use_detector_cascade(self, detector_order, min_inliers, max_error):
+        """ Run the detectors one at a time in the given order instead of running all of them. After each detector
+        the transform is calculated from all the matches found so far, stopping as soon as it has at least min_inliers
+        good matches with a mean reprojection error of no more than max_error (pixels). If that never happens the
+        result is the same as for set_use_all_detectors() with the detectors in the list.
+        :param detector_order: list of detector types (see DetectorType.LIST_ALL), at least one
+        """
+        if len(detector_order) == 0:
+            raise ValueError("The detector cascade needs at least one detector")
+        self._use_all_detectors = False
         self._detector = None
+        self._cascade_detectors = [DetectorFactory.create(det, self._config) for det in detector_order]
+        self._cascade_min_inliers = min_inliers
+        self._cascade_max_error = max_error
 
     def set_detector(self, method):
         self._use_all_detectors = False
         self._detector = DetectorFactory.create(method, self._config)
+        self._cascade_detectors = None
+
+    def set_cache_features(self, cache_features):
+        """ Keep the features detected with the images (see Detector.detect_features_cached()), so features of the
+        images detected in advance are used rather than detected again. """
+        self._cache_features = cache_features
 
     def set_transform_method(self, method):
         if method is None:
@@ -56,26 +100,28 @@ class FeatureMatcher:
         else:
             self._transform_filter = filter_obj
 
+    def set_descriptor_matcher(self, matcher_type):
+        """ Set the strategy used to match the feature descriptors, one of DescriptorMatcherType.LIST_ALL. """
+        if matcher_type is None:
+            matcher_type = self._DEFAULT_DESCRIPTOR_MATCHER
+        self._descriptor_matcher = DescriptorMatcher.create(matcher_type)
+
     # -------- FUNCTIONALITY -------------------
     def match(self):
+        if self._cascade_detectors is not None:
+            return self._match_cascade()
+
         match_start_time = time.time()
-        matches = self._find_matches()
+        matches, contributions = self._find_matches()
         match_end_time = time.time()
 
-        calc = TransformCalculator()
-        calc.set_method(self._transform_method)
-        calc.set_filter(self._transform_filter)
-
-        try:
-            transform = calc.calculate_transform(matches)
-        except TransformCalculationError:
-            transform = None
-
+        transform = self._calculate_transform(matches)
         transform_end_time = time.time()
 
         result = self._create_result_object(matches, transform)
         result.set_time_match(match_end_time - match_start_time)
         result.set_time_transform(transform_end_time - match_end_time)
+        self._add_contributions(result, contributions)
 
         return result
 
@@ -83,9 +129,66 @@ class FeatureMatcher:
         self.set_transform_method(TransformCalculator.TRANSLATION)
         return self.match()
 
+    def _match_cascade(self):
+        time_match = 0
+        time_transform = 0
+        detector_matches = []
+        contributions = []
+        result = None
+
+        for detector in self._cascade_detectors:
+            match_start_time = time.time()
+            detector_matches.append(self._find_matches_for_detector(detector))
+            matches = FeatureMatchSet.concatenate(detector_matches)
+            match_end_time = time.time()
+
+            transform = self._calculate_transform(matches)
+            transform_end_time = time.time()
+
+            time_match += match_end_time - match_start_time
+            time_transform += transform_end_time - match_end_time
+            contributions.append((detector.detector_name(), len(detector_matches[-1]),
+                                  match_end_time - match_start_time))
+
+            result = self._create_result_object(matches, transform)
+            if self._is_cascade_complete(result):
+                break
+
+        result.set_time_match(time_match)
+        result.set_time_transform(time_transform)
+        self._add_contributions(result, contributions)
+        return result
+
+    def _is_cascade_complete(self, result):
+        return (result.has_transform() and result.num_good_matches() >= self._cascade_min_inliers
+                and result.mean_transform_error() <= self._cascade_max_error)
+
+    def _calculate_transform(self, matches):
+        calc = TransformCalculator()
+        calc.set_method(self._transform_method)
+        calc.set_filter(self._transform_filter)
+
+        try:
+            return calc.calculate_transform(matches)
+        except TransformCalculationError:
+            return None
+
+    @staticmethod
+    def _add_contributions(result, contributions):
+        """ Record in the result how many of the matches (and of the good matches) each detector found. The matches
+        of the detectors are in the order of the contributions. """
+        in_transformation = result.matches().in_transformation()
+        start = 0
+        for detector_name, num_matches, time_detector in contributions:
+            num_good = int(np.count_nonzero(in_transformation[start:start + num_matches]))
+            result.add_detector_contribution(detector_name, num_matches, num_good, time_detector)
+            start += num_matches
+
     def _create_result_object(self, matches, transform):
         if self._use_all_detectors:
             method = "All"
+        elif self._cascade_detectors is not None:
+            method = "Cascade"
         else:
             method = self._detector.detector_name()
 
@@ -93,45 +196,101 @@ class FeatureMatcher:
         return result
 
     def _find_matches(self):
+        """ The matches of the detector (or of all the detectors) and the contribution of each detector to them as
+        (detector name, number of matches, time taken). """
         if self._use_all_detectors:
-            matches = self._find_matches_for_all_detectors()
-        else:
-            matches = self._find_matches_for_detector(self._detector)
+            return self._find_matches_for_all_detectors()
 
-        return matches
+        start_time = time.time()
+        matches = self._find_matches_for_detector(self._detector)
+        return matches, [(self._detector.detector_name(), len(matches), time.time() - start_time)]
 
     def _find_matches_for_all_detectors(self):
-        matches = []
-        for detector in DetectorFactory.get_all_detectors(self._config):
-            detector_matches = self._find_matches_for_detector(detector)
-            matches.extend(detector_matches)
-
-        return matches
+        detectors = DetectorFactory.get_all_detectors(self._config)
+        if self._concurrent_detectors and len(detectors) > 1:
+            timed_matches = self._get_detector_pool().map(self._find_timed_matches_for_detector, detectors)
+        else:
+            timed_matches = [self._find_timed_matches_for_detector(detector) for detector in detectors]
+
+        matches = [detector_matches for detector_matches, _ in timed_matches]
+        contributions = [(detector.detector_name(), len(detector_matches), time_detector)
+                         for detector, (detector_matches, time_detector) in zip(detectors, timed_matches)]
+        return FeatureMatchSet.concatenate(matches), contributions
+
+    def _find_timed_matches_for_detector(self, detector):
+        start_time = time.time()
+        matches = self._find_matches_for_detector(detector)
+        return matches, time.time() - start_time
+
+    @classmethod
+    def _get_detector_pool(cls):
+        """ The thread pool used to run the detectors concurrently, with a thread for each detector type. It is
+        shared by all the feature matchers (e.g. of POI matched in separate threads), and made again in a forked
+        process as the threads are not copied to it. """
+        with cls._detector_pool_lock:
+            if cls._detector_pool is None or cls._detector_pool[0] != os.getpid():
+                if cls._detector_pool is None:
+                    # A forked process inherits the exit handler of its parent
+                    atexit.register(cls.close_detector_pool)
+                cls._detector_pool = (os.getpid(), ThreadPool(len(DetectorType.LIST_ALL)))
+            return cls._detector_pool[1]
+
+    @classmethod
+    def close_detector_pool(cls):
+        """ Close the thread pool used to run the detectors concurrently, waiting for its threads to finish. It is
+        called when the process exits; a feature matcher used afterwards makes a new pool. """
+        with cls._detector_pool_lock:
+            if cls._detector_pool is not None and cls._detector_pool[0] == os.getpid():
+                pool = cls._detector_pool[1]
+                pool.close()
+                pool.join()
+            cls._detector_pool = None
 
     def _find_matches_for_detector(self, detector):
-        features1 = detector.detect_features(self.image1)
-        features2 = detector.detect_features(self.image2)
+        detect_features = detector.detect_features_cached if self._cache_features else detector.detect_features
+        features1 = detect_features(self.image1)
+        features2 = detect_features(self.image2)
 
-        raw_matches = self._brute_force_match(detector, features1, features2)
+        raw_matches = self._match_descriptors(detector, features1, features2)
         matches = self._matches_from_raw(raw_matches, features1, features2, detector)
         return matches
 
-    def _brute_force_match(self, detector, features1, features2):
+    def _match_descriptors(self, detector, features1, features2):
         """ For two sets of feature descriptors generated from 2 images, attempt to find all the matches,
-        i.e. find features that occur in both images. """
-        # TODO: Try out a FLANN based matcher
+        i.e. find features that occur in both images.
+        :return: arrays of the indices of the matched features in features1 and features2 and the match distances,
+        for the best matches (at most _MAX_MATCHES, lowest distance first) within the detector's keypoint limit.
+        """
         if len(features1) == 0 or len(features2) == 0:
-            return []
-
-        descriptors1 = np.array([f.descriptor() for f in features1])
-        descriptors2 = np.array([f.descriptor() for f in features2])
-
-        matcher = cv2.BFMatcher(detector.normalization(), crossCheck=True)
-        matches = matcher.match(descriptors1, descriptors2)
-        top_matches = sorted(matches, key=lambda x: x.distance)[:self._MAX_MATCHES]
+            empty = np.zeros(0, dtype=np.intp)
+            return empty, empty, np.zeros(0)
+
+        descriptors1 = features1.descriptors()
+        descriptors2 = features2.descriptors()
+
+        indices1, indices2, distances = self._descriptor_matcher.match_arrays(descriptors1, descriptors2,
+                                                                               detector.normalization())
+        within_limit = distances * detector.extractor_distance_factor() < detector.keypoint_limit()
+        top = self._top_matches(distances[within_limit], self._MAX_MATCHES)
+        selected = np.flatnonzero(within_limit)[top]
+
+        return indices1[selected], indices2[selected], distances[selected]
+
+    @staticmethod
+    def _top_matches(distances, count):
+        """ Indices of the count smallest distances in increasing order of distance. Matches with equal distances
+        stay in their original order, the same as a stable sort of all the distances. """
+        if len(distances) > count:
+            kth = np.partition(distances, count - 1)[count - 1]
+            below = np.flatnonzero(distances < kth)
+            equal = np.flatnonzero(distances == kth)[:count - len(below)]
+            candidates = np.concatenate((below, equal))
+        else:
+            candidates = np.arange(len(distances))
 
-        return top_matches
+        return candidates[np.argsort(distances[candidates], kind='mergesort')]
 
     def _matches_from_raw(self, raw_matches, features1, features2, method):
-        matches = FeatureMatch.from_cv2_matches(raw_matches, features1, features2, method)
+        indices1, indices2, distances = raw_matches
+        matches = FeatureMatchSet.from_arrays(indices1, indices2, distances, features1, features2, method)
         return matches
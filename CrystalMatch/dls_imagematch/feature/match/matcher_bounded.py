@@ -1,7 +1,8 @@
 from __future__ import division
 
 from CrystalMatch.dls_imagematch.feature.match.matcher import FeatureMatcher
-from CrystalMatch.dls_imagematch.feature.match.match import FeatureMatch
+from CrystalMatch.dls_imagematch.feature.match.match_set import FeatureMatchSet
+from CrystalMatch.dls_util.imaging import Window
 
 
 class BoundedFeatureMatcher(FeatureMatcher):
@@ -10,21 +11,28 @@ class BoundedFeatureMatcher(FeatureMatcher):
     def __init__(self, image1, image2, detector_config, image1_rect, image2_rect):
         FeatureMatcher.__init__(self, image1, image2, detector_config)
 
+        # The offsets are the pixels the crops start at, so feature positions map back to the whole images exactly
+        window1, window2 = self._region_windows(image1, image2, image1_rect, image2_rect)
+        self.image1 = image1.crop(window1.bounds())
+        self.image2 = image2.crop(window2.bounds())
+
+        self.image1_offset = window1.offset()
+        self.image2_offset = window2.offset()
+
+    @staticmethod
+    def _region_windows(image1, image2, image1_rect, image2_rect):
+        """ The windows of the sub regions (the whole image if the rectangle is None) of the two images. """
         if image1_rect is None:
             image1_rect = image1.bounds()
 
         if image2_rect is None:
             image2_rect = image2.bounds()
 
-        self.image1 = image1.crop(image1_rect)
-        self.image2 = image2.crop(image2_rect)
-
-        self.image1_offset = image1_rect.top_left()
-        self.image2_offset = image2_rect.top_left()
+        return Window.from_rect(image1.raw(), image1_rect), Window.from_rect(image2.raw(), image2_rect)
 
     def _matches_from_raw(self, raw_matches, keypoints1, keypoints2, method):
-        matches = FeatureMatch.from_cv2_matches(raw_matches, keypoints1, keypoints2, method)
-        for match in matches:
-            match.set_offsets(self.image1_offset, self.image2_offset)
+        indices1, indices2, distances = raw_matches
+        matches = FeatureMatchSet.from_arrays(indices1, indices2, distances, keypoints1, keypoints2, method)
+        matches.set_offsets(self.image1_offset, self.image2_offset)
 
         return matches
@@ -0,0 +1,55 @@
+from __future__ import division
+
+from CrystalMatch.dls_imagematch.feature.match.matcher import FeatureMatcher
+from CrystalMatch.dls_imagematch.feature.match.matcher_bounded import BoundedFeatureMatcher
+from CrystalMatch.dls_imagematch.feature.match.match_set import FeatureMatchSet
+
+
+class IndexedFeatureMatcher(BoundedFeatureMatcher):
+    """ Specialization of the bounded feature matcher which does not run the detectors on the sub regions.
+    The features of the whole images are detected once (see FeatureIndex) and the features inside each sub
+    region are looked up in the indexes. Many matchers on the same pair of images can share the indexes.
+
+    The sub regions are only cropped from the images for a detector which has no index, so image1 and image2
+    are the whole images.
+    """
+    def __init__(self, image1, image2, detector_config, image1_rect, image2_rect, feature_indexes, margin=0):
+        """
+        :param feature_indexes: dictionary of detector name to a pair of FeatureIndex, for image1 and image2
+        :param margin: features closer than this to the edge of a sub region are not used
+        """
+        FeatureMatcher.__init__(self, image1, image2, detector_config)
+
+        self._feature_indexes = feature_indexes
+        self._margin = margin
+        window1, window2 = self._region_windows(image1, image2, image1_rect, image2_rect)
+        self._region1 = window1.bounds()
+        self._region2 = window2.bounds()
+        self.image1_offset = window1.offset()
+        self.image2_offset = window2.offset()
+
+    def _find_matches_for_detector(self, detector):
+        if detector.detector_name() not in self._feature_indexes:
+            return self._find_matches_in_regions(detector)
+
+        index1, index2 = self._feature_indexes[detector.detector_name()]
+        features1 = index1.query(self._region1, self._margin)
+        features2 = index2.query(self._region2, self._margin)
+
+        raw_matches = self._match_descriptors(detector, features1, features2)
+        matches = self._matches_from_raw(raw_matches, features1, features2, detector)
+        return matches
+
+    def _find_matches_in_regions(self, detector):
+        # Run the detector on crops of the sub regions, as BoundedFeatureMatcher does
+        detect_features = detector.detect_features_cached if self._cache_features else detector.detect_features
+        features1 = detect_features(self.image1.crop(self._region1))
+        features2 = detect_features(self.image2.crop(self._region2))
+
+        raw_matches = self._match_descriptors(detector, features1, features2)
+        return BoundedFeatureMatcher._matches_from_raw(self, raw_matches, features1, features2, detector)
+
+    def _matches_from_raw(self, raw_matches, features1, features2, method):
+        # Indexed features are already in the coordinates of the whole images - no offsets
+        indices1, indices2, distances = raw_matches
+        return FeatureMatchSet.from_arrays(indices1, indices2, distances, features1, features2, method)
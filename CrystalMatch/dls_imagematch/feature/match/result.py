@@ -1,5 +1,7 @@
 from __future__ import division
 
+import numpy as np
+
 
 class FeatureMatcherResult:
     """ Encapsulates the results of an invocation of the feature matching process. This object is
@@ -14,6 +16,7 @@ class FeatureMatcherResult:
 
         self._time_match = 0
         self._time_transform = 0
+        self._detector_contributions = []
 
     def image1(self): return self._image1
 
@@ -29,6 +32,11 @@ class FeatureMatcherResult:
 
     def time_transform(self): return self._time_transform
 
+    def detector_contributions(self):
+        """ For each detector used, in the order they were run: a dictionary of the detector name, the number of
+        matches and good matches it found and the time taken to find them. """
+        return self._detector_contributions
+
     def any_matches(self):
         """ True if the result contains any feature matches. """
         return len(self._matches) > 0
@@ -42,26 +50,30 @@ class FeatureMatcherResult:
         return self._transform is not None
 
     def good_matches(self):
-        """ Returns the list of matches that were included in the transformation calculation. """
-        return [m for m in self._matches if m.is_in_transformation()]
+        """ Returns the set of matches that were included in the transformation calculation. """
+        return self._matches.subset(self._matches.in_transformation())
 
     def num_good_matches(self):
         """ The number of good feature matches. """
-        return len(self.good_matches())
+        return int(np.count_nonzero(self._matches.in_transformation()))
 
     def mean_transform_error(self):
         """ Calculates the average reprojection error of all the good matches (those involved
         in calculating the transformation)."""
-        good_matches = self.good_matches()
-        if len(good_matches) == 0:
+        good = self._matches.in_transformation()
+        if not np.any(good):
             return 0
 
-        errors = [m.reprojection_error() for m in good_matches]
-        total = sum(errors) / len(good_matches)
-        return total
+        return float(np.mean(self._matches.reprojection_errors()[good]))
 
     def set_time_match(self, time):
         self._time_match = time
 
     def set_time_transform(self, time):
         self._time_transform = time
+
+    def add_detector_contribution(self, detector_name, num_matches, num_good_matches, time):
+        self._detector_contributions.append({'detector': detector_name,
+                                             'matches': num_matches,
+                                             'good_matches': num_good_matches,
+                                             'time': time})
@@ -0,0 +1,58 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from CrystalMatch.dls_imagematch.feature.match.descriptor_matcher import DescriptorMatcher, DescriptorMatcherType, \
+    BruteForceDescriptorMatcher, KnnRatioDescriptorMatcher
+
+
+class TestDescriptorMatcher(TestCase):
+    def setUp(self):
+        # the second set is the first in a different order with a few bits flipped
+        rng = np.random.RandomState(11)
+        self.descriptors1 = rng.randint(0, 256, (300, 32)).astype(np.uint8)
+        self.order = rng.permutation(300)
+        self.descriptors2 = self.descriptors1[self.order].copy()
+        self.descriptors2[:, 0] ^= rng.randint(0, 4, 300).astype(np.uint8)
+
+    def _correct(self, matches):
+        return sum(1 for m in matches if self.order[m.trainIdx] == m.queryIdx)
+
+    def test_each_strategy_finds_the_matches(self):
+        for matcher_type in DescriptorMatcherType.LIST_ALL:
+            matcher = DescriptorMatcher.create(matcher_type)
+            self.assertEqual(matcher.matcher_name(), matcher_type)
+            matches = matcher.match(self.descriptors1, self.descriptors2, cv2.NORM_HAMMING)
+            self.assertEqual(self._correct(matches), len(matches))
+            self.assertGreater(len(matches), 0.9 * len(self.descriptors1))
+
+    def test_brute_force_matches_every_descriptor(self):
+        matches = BruteForceDescriptorMatcher().match(self.descriptors1, self.descriptors2, cv2.NORM_HAMMING)
+        self.assertEqual(self._correct(matches), len(self.descriptors1))
+
+    def test_match_arrays_gives_the_same_matches_as_match(self):
+        for matcher_type in DescriptorMatcherType.LIST_ALL:
+            matcher = DescriptorMatcher.create(matcher_type)
+            matches = matcher.match(self.descriptors1, self.descriptors2, cv2.NORM_HAMMING)
+            indices1, indices2, distances = matcher.match_arrays(self.descriptors1, self.descriptors2,
+                                                                 cv2.NORM_HAMMING)
+            np.testing.assert_array_equal(indices1, [m.queryIdx for m in matches])
+            np.testing.assert_array_equal(indices2, [m.trainIdx for m in matches])
+            np.testing.assert_array_equal(distances, [m.distance for m in matches])
+
+    def test_ratio_test_rejects_ambiguous_matches(self):
+        # every descriptor of the second set appears twice, so no match is clearly better than the next
+        descriptors2 = np.vstack((self.descriptors2, self.descriptors2))
+        matches = KnnRatioDescriptorMatcher().match(self.descriptors1, descriptors2, cv2.NORM_HAMMING)
+        self.assertEqual(len(matches), 0)
+
+    def test_flann_falls_back_to_brute_force_for_float_descriptors(self):
+        descriptors1 = self.descriptors1.astype(np.float32)
+        descriptors2 = self.descriptors2.astype(np.float32)
+        matcher = DescriptorMatcher.create(DescriptorMatcherType.FLANN_LSH)
+        matches = matcher.match(descriptors1, descriptors2, cv2.NORM_L2)
+        self.assertEqual(self._correct(matches), len(descriptors1))
+
+    def test_unknown_type_raises(self):
+        self.assertRaises(ValueError, DescriptorMatcher.create, "Unknown")
@@ -0,0 +1,97 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+from mock import Mock
+
+from CrystalMatch.dls_imagematch.feature.detector.feature_set import FeatureSet
+from CrystalMatch.dls_imagematch.feature.match.match_set import FeatureMatchSet
+from CrystalMatch.dls_util.shape import Point
+
+
+def _feature_set(points):
+    keypoints = [cv2.KeyPoint(x, y, 7.0, 45.0, 0.5, 1) for x, y in points]
+    descriptors = np.arange(len(points) * 4, dtype=np.uint8).reshape(-1, 4)
+    return FeatureSet.from_cv2(keypoints, descriptors)
+
+
+def _mock_detector(name="ORB", limit=50, factor=1.0):
+    detector = Mock()
+    detector.detector_name.return_value = name
+    detector.keypoint_limit.return_value = limit
+    detector.extractor_distance_factor.return_value = factor
+    return detector
+
+
+class TestFeatureMatchSet(TestCase):
+    def setUp(self):
+        self.features1 = _feature_set([(1, 2), (3, 4), (5, 6)])
+        self.features2 = _feature_set([(10, 20), (30, 40)])
+        self.detector = _mock_detector()
+        self.cv2_matches = [cv2.DMatch(2, 0, 10.0), cv2.DMatch(0, 1, 60.0), cv2.DMatch(1, 1, 20.0)]
+
+    def test_from_cv2_matches_filters_by_keypoint_limit(self):
+        matches = FeatureMatchSet.from_cv2_matches(self.cv2_matches, self.features1, self.features2, self.detector)
+        self.assertEqual(len(matches), 2)
+        np.testing.assert_array_equal(matches.indices1(), [2, 1])
+        np.testing.assert_array_equal(matches.indices2(), [0, 1])
+        np.testing.assert_array_equal(matches.distances(), [10.0, 20.0])
+
+    def test_distances_are_scaled_by_extractor_factor(self):
+        detector = _mock_detector(factor=2.0)
+        matches = FeatureMatchSet.from_cv2_matches(self.cv2_matches, self.features1, self.features2, detector)
+        np.testing.assert_array_equal(matches.distances(), [20.0, 40.0])
+
+    def test_points_include_offsets(self):
+        matches = FeatureMatchSet.from_cv2_matches(self.cv2_matches, self.features1, self.features2, self.detector)
+        matches.set_offsets(Point(100, 200), Point(-1, -2))
+        np.testing.assert_array_equal(matches.points1(), [[105, 206], [103, 204]])
+        np.testing.assert_array_equal(matches.points2(), [[9, 18], [29, 38]])
+        self.assertEqual(matches[0].point1(), Point(105, 206))
+        self.assertEqual(matches[1].image_point2(), Point(30, 40))
+
+    def test_match_views_read_and_write_the_set(self):
+        matches = FeatureMatchSet.from_cv2_matches(self.cv2_matches, self.features1, self.features2, self.detector)
+        match = matches[1]
+        self.assertEqual(match.method(), "ORB")
+        self.assertEqual(match.distance(), 20.0)
+        self.assertIsNone(match.point2_projected())
+        self.assertEqual(match.reprojection_error(), FeatureMatchSet.NOT_PROJECTED_ERROR)
+
+        match.set_point2_projected(Point(33, 44))
+        match.set_in_transformation(False)
+        self.assertEqual(matches[1].point2_projected(), Point(33, 44))
+        self.assertEqual(matches[1].reprojection_error(), 5.0)
+        np.testing.assert_array_equal(matches.in_transformation(), [True, False])
+
+    def test_match_views_give_features(self):
+        matches = FeatureMatchSet.from_cv2_matches(self.cv2_matches, self.features1, self.features2, self.detector)
+        feature = matches[0].feature1()
+        self.assertEqual(feature.point(), Point(5, 6))
+        self.assertEqual(feature.size(), 7.0)
+        np.testing.assert_array_equal(feature.descriptor(), [8, 9, 10, 11])
+
+    def test_concatenate_keeps_detector_of_each_match(self):
+        brisk = _mock_detector(name="BRISK")
+        orb_matches = FeatureMatchSet.from_cv2_matches(self.cv2_matches, self.features1, self.features2, self.detector)
+        brisk_matches = FeatureMatchSet.from_cv2_matches([cv2.DMatch(0, 0, 1.0)], self.features2, self.features1, brisk)
+        brisk_matches.set_offsets(Point(1, 1), Point(0, 0))
+
+        matches = FeatureMatchSet.concatenate([orb_matches, brisk_matches])
+        self.assertEqual([m.method() for m in matches], ["ORB", "ORB", "BRISK"])
+        np.testing.assert_array_equal(matches.points1(), [[5, 6], [3, 4], [11, 21]])
+
+    def test_empty_set(self):
+        matches = FeatureMatchSet.empty()
+        self.assertEqual(len(matches), 0)
+        self.assertEqual(list(matches), [])
+        self.assertEqual(matches.points1().shape, (0, 2))
+
+    def test_subset_copies_state(self):
+        matches = FeatureMatchSet.from_cv2_matches(self.cv2_matches, self.features1, self.features2, self.detector)
+        matches.set_in_transformation([False, True])
+        subset = matches.subset(matches.in_transformation())
+        self.assertEqual(len(subset), 1)
+        self.assertEqual(subset[0].point1(), Point(3, 4))
+        self.assertTrue(subset[0].is_in_transformation())
+
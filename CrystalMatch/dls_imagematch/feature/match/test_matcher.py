@@ -0,0 +1,211 @@
+import threading
+import time
+from os.path import join, dirname, abspath
+from unittest import TestCase
+
+import cv2
+import numpy as np
+from mock import Mock, patch
+
+from CrystalMatch.dls_imagematch.feature.detector.detector_types import DetectorType
+from CrystalMatch.dls_imagematch.feature.detector.factory import DetectorFactory
+from CrystalMatch.dls_imagematch.feature.detector.feature_index import FeatureIndex
+from CrystalMatch.dls_imagematch.feature.detector.feature_set import FeatureSet
+from CrystalMatch.dls_imagematch.feature.detector.opencv_detector_interface import OpencvDetectorInterface
+from CrystalMatch.dls_imagematch.feature.match.match_set import FeatureMatchSet
+from CrystalMatch.dls_imagematch.feature.match.matcher import FeatureMatcher
+from CrystalMatch.dls_imagematch.feature.match.matcher_bounded import BoundedFeatureMatcher
+from CrystalMatch.dls_imagematch.feature.match.matcher_indexed import IndexedFeatureMatcher
+from CrystalMatch.dls_imagematch.feature.transform.calculator import TransformCalculator
+from CrystalMatch.dls_util.imaging import Image
+from CrystalMatch.dls_util.shape import Point, Rectangle
+
+RESOURCES = join(dirname(abspath(__file__)), "..", "..", "..", "..", "system-tests", "resources")
+
+
+class TestFeatureMatcher(TestCase):
+    def test_top_matches_is_the_same_as_a_stable_sort(self):
+        rng = np.random.RandomState(2)
+        for count in [1, 5, 50, 200]:
+            distances = rng.randint(0, 20, 120).astype(np.float64)
+            expected = np.argsort(distances, kind='mergesort')[:count]
+            np.testing.assert_array_equal(FeatureMatcher._top_matches(distances, count), expected)
+
+    def test_top_matches_of_empty_distances(self):
+        self.assertEqual(len(FeatureMatcher._top_matches(np.zeros(0), 10)), 0)
+
+    def test_match_descriptors_applies_keypoint_limit_before_top_matches(self):
+        rng = np.random.RandomState(4)
+        descriptors1 = rng.randint(0, 256, (400, 32)).astype(np.uint8)
+        descriptors2 = descriptors1.copy()
+        # flip a different number of bits in each descriptor so the distances are spread out
+        for i in range(400):
+            descriptors2[i, :(i % 40) // 8] ^= 0xff
+        keypoints = [cv2.KeyPoint(float(i), 0.0, 1.0) for i in range(400)]
+        features1 = FeatureSet.from_cv2(keypoints, descriptors1)
+        features2 = FeatureSet.from_cv2(keypoints, descriptors2)
+
+        detector = Mock()
+        detector.normalization.return_value = cv2.NORM_HAMMING
+        detector.keypoint_limit.return_value = 20
+        detector.extractor_distance_factor.return_value = 1.0
+
+        indices1, indices2, distances = FeatureMatcher(None, None)._match_descriptors(detector, features1, features2)
+        matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+        top = sorted(matcher.match(descriptors1, descriptors2), key=lambda x: x.distance)[:FeatureMatcher._MAX_MATCHES]
+        expected = [m for m in top if m.distance < 20]
+
+        self.assertEqual(len(indices1), len(expected))
+        np.testing.assert_array_equal(indices1, [m.queryIdx for m in expected])
+        np.testing.assert_array_equal(indices2, [m.trainIdx for m in expected])
+        self.assertTrue(np.all(distances < 20))
+
+
+class TestDetectorCascade(TestCase):
+    def setUp(self):
+        # other tests set the version to check the OpenCV 2 and 3 code paths
+        OpencvDetectorInterface.OPENCV_MAJOR = cv2.__version__[0]
+        self.rng = np.random.RandomState(6)
+        self.matcher = FeatureMatcher(None, None)
+        self.matcher._find_matches_for_detector = Mock(side_effect=lambda d: self._matches(d.detector_name()))
+        self.good = []
+
+    def _matches(self, detector_name):
+        """ 20 matches, which all agree on a translation only for the detectors in self.good. """
+        points1 = self.rng.uniform(0, 100, (20, 2))
+        points2 = points1 + (5, 5) if detector_name in self.good else self.rng.uniform(0, 100, (20, 2))
+        descriptors = np.zeros((20, 32), dtype=np.uint8)
+        features1 = FeatureSet.from_cv2([cv2.KeyPoint(float(x), float(y), 1.0) for x, y in points1], descriptors)
+        features2 = FeatureSet.from_cv2([cv2.KeyPoint(float(x), float(y), 1.0) for x, y in points2], descriptors)
+
+        detector = Mock()
+        detector.detector_name.return_value = detector_name
+        detector.keypoint_limit.return_value = 100
+        detector.extractor_distance_factor.return_value = 1.0
+        indices = np.arange(20)
+        return FeatureMatchSet.from_arrays(indices, indices, np.zeros(20), features1, features2, detector)
+
+    def _run_cascade(self):
+        self.matcher.set_use_detector_cascade([DetectorType.ORB, DetectorType.FAST, DetectorType.MSER], 10, 1.0)
+        return self.matcher.match()
+
+    def test_cascade_stops_at_the_first_good_transform(self):
+        self.good = [DetectorType.FAST]
+        result = self._run_cascade()
+
+        self.assertEqual(result.method(), "Cascade")
+        self.assertTrue(result.has_transform())
+        self.assertEqual(result.num_matches(), 40)
+        self.assertEqual([c['detector'] for c in result.detector_contributions()],
+                         [DetectorType.ORB, DetectorType.FAST])
+        self.assertEqual(result.detector_contributions()[1]['good_matches'], 20)
+
+    def test_cascade_runs_every_detector_if_the_transform_is_never_good_enough(self):
+        result = self._run_cascade()
+
+        self.assertEqual(self.matcher._find_matches_for_detector.call_count, 3)
+        self.assertEqual(result.num_matches(), 60)
+        self.assertEqual(len(result.detector_contributions()), 3)
+
+    def test_setting_a_detector_turns_off_the_cascade(self):
+        self.matcher.set_use_detector_cascade([DetectorType.ORB], 10, 1.0)
+        self.matcher.set_detector(DetectorType.ORB)
+        self.good = [DetectorType.ORB]
+
+        result = self.matcher.match()
+        self.assertEqual(result.method(), DetectorType.ORB)
+        self.assertEqual(result.detector_contributions()[0]['good_matches'], 20)
+
+    def test_cascade_without_detectors_is_an_error(self):
+        self.assertRaises(ValueError, self.matcher.set_use_detector_cascade, [], 10, 1.0)
+
+
+class TestConcurrentDetectors(TestCase):
+    def setUp(self):
+        # other tests set the version to check the OpenCV 2 and 3 code paths
+        OpencvDetectorInterface.OPENCV_MAJOR = cv2.__version__[0]
+        self.threads = set()
+        self.matcher = FeatureMatcher(None, None)
+        self.matcher._find_matches_for_detector = Mock(side_effect=self._matches)
+
+    def _matches(self, detector):
+        """ Matches which depend only on the detector, with the first detectors taking longest so they finish
+        last when run concurrently. """
+        self.threads.add(threading.current_thread().name)
+        name = detector.detector_name()
+        time.sleep(0.01 * (len(DetectorType.LIST_ALL) - DetectorType.LIST_ALL.index(name)))
+        rng = np.random.RandomState(DetectorType.LIST_ALL.index(name))
+        points1 = rng.uniform(0, 100, (20, 2))
+        points2 = points1 + (5, 5) if name == DetectorType.ORB else rng.uniform(0, 100, (20, 2))
+        descriptors = np.zeros((20, 32), dtype=np.uint8)
+        features1 = FeatureSet.from_cv2([cv2.KeyPoint(float(x), float(y), 1.0) for x, y in points1], descriptors)
+        features2 = FeatureSet.from_cv2([cv2.KeyPoint(float(x), float(y), 1.0) for x, y in points2], descriptors)
+        indices = np.arange(20)
+        return FeatureMatchSet.from_arrays(indices, indices, np.zeros(20), features1, features2, detector)
+
+    def _match(self, concurrent):
+        self.matcher.set_use_all_detectors(concurrent=concurrent)
+        self.matcher.set_transform_method(TransformCalculator.TRANSLATION)
+        return self.matcher.match()
+
+    def test_concurrent_detectors_give_the_same_result(self):
+        serial = self._match(False)
+        self.threads = set()
+        concurrent = self._match(True)
+
+        self.assertGreater(len(self.threads), 1)
+        self.assertEqual([c['detector'] for c in concurrent.detector_contributions()], DetectorType.LIST_ALL)
+        self.assertEqual([(c['matches'], c['good_matches']) for c in concurrent.detector_contributions()],
+                         [(c['matches'], c['good_matches']) for c in serial.detector_contributions()])
+        self.assertEqual(concurrent.num_good_matches(), serial.num_good_matches())
+        self.assertEqual(concurrent.transform().translation(), serial.transform().translation())
+
+    def test_contributions_have_the_time_of_each_detector(self):
+        result = self._match(True)
+        for contribution in result.detector_contributions():
+            self.assertGreater(contribution['time'], 0)
+
+    def test_closed_detector_pool_is_made_again(self):
+        self._match(True)
+        pool = FeatureMatcher._get_detector_pool()
+        FeatureMatcher.close_detector_pool()
+        # Python 2 asserts the pool is running, Python 3 raises ValueError
+        self.assertRaises((ValueError, AssertionError), pool.map, len, [[]])
+
+        self.threads = set()
+        self._match(True)
+        self.assertGreater(len(self.threads), 1)
+        self.assertIsNot(FeatureMatcher._get_detector_pool(), pool)
+
+
+class TestIndexedFeatureMatcher(TestCase):
+    def setUp(self):
+        # other tests set the version to check the OpenCV 2 and 3 code paths
+        OpencvDetectorInterface.OPENCV_MAJOR = cv2.__version__[0]
+        self.image1 = Image.from_file(join(RESOURCES, "A01_1.jpg")).to_mono()
+        self.image2 = Image.from_file(join(RESOURCES, "A01_2.jpg")).to_mono()
+        self.rect1 = Rectangle(Point(1000.4, 1000.6), Point(1300.4, 1300.6))
+        self.rect2 = Rectangle(Point(950.2, 900.7), Point(1350.2, 1400.7))
+
+    def _matcher(self, feature_indexes):
+        matcher = IndexedFeatureMatcher(self.image1, self.image2, None, self.rect1, self.rect2, feature_indexes)
+        matcher.set_detector(DetectorType.ORB)
+        return matcher
+
+    def test_indexed_regions_are_not_cropped(self):
+        detector = DetectorFactory.create(DetectorType.ORB)
+        indexes = {DetectorType.ORB: (FeatureIndex.from_image(detector, self.image1),
+                                      FeatureIndex.from_image(detector, self.image2))}
+        with patch.object(Image, 'crop') as mock_crop:
+            self._matcher(indexes).match()
+        mock_crop.assert_not_called()
+
+    def test_detector_without_index_matches_as_the_bounded_matcher(self):
+        bounded = BoundedFeatureMatcher(self.image1, self.image2, None, self.rect1, self.rect2)
+        bounded.set_detector(DetectorType.ORB)
+        expected = bounded.match().matches()
+        matches = self._matcher({}).match().matches()
+
+        self.assertGreater(len(matches), 0)
+        np.testing.assert_array_equal(matches.points1(), expected.points1())
+        np.testing.assert_array_equal(matches.points2(), expected.points2())
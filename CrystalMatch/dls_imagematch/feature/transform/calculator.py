@@ -78,16 +78,21 @@ class TransformCalculator:
 
     # -------- FUNCTIONALITY -------------------
     def calculate_transform(self, matches):
+        """ Calculate the transform from the FeatureMatchSet. The reprojection error of each match and whether it
+        was used in the calculation are recorded in the set. """
         if len(matches) == 0:
             return None
 
+        points1 = matches.points1()
+        points2 = matches.points2()
+
         method = self._method
         if method == self.TRANSLATION:
-            transform, mask = self._calculate_median_translation(matches)
+            transform, mask = self._calculate_median_translation(points1, points2)
         elif method == self.HOMOGRAPHY:
-            transform, mask = self._calculate_homography_transform(matches)
+            transform, mask = self._calculate_homography_transform(points1, points2)
         elif method in self.AFFINE_METHODS:
-            transform, mask = self._calculate_affine_transform(matches)
+            transform, mask = self._calculate_affine_transform(points1, points2)
         else:
             log = logging.getLogger(".".join([__name__]))
             log.addFilter(logconfig.ThreadContextFilter())
@@ -95,30 +100,30 @@ class TransformCalculator:
             raise TransformCalculationError("Unrecognised transform method type")
 
         if transform is None:
-            self._mark_all_matches_unused(matches)
+            matches.set_in_transformation(np.zeros(len(matches), dtype=bool))
         else:
-            self._set_matches_reprojection_error(matches, transform)
-            self._mark_unused_matches(matches, mask)
+            matches.set_projected_points2(transform.transform_array(points1))
+            matches.set_in_transformation(mask)
 
         return transform
 
-    def _calculate_median_translation(self, matches):
-        matches, mask = self._pre_filter(matches)
+    def _calculate_median_translation(self, points1, points2):
+        mask = self._pre_filter(points1, points2)
 
-        deltas = [m.point2() - m.point1() for m in matches]
-        x = -np.median([d.x for d in deltas])
-        y = -np.median([d.y for d in deltas])
+        deltas = points2[mask] - points1[mask]
+        x = -np.median(deltas[:, 0])
+        y = -np.median(deltas[:, 1])
         point = Point(x, y)
         transform = Translation(point)
 
         return transform, mask
 
-    def _calculate_homography_transform(self, matches):
+    def _calculate_homography_transform(self, points1, points2):
         transform = None
-        matches, mask = self._pre_filter(matches)
+        mask = self._pre_filter(points1, points2)
 
-        if self._has_enough_matches_for_transform(matches):
-            image1_pts, image2_pts = self._get_np_points(matches)
+        if self._has_enough_matches_for_transform(np.count_nonzero(mask)):
+            image1_pts, image2_pts = self._get_np_points(points1[mask], points2[mask])
 
             homography, new_mask = cv2.findHomography(image1_pts, image2_pts, 0, 0)
             mask = self._combine_masks(mask, new_mask)
@@ -126,14 +131,14 @@ class TransformCalculator:
 
         return transform, mask
 
-    def _calculate_affine_transform(self, matches):
+    def _calculate_affine_transform(self, points1, points2):
         """ Note: internally, estimateRigidTransform uses some sort of RANSAC method as a filter, but with
         hardcoded (and not very good) parameters. """
         transform = None
-        matches, mask = self._pre_filter(matches)
+        mask = self._pre_filter(points1, points2)
 
-        if self._has_enough_matches_for_transform(matches):
-            image1_pts, image2_pts = self._get_np_points(matches)
+        if self._has_enough_matches_for_transform(np.count_nonzero(mask)):
+            image1_pts, image2_pts = self._get_np_points(points1[mask], points2[mask])
             use_full = self._method == self.AFFINE_FULL
 
             affine = OpencvDetectorInterface().estimate_rigid_transform(image1_pts, image2_pts, use_full)
@@ -144,26 +149,18 @@ class TransformCalculator:
 
         return transform, mask
 
-    def _has_enough_matches_for_transform(self, matches):
-        return len(matches) >= self._MIN_TRANSFORM_MATCHES
-
-    def _pre_filter(self, matches):
-        mask = [True] * len(matches)
-
-        if self._filter != self.NO_FILTER:
-            mask = self._make_pre_filter_mask(matches)
-            matches = [m for (m, i) in zip(matches, mask) if i]
+    def _has_enough_matches_for_transform(self, num_matches):
+        return num_matches >= self._MIN_TRANSFORM_MATCHES
 
-        return matches, mask
+    def _pre_filter(self, points1, points2):
+        """ Boolean mask of the matches which pass the filter. """
+        mask = np.ones(len(points1), dtype=bool)
 
-    def _make_pre_filter_mask(self, matches):
-        mask = [True] * len(matches)
-
-        if self._has_enough_matches_for_transform(matches):
-            image1_pts, image2_pts = self._get_np_points(matches)
+        if self._filter != self.NO_FILTER and self._has_enough_matches_for_transform(len(points1)):
+            image1_pts, image2_pts = self._get_np_points(points1, points2)
             filter_code = self._get_filter_code()
-            _, mask = cv2.findHomography(image1_pts, image2_pts, filter_code, self._ransac_threshold)
-            mask = self._sanitize_mask(mask)
+            _, filter_mask = cv2.findHomography(image1_pts, image2_pts, filter_code, self._ransac_threshold)
+            mask = self._sanitize_mask(filter_mask, len(points1))
 
         return mask
 
@@ -182,42 +179,20 @@ class TransformCalculator:
     def _combine_masks(mask1, mask2):
         """ Create a new mask by combining the two masks. Mask 2 has a length equal to the number of True elements in
         Mask 1. Each element in Mask 2 corresponds to a True element in Mask 1"""
-        total_mask = []
-        j = 0
-        for bit in mask1:
-            total_mask.append(bit and mask2[j])
-            if bit:
-                j += 1
-
+        total_mask = np.array(mask1, dtype=bool)
+        total_mask[total_mask] = TransformCalculator._sanitize_mask(mask2, np.count_nonzero(total_mask))
         return total_mask
 
     @staticmethod
-    def _get_np_points(matches):
-        image1_pts = [m.point1().tuple() for m in matches]
-        image1_pts = np.float32(image1_pts).reshape(-1, 1, 2)
-        image2_pts = [m.point2().tuple() for m in matches]
-        image2_pts = np.float32(image2_pts).reshape(-1, 1, 2)
+    def _get_np_points(points1, points2):
+        """ The (n, 2) arrays of points in the form used by the OpenCV functions. """
+        image1_pts = np.float32(points1).reshape(-1, 1, 2)
+        image2_pts = np.float32(points2).reshape(-1, 1, 2)
         return image1_pts, image2_pts
 
     @staticmethod
-    def _sanitize_mask(mask):
-        return [m in [1, [1], True] for m in mask]
-
-    @staticmethod
-    def _mark_unused_matches(matches, mask):
-        mask = TransformCalculator._sanitize_mask(mask)
-        for match, include in zip(matches, mask):
-            match.set_in_transformation(include)
-
-    @staticmethod
-    def _mark_all_matches_unused(matches):
-        for match in matches:
-            match.set_in_transformation(False)
-
-    @staticmethod
-    def _set_matches_reprojection_error(matches, transform):
-        point1s = [m.point1() for m in matches]
-        projected_point2s = transform.transform_points(point1s)
-
-        for i, match in enumerate(matches):
-            match.set_point2_projected(projected_point2s[i])
+    def _sanitize_mask(mask, length):
+        """ Boolean array from a mask returned by OpenCV (an (n, 1) array of 0 and 1) - all False if there is none. """
+        if mask is None:
+            return np.zeros(length, dtype=bool)
+        return np.asarray(mask).reshape(-1) == 1
@@ -0,0 +1,113 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+from mock import Mock
+
+from CrystalMatch.dls_imagematch.feature.detector.feature_set import FeatureSet
+from CrystalMatch.dls_imagematch.feature.detector.opencv_detector_interface import OpencvDetectorInterface
+from CrystalMatch.dls_imagematch.feature.match.match_set import FeatureMatchSet
+from CrystalMatch.dls_imagematch.feature.transform.calculator import TransformCalculator
+from CrystalMatch.dls_imagematch.feature.transform.trs_affine import AffineTransformation
+from CrystalMatch.dls_imagematch.feature.transform.trs_homography import HomographyTransformation
+from CrystalMatch.dls_imagematch.feature.transform.trs_translation import Translation
+from CrystalMatch.dls_util.shape import Point
+
+
+def _match_set(points1, points2):
+    detector = Mock()
+    detector.keypoint_limit.return_value = 100
+    detector.extractor_distance_factor.return_value = 1.0
+    features = []
+    for points in (points1, points2):
+        keypoints = [cv2.KeyPoint(float(x), float(y), 1.0) for x, y in points]
+        features.append(FeatureSet.from_cv2(keypoints, np.zeros((len(points), 32), dtype=np.uint8)))
+
+    n = len(points1)
+    indices = np.arange(n)
+    return FeatureMatchSet.from_arrays(indices, indices, np.zeros(n), features[0], features[1], detector)
+
+
+class TestTransformCalculator(TestCase):
+    def setUp(self):
+        # other tests set the version to check the OpenCV 2 and 3 code paths
+        OpencvDetectorInterface.OPENCV_MAJOR = cv2.__version__[0]
+        rng = np.random.RandomState(5)
+        self.points1 = rng.uniform(0, 300, (40, 2)).round(1)
+        matrix = np.array([[0.99, -0.05, 12.0], [0.05, 0.99, -7.0]])
+        self.points2 = self.points1.dot(matrix[:, :2].T) + matrix[:, 2]
+        # a few bad matches
+        self.points2[[3, 17, 30]] += 80
+
+    def _calculate(self, method, filter_obj=TransformCalculator.RANSAC):
+        matches = _match_set(self.points1, self.points2)
+        calc = TransformCalculator()
+        calc.set_method(method)
+        calc.set_filter(filter_obj)
+        return calc.calculate_transform(matches), matches
+
+    def test_filter_excludes_bad_matches(self):
+        for method in [TransformCalculator.AFFINE_FULL, TransformCalculator.HOMOGRAPHY]:
+            transform, matches = self._calculate(method)
+            self.assertIsNotNone(transform)
+            expected = np.ones(len(matches), dtype=bool)
+            expected[[3, 17, 30]] = False
+            np.testing.assert_array_equal(matches.in_transformation(), expected)
+
+    def test_reprojection_errors_of_good_matches_are_small(self):
+        transform, matches = self._calculate(TransformCalculator.AFFINE_FULL)
+        errors = matches.reprojection_errors()
+        self.assertLess(errors[matches.in_transformation()].max(), 0.01)
+        self.assertGreater(errors[3], 50)
+        np.testing.assert_allclose(matches.projected_points2(), transform.transform_array(matches.points1()))
+
+    def test_median_translation(self):
+        self.points2 = self.points1 + (5, -3)
+        self.points2[0] += 100
+        transform, matches = self._calculate(TransformCalculator.TRANSLATION, TransformCalculator.NO_FILTER)
+        self.assertEqual(transform.translation(), Point(-5, 3))
+        self.assertTrue(np.all(matches.in_transformation()))
+
+    def test_no_transform_marks_all_matches_unused(self):
+        self.points1, self.points2 = self.points1[:3], self.points2[:3]
+        transform, matches = self._calculate(TransformCalculator.AFFINE_FULL)
+        self.assertIsNone(transform)
+        self.assertFalse(np.any(matches.in_transformation()))
+
+    def test_combine_masks(self):
+        mask1 = np.array([True, False, True, True, False])
+        mask2 = np.array([[1], [0], [1]], dtype=np.uint8)
+        np.testing.assert_array_equal(TransformCalculator._combine_masks(mask1, mask2),
+                                      [True, False, False, True, False])
+
+
+class TestTransformArrays(TestCase):
+    def setUp(self):
+        self.points = [Point(1.5, 2), Point(-3, 40.25), Point(100, 7)]
+        self.array = np.array([[p.x, p.y] for p in self.points])
+
+    def _assert_same(self, transformed_points, transformed_array):
+        self.assertEqual(transformed_array.shape, (len(self.points), 2))
+        np.testing.assert_allclose(transformed_array, [[p.x, p.y] for p in transformed_points], atol=1e-4)
+
+    def test_affine_array_matches_points(self):
+        transform = AffineTransformation(np.array([[1.1, 0.1, 5], [-0.1, 0.9, 2], [0, 0, 1]], np.float32))
+        self._assert_same(transform.transform_points(self.points), transform.transform_array(self.array))
+        np.testing.assert_allclose(transform.inverse_transform_array(transform.transform_array(self.array)),
+                                   self.array, atol=1e-4)
+
+    def test_homography_array_matches_points(self):
+        transform = HomographyTransformation(np.array([[1.1, 0.1, 5], [-0.1, 0.9, 2], [1e-4, 0, 1]]))
+        self._assert_same(transform.transform_points(self.points), transform.transform_array(self.array))
+        self._assert_same(transform.inverse_transform_points(self.points),
+                          transform.inverse_transform_array(self.array))
+
+    def test_translation_array_matches_points(self):
+        transform = Translation(Point(3, -4))
+        self._assert_same(transform.transform_points(self.points), transform.transform_array(self.array))
+        self._assert_same(transform.inverse_transform_points(self.points),
+                          transform.inverse_transform_array(self.array))
+
+    def test_empty_array(self):
+        transform = AffineTransformation(np.eye(3, dtype=np.float32))
+        self.assertEqual(transform.transform_array(np.zeros((0, 2))).shape, (0, 2))
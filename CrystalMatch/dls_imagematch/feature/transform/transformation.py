@@ -1,3 +1,6 @@
+import cv2
+import numpy as np
+
 from CrystalMatch.dls_util.shape import Polygon
 
 
@@ -9,6 +12,10 @@ class Transformation:
     def transform_points(self, points):
         raise NotImplementedError()
 
+    def transform_array(self, points):
+        """ Transform an array of shape (n, 2) of points, returning an array of the same shape. """
+        raise NotImplementedError()
+
     def transform_image(self, image, output_size):
         raise NotImplementedError()
 
@@ -16,3 +23,15 @@ class Transformation:
         vertices = polygon.vertices()
         transformed = self.transform_points(vertices)
         return Polygon(transformed)
+
+    @staticmethod
+    def _transform_array(points, matrix):
+        """ Transform an (n, 2) array of points; float32 and float64 arrays keep their type. """
+        points = np.asarray(points)
+        if points.dtype not in (np.float32, np.float64):
+            points = points.astype(np.float64)
+        if len(points) == 0:
+            return points.reshape(0, 2)
+
+        transformed = cv2.perspectiveTransform(points.reshape(-1, 1, 2), matrix)
+        return transformed.reshape(-1, 2)
@@ -9,6 +9,7 @@ class AffineTransformation(Transformation):
     def __init__(self, affine_matrix):
         Transformation.__init__(self)
         self._affine_matrix = affine_matrix
+        _, self._affine_inverse = cv2.invert(self._affine_matrix)
 
     def transform_points(self, points):
         np_array = self._points_to_np_array(points)
@@ -16,6 +17,12 @@ class AffineTransformation(Transformation):
         transformed = self._np_array_to_points(transformed)
         return transformed
 
+    def transform_array(self, points):
+        return self._transform_array(points, self._affine_matrix)
+
+    def inverse_transform_array(self, points):
+        return self._transform_array(points, self._affine_inverse)
+
     def transform_image(self, image, output_size):
         raise NotImplementedError()
 
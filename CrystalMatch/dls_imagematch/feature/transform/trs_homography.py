@@ -32,12 +32,18 @@ class HomographyTransformation(Transformation):
         transformed = self._np_array_to_points(transformed)
         return transformed
 
+    def transform_array(self, points):
+        return self._transform_array(points, self._homography)
+
     def inverse_transform_points(self, points):
         np_array = self._points_to_np_array(points)
         transformed = cv2.perspectiveTransform(np_array, self._homography_inverse)
         transformed = self._np_array_to_points(transformed)
         return transformed
 
+    def inverse_transform_array(self, points):
+        return self._transform_array(points, self._homography_inverse)
+
     @staticmethod
     def _points_to_np_array(points):
         points_list = [[p.x, p.y] for p in points]
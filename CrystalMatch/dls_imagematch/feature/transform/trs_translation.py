@@ -1,3 +1,5 @@
+import numpy as np
+
 from CrystalMatch.dls_util.imaging import Image
 from CrystalMatch.dls_imagematch.feature.transform.transformation import Transformation
 
@@ -17,3 +19,9 @@ class Translation(Transformation):
     def inverse_transform_points(self, points):
         transformed = [p + self._translation for p in points]
         return transformed
+
+    def transform_array(self, points):
+        return np.asarray(points) - (self._translation.x, self._translation.y)
+
+    def inverse_transform_array(self, points):
+        return np.asarray(points) + (self._translation.x, self._translation.y)
@@ -130,4 +130,10 @@ def set_additional_handler(file_name):
     handler = logging.handlers.RotatingFileHandler(file_name, maxBytes=MAXBYTES, backupCount=BACKUPCOUNT, encoding=ENCODING)
     json_format = default_config.get("formatters",{}).get("json",{}).get("format",{})
     handler.setFormatter(logging.Formatter(json_format))
-    logger.addHandler(handler)
\ No newline at end of file
+    logger.addHandler(handler)
+    return handler
+
+def remove_additional_handler(handler):
+    """ Stop logging to a handler added by set_additional_handler() and close its file. """
+    logging.getLogger().removeHandler(handler)
+    handler.close()
\ No newline at end of file
@@ -0,0 +1,60 @@
+from pkg_resources import require
+require('pygelf>=0.3.1')
+require("numpy>=1.11.1")
+require("scipy>=0.19.1")
+
+import argparse
+import os
+import sys
+from os.path import splitext
+
+from CrystalMatch.dls_imagematch import logconfig
+from CrystalMatch.dls_imagematch.service.batch import BatchManifest, BatchRunner
+
+
+def main():
+    script_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Run Crystal Matching for every job (row) of a manifest file over a "
+                                                 "pool of processes, printing the JSON result of each job on a line "
+                                                 "of its own as soon as the job finishes.")
+    parser.add_argument('manifest',
+                        metavar="manifest_path",
+                        help="JSON or CSV (.csv) file listing the jobs, with the fields formulatrix_image, "
+                             "beamline_stack, points, scale and job_id (see BatchManifest).")
+    parser.add_argument('-o', '--output',
+                        metavar="path",
+                        help="Directory for the focused images - the image of each job is written to a directory "
+                             "named after its row number. Defaults to [manifest name]_output next to the manifest.")
+    parser.add_argument('--config',
+                        metavar="path",
+                        help="Sets the configuration directory used for every job.")
+    parser.add_argument('--log',
+                        metavar="path",
+                        help="Write log files to the directory specified by path.")
+    parser.add_argument('-p', '--processes',
+                        metavar="n",
+                        type=int,
+                        help="Number of jobs run at once (default: the number of cores).")
+    parser.add_argument('--max_jobs_per_process',
+                        metavar="n",
+                        type=int,
+                        default=BatchRunner.DEFAULT_MAX_JOBS_PER_PROCESS,
+                        help="Jobs run by a worker process before it is replaced, to bound its memory "
+                             "(default: %(default)s).")
+    args = parser.parse_args()
+
+    common_args = []
+    if args.config is not None:
+        common_args += ['--config', os.path.abspath(args.config)]
+    if args.log is not None:
+        common_args += ['--log', os.path.abspath(args.log)]
+    output_dir = args.output if args.output is not None else splitext(args.manifest)[0] + "_output"
+
+    logconfig.setup_logging()
+    runner = BatchRunner(script_path, processes=args.processes, max_jobs_per_process=args.max_jobs_per_process)
+    failed = runner.run(BatchManifest(args.manifest), output_dir, common_args, sys.stdout)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+from __future__ import print_function
+
+import json
+import os
+import socket
+import sys
+
+SOCKET_ENV_VAR = "CRYSTAL_MATCH_SOCKET"
+DEFAULT_SOCKET_PATH = os.path.join("~", ".CrystalMatch", "crystal_match.sock")
+
+
+class CrystalMatchClient:
+    """ Command line compatible replacement for CrystalMatch which sends the request to a running CrystalMatchDaemon
+    and prints its output. If no daemon is running the match is run in this process, as CrystalMatch does.
+
+    Only the standard library is imported unless the match is run here, so starting the client is quick.
+    """
+    def __init__(self, socket_path):
+        self._socket_path = socket_path
+
+    def run(self, argv):
+        """ Run the match for the command line arguments and return the exit status. """
+        request = {'args': argv, 'cwd': os.getcwd(), 'prog': os.path.basename(sys.argv[0])}
+        try:
+            response = self._send(request)
+        except (socket.error, ValueError):
+            # No daemon is running, or it closed the connection without a valid response
+            return self._run_in_process(argv)
+
+        for line in response.get('output', []):
+            print(line)
+        if 'error' in response:
+            sys.stderr.write(response['error'])
+        return response.get('exit_status', 0)
+
+    def _send(self, request):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(self._socket_path)
+            connection.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            response = connection.makefile("rb").readline()
+        finally:
+            connection.close()
+        response = json.loads(response.decode("utf-8"))
+        if not isinstance(response, dict):
+            raise ValueError("Invalid response from the daemon")
+        return response
+
+    @staticmethod
+    def _run_in_process(argv):
+        from CrystalMatch.dls_imagematch import main_service
+        main_service.main(argv)
+        return 0
+
+
+def default_socket_path():
+    """ The socket used by the daemon and the client: $CRYSTAL_MATCH_SOCKET if it is set, otherwise
+    ~/.CrystalMatch/crystal_match.sock. """
+    return os.path.abspath(os.path.expanduser(os.getenv(SOCKET_ENV_VAR, DEFAULT_SOCKET_PATH)))
+
+
+def main():
+    client = CrystalMatchClient(default_socket_path())
+    sys.exit(client.run(sys.argv[1:]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+from pkg_resources import require
+require('pygelf>=0.3.1')
+require("numpy>=1.11.1")
+require("scipy>=0.19.1")
+
+import argparse
+import os
+import signal
+import sys
+
+from CrystalMatch.dls_imagematch import logconfig
+from CrystalMatch.dls_imagematch.main_client import default_socket_path
+from CrystalMatch.dls_imagematch.service.daemon import CrystalMatchDaemon
+
+
+def main():
+    script_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Run Crystal Matching as a daemon which handles requests (the command "
+                                                 "line arguments of CrystalMatch as JSON lines) without starting a new "
+                                                 "process for each. Use CrystalMatchClient to send requests.")
+    parser.add_argument('--socket',
+                        metavar="path",
+                        default=default_socket_path(),
+                        help="Unix socket to listen on (default: $CRYSTAL_MATCH_SOCKET or "
+                             "~/.CrystalMatch/crystal_match.sock).")
+    parser.add_argument('--stdin',
+                        action='store_true',
+                        help="Read the requests from stdin and write the responses to stdout instead of using a "
+                             "socket.")
+    args = parser.parse_args()
+
+    # Exit cleanly on kill, so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    logconfig.setup_logging()
+    daemon = CrystalMatchDaemon(script_path)
+    if args.stdin:
+        daemon.serve_stream(sys.stdin, sys.stdout)
+    else:
+        daemon.serve_socket(args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,7 +17,8 @@ class CrystalMatchService:
     def __init__(self):
        pass
 
-    def run(self):
+    def run(self, argv=None):
+        """ Run the match for the command line arguments (argv, or sys.argv if None). """
         log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
         log.addFilter(logconfig.ThreadContextFilter())
         try:
@@ -26,6 +27,7 @@ class CrystalMatchService:
             script_path = os.path.dirname(os.path.abspath(__file__))
             parser_manager.set_script_path(script_path)
             parser_manager.build_parser()
+            parser_manager.set_argv(argv)
 
             logconfig.set_additional_handler(parser_manager.get_log_file_path())
 
@@ -33,11 +35,10 @@ class CrystalMatchService:
 
             log.info('used config directory: '+ config_directory +', path to script: '+ script_path)
 
-            scale_override = parser_manager.get_scale_override()
             to_json_flag = parser_manager.get_to_json()
 
-            service = CrystalMatch(config_directory, scale_override=scale_override)
-            service_results = service.perform_match(parser_manager)
+            service = CrystalMatch(config_directory)
+            service_results = service.perform_match(parser_manager.get_match_request())
 
             total_time = time.time() - total_start
             service_results.log_final_result(total_time)
@@ -47,10 +48,10 @@ class CrystalMatchService:
 
             log.error(e)
 
-def main():
+def main(argv=None):
     logconfig.setup_logging()
     service = CrystalMatchService()
-    service.run()
+    service.run(argv)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1 +1,2 @@
 from CrystalMatch.dls_imagematch.service.service import CrystalMatch
+from CrystalMatch.dls_imagematch.service.match_request import MatchRequest
@@ -0,0 +1,179 @@
+from __future__ import division
+
+import csv
+import json
+import logging
+import time
+from multiprocessing import Pool
+from os.path import abspath, dirname, join, splitext
+
+from CrystalMatch.dls_imagematch import logconfig
+from CrystalMatch.dls_imagematch.service.daemon import CrystalMatchDaemon
+from CrystalMatch.dls_imagematch.service.service_result import ServiceResult, DecimalEncoder
+
+
+class BatchJob:
+    """ One row of a batch manifest: the arguments of a single CrystalMatch run. """
+    def __init__(self, row_number, formulatrix_image, beamline_stack, points=None, scale=None, job_id=None):
+        self.row_number = row_number
+        self.formulatrix_image = formulatrix_image
+        self.beamline_stack = beamline_stack
+        self.points = points if points is not None else []
+        self.scale = scale
+        # Every output line needs to say which job it is for
+        self.job_id = job_id if job_id else str(row_number)
+
+    def to_args(self, output_dir, common_args):
+        """ The CrystalMatch command line arguments for the job. The focused image is written to a directory of
+        its own under output_dir, as jobs would otherwise overwrite each other's. """
+        args = [self.formulatrix_image, self.beamline_stack] + self.points
+        args += ['--job', self.job_id, '--output', join(output_dir, str(self.row_number)), '--to_json']
+        if self.scale:
+            args += ['--scale', self.scale]
+        return args + common_args
+
+
+class BatchManifest:
+    """ Reads the jobs of a batch run from a JSON or CSV manifest file. Both have the fields:
+        formulatrix_image - the Formulatrix image file
+        beamline_stack - the directory of beamline images to focus or a single (already focused) image
+        points - (optional) the points to match: a list of "x,y" strings or [x, y] pairs in JSON, "x,y" strings
+                 separated by spaces in CSV
+        scale - (optional) the scale between the images, as for --scale
+        job_id - (optional) reported in the output, the row number (from 1) if not given
+
+    A JSON manifest is a list of objects, a CSV manifest has a header row with the field names. Relative paths
+    are relative to the directory of the manifest.
+    """
+    FIELDS = FORMULATRIX_IMAGE, BEAMLINE_STACK, POINTS, SCALE, JOB_ID = \
+        "formulatrix_image", "beamline_stack", "points", "scale", "job_id"
+
+    def __init__(self, path):
+        self._path = abspath(path)
+
+    def directory(self):
+        return dirname(self._path)
+
+    def read_jobs(self):
+        if splitext(self._path)[1].lower() == ".csv":
+            rows = self._read_csv()
+        else:
+            rows = self._read_json()
+
+        jobs = []
+        for row_number, row in enumerate(rows, 1):
+            missing = [field for field in (self.FORMULATRIX_IMAGE, self.BEAMLINE_STACK) if not row.get(field)]
+            if missing:
+                raise ValueError("Manifest row {} has no {}".format(row_number, ", ".join(missing)))
+            jobs.append(BatchJob(row_number, row[self.FORMULATRIX_IMAGE], row[self.BEAMLINE_STACK],
+                                 points=self._parse_points(row.get(self.POINTS)),
+                                 scale=row.get(self.SCALE), job_id=row.get(self.JOB_ID)))
+        return jobs
+
+    def _read_json(self):
+        with open(self._path, 'rt') as f:
+            rows = json.load(f)
+        if not isinstance(rows, list):
+            raise ValueError("A JSON manifest must be a list of jobs: " + self._path)
+        return rows
+
+    def _read_csv(self):
+        with open(self._path, 'rt') as f:
+            return [dict((key.strip(), value.strip()) for key, value in row.items() if key is not None and value)
+                    for row in csv.DictReader(f)]
+
+    @staticmethod
+    def _parse_points(points):
+        if not points:
+            return []
+        if not isinstance(points, list):
+            points = points.split()
+        return [",".join(str(coordinate) for coordinate in point) if isinstance(point, list) else str(point)
+                for point in points]
+
+
+# The daemon of each worker process, which keeps the configuration loaded between the jobs the worker runs
+_worker_daemon = None
+
+
+def _init_worker(script_path):
+    global _worker_daemon
+    logconfig.setup_logging()
+    # The pool's worker processes are daemonic, which can't start processes of their own - so the stacks are
+    # focused in the worker process itself. The jobs running at the same time keep the cores busy.
+    _worker_daemon = CrystalMatchDaemon(script_path, focus_workers=1)
+
+
+def _run_job(job_request):
+    args, cwd, job = job_request
+    # Any error in the job is in the response (see CrystalMatchDaemon.run_request), so it can't stop the batch
+    response = _worker_daemon.run_request(args, cwd=cwd, request_id=job.job_id)
+    if 'result' in response:
+        return response['result']
+
+    # The job stopped before matching (e.g. a missing image) - report it in the same form as a failed match,
+    # with the last line of the error (the usage message before it is the same for every job)
+    error_lines = response.get('error', "").strip().splitlines()
+    result = ServiceResult(job.job_id, join(cwd, job.formulatrix_image), join(cwd, job.beamline_stack))
+    result.set_err_state(RuntimeError(error_lines[-1] if error_lines else "Job did not run"))
+    return result.json_object()
+
+
+class BatchRunner:
+    """ Runs the jobs of a manifest over a pool of processes and writes the ServiceResult JSON object of each job
+    (as printed by CrystalMatch --to_json) as one line to the output stream as soon as the job finishes - so the
+    lines are in the order the jobs finish, not the order of the manifest.
+
+    Memory is bounded by the number of processes: each process runs one job at a time, and is replaced after it
+    has run max_jobs_per_process jobs so memory held between jobs can't grow without limit.
+    """
+    DEFAULT_MAX_JOBS_PER_PROCESS = 50
+
+    def __init__(self, script_path, processes=None, max_jobs_per_process=DEFAULT_MAX_JOBS_PER_PROCESS):
+        """
+        :param script_path: directory of the CrystalMatch scripts (see CrystalMatchDaemon)
+        :param processes: number of worker processes, one for each core if None
+        :param max_jobs_per_process: jobs a worker process runs before it is replaced, None for no limit
+        """
+        self._script_path = script_path
+        self._processes = processes
+        self._max_jobs_per_process = max_jobs_per_process
+
+    def run(self, manifest, output_dir, common_args, output_stream):
+        """ Run the jobs of the manifest, returning the number of jobs which failed.
+        :param manifest: the BatchManifest
+        :param output_dir: directory under which the focused image of each job is written
+        :param common_args: CrystalMatch command line arguments added to every job (e.g. --config)
+        :param output_stream: stream the results are written to
+        """
+        log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
+        log.addFilter(logconfig.ThreadContextFilter())
+        start = time.time()
+        jobs = manifest.read_jobs()
+        job_requests = [(job.to_args(abspath(output_dir), common_args), manifest.directory(), job) for job in jobs]
+
+        failed = 0
+        pool = Pool(self._processes, initializer=_init_worker, initargs=(self._script_path,),
+                    maxtasksperchild=self._max_jobs_per_process)
+        try:
+            for result in pool.imap_unordered(_run_job, job_requests):
+                if result['exit_code']['code'] != 0:
+                    failed += 1
+                output_stream.write(json.dumps(result, cls=DecimalEncoder) + "\n")
+                output_stream.flush()
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+        total_time = time.time() - start
+        extra = {'batch_jobs': len(jobs),
+                 'batch_failed': failed,
+                 'batch_time': total_time,
+                 'batch_jobs_per_second': len(jobs) / total_time if total_time > 0 else 0}
+        log = logging.LoggerAdapter(log, extra)
+        log.info("Batch Complete")
+        log.debug(extra)
+        return failed
@@ -0,0 +1,203 @@
+import json
+import logging
+import os
+import sys
+import time
+from os.path import join
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from CrystalMatch.dls_focusstack.config.focus_config import FocusConfig
+from CrystalMatch.dls_focusstack.focus.focus_stack_lap_pyramid import FocusStack
+from CrystalMatch.dls_focusstack.focus.worker_pool import WorkerPool
+from CrystalMatch.dls_imagematch import logconfig
+from CrystalMatch.dls_imagematch.service.parser_manager import ParserManager
+from CrystalMatch.dls_imagematch.service.service import CrystalMatch
+
+
+class CrystalMatchDaemon:
+    """ Runs crystal matching requests one after another in a single long running process, so the modules, the
+    configuration files and the detector instance pool are loaded once rather than for every match.
+
+    Each request is one line of JSON: {"args": [...], "cwd": "...", "prog": "...", "id": ...}, where args are the
+    command line arguments of the CrystalMatch command (without the program name), cwd is the directory relative
+    paths in them are relative to, prog is the program name used in the usage message and id is returned in the
+    response (all but args are optional). Each response is one line of JSON: {"id": ..., "result": ..., "output": [...]},
+    where result is the JSON object of the ServiceResult (as printed by CrystalMatch --to_json) and output is the
+    lines the command would print. A request which stops before the matching starts (e.g. invalid arguments or
+    --help) has no result but an "exit_status" and, unless it is 0, an "error" message.
+
+    The configuration files are read when a configuration directory is first used - restart the daemon to pick up
+    changes to them.
+
+    The worker processes which focus the beamline stacks are kept running between requests (one WorkerPool for each
+    number of workers) until close() is called.
+    """
+    def __init__(self, script_path, focus_workers=None):
+        """
+        :param script_path: directory of the CrystalMatch scripts, used to find the default configuration and log
+        directories (the same as for CrystalMatchService)
+        :param focus_workers: number of processes used to focus a stack (see WorkerPool), the Worker Processes of
+        the focus stack configuration of each request if None
+        """
+        self._script_path = script_path
+        self._focus_workers = focus_workers
+        self._services = {}
+        self._focus_pools = {}
+
+    def handle_request(self, request_line):
+        """ Run the request and return the response object. """
+        log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
+        log.addFilter(logconfig.ThreadContextFilter())
+        try:
+            request = json.loads(request_line)
+            args = [str(arg) for arg in request['args']]
+        except (ValueError, KeyError, TypeError) as e:
+            log.error("Invalid daemon request: " + str(e))
+            return {'id': None, 'error': "Invalid request: " + str(e) + "\n", 'exit_status': 2}
+
+        return self.run_request(args, request.get('cwd'), request.get('prog'), request.get('id'))
+
+    def run_request(self, args, cwd=None, prog=None, request_id=None):
+        """ Run the request given by its fields (see the class description) and return the response object. """
+        log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
+        log.addFilter(logconfig.ThreadContextFilter())
+        response = {'id': request_id}
+        working_dir = os.getcwd()
+        try:
+            if cwd is not None:
+                os.chdir(cwd)
+            response.update(self._run(args, prog))
+        except SystemExit as e:
+            # Missing files make the parser manager exit
+            response.update({'error': "Request exited with status " + str(e.code) + "\n", 'exit_status': e.code})
+        except Exception as e:
+            # Any other error (e.g. an invalid --scale) fails this request only, the daemon keeps running
+            log.error(e)
+            response.update({'error': str(e) + "\n", 'exit_status': 1})
+        finally:
+            os.chdir(working_dir)
+        return response
+
+    def _run(self, args, prog):
+        total_start = time.time()
+        parser_manager = ParserManager()
+        parser_manager.set_script_path(self._script_path)
+        parser_manager.build_parser()
+        if prog is not None:
+            parser_manager.parser.prog = prog
+        parser_manager.set_argv(args)
+
+        parse_exit = self._parse_args(parser_manager)
+        if parse_exit is not None:
+            return parse_exit
+
+        try:
+            # The log file of the request is only written to while the request runs
+            log_handler = logconfig.set_additional_handler(parser_manager.get_log_file_path())
+            try:
+                config_directory = parser_manager.get_config_dir()
+                service = self._get_service(config_directory)
+                focus_pool = self._get_focus_pool(config_directory)
+                service_results = service.perform_match(parser_manager.get_match_request(focus_pool))
+
+                service_results.log_final_result(time.time() - total_start)
+                return {'result': service_results.json_object(),
+                        'output': service_results.results_text(parser_manager.get_to_json())}
+            finally:
+                logconfig.remove_additional_handler(log_handler)
+        finally:
+            parser_manager.close_files()
+
+    @staticmethod
+    def _parse_args(parser_manager):
+        """ Parse the arguments of the request. If the parser exits (for --help, --version or invalid arguments),
+        returns the response with what it printed instead of writing it to the console of the daemon. """
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = StringIO(), StringIO()
+        try:
+            parser_manager.get_args()
+            return None
+        except SystemExit as e:
+            response = {'output': sys.stdout.getvalue().splitlines(), 'exit_status': e.code}
+            if e.code != 0:
+                response['error'] = sys.stderr.getvalue()
+            return response
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+
+    def _get_service(self, config_directory):
+        """ The CrystalMatch service for the configuration, created (reading the configuration files) the first time
+        the configuration is used. The --scale of a request is part of its MatchRequest, so the service is shared by
+        requests with different scales. """
+        if config_directory not in self._services:
+            log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
+            log.addFilter(logconfig.ThreadContextFilter())
+            log.info("Loading configuration from: " + config_directory)
+            self._services[config_directory] = CrystalMatch(config_directory)
+        return self._services[config_directory]
+
+    def _get_focus_pool(self, config_directory):
+        """ The WorkerPool used to focus the stacks of requests with the configuration. """
+        workers = self._focus_workers
+        if workers is None:
+            focus_config = FocusConfig(join(config_directory, FocusStack.CONFIG_FILE_NAME))
+            workers = focus_config.worker_processes.value()
+        if workers not in self._focus_pools:
+            self._focus_pools[workers] = WorkerPool(workers)
+        return self._focus_pools[workers]
+
+    def close(self):
+        """ Stop the focus worker processes. """
+        for pool in self._focus_pools.values():
+            pool.close()
+        self._focus_pools = {}
+
+    def serve_stream(self, input_stream, output_stream):
+        """ Handle the requests read from the input stream (one per line), writing each response to the output stream,
+        until the input stream ends. """
+        try:
+            for line in iter(input_stream.readline, ''):
+                if line.strip() == "":
+                    continue
+                output_stream.write(json.dumps(self.handle_request(line)) + "\n")
+                output_stream.flush()
+        finally:
+            self.close()
+
+    def serve_socket(self, socket_path):
+        """ Handle the requests sent to the Unix socket, one connection at a time, until interrupted. """
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        elif not os.path.isdir(os.path.dirname(socket_path)):
+            os.makedirs(os.path.dirname(socket_path))
+
+        daemon = self
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in iter(self.rfile.readline, b''):
+                    if line.strip() == b"":
+                        continue
+                    response = json.dumps(daemon.handle_request(line.decode("utf-8"))) + "\n"
+                    self.wfile.write(response.encode("utf-8"))
+
+        server = socketserver.UnixStreamServer(socket_path, RequestHandler)
+        log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
+        log.addFilter(logconfig.ThreadContextFilter())
+        log.info("Crystal Match daemon listening on: " + socket_path)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            os.remove(socket_path)
+            self.close()
+
@@ -0,0 +1,80 @@
+from CrystalMatch.dls_focusstack.focus.focus_stack_lap_pyramid import FocusStack
+from CrystalMatch.dls_util.imaging import Image
+
+
+class MatchRequest:
+    """ The input of a crystal match (CrystalMatch.perform_match()): the two images, the points to find and the
+    details of the job. Built from the command line by ParserManager.get_match_request(), or directly when the
+    matching is run from Python (e.g. by a server or a batch runner), in which case the images can be ones already
+    in memory.
+
+    Each image is read (or the beamline stack focused) once, the first time it is used.
+    """
+    def __init__(self, formulatrix_image, beamline_image, points=None, job_id=None, focused_image_path=None,
+                 scale=None):
+        """
+        :param formulatrix_image: the Formulatrix image - an Image or the path of the image file
+        :param beamline_image: the beamline image - an Image, the path of the image file or a FocusStack which
+        focuses the beamline stack
+        :param points: the points (Point) on the Formulatrix image to find on the beamline image
+        :param job_id: reported in the results to identify the run
+        :param focused_image_path: file the beamline image is saved to, None to not save it. The results report
+        this file as the beamline image if the beamline image wasn't given as a file.
+        :param scale: the pixel sizes of the images for this match, as a tuple ([formulatrix image pixel size],
+        [beam line image pixel size]) - None to use those of the alignment configuration
+        """
+        self._formulatrix_image = formulatrix_image
+        self._beamline_image = beamline_image
+        self._points = points if points is not None else []
+        self._job_id = job_id
+        self._focused_image_path = focused_image_path
+        self._scale = scale
+        self._fft_images_to_stack = None
+
+    def points(self):
+        return self._points
+
+    def job_id(self):
+        return self._job_id
+
+    def scale(self):
+        return self._scale
+
+    def formulatrix_image(self):
+        if not isinstance(self._formulatrix_image, Image):
+            self._formulatrix_image = Image.from_file(self._formulatrix_image)
+        return self._formulatrix_image
+
+    def formulatrix_image_path(self):
+        if isinstance(self._formulatrix_image, Image):
+            return self._formulatrix_image.get_file()
+        return self._formulatrix_image
+
+    def beamline_image(self):
+        """ The (focused) beamline image - focusing the beamline stack if this is the first call. """
+        if isinstance(self._beamline_image, FocusStack):
+            stacker = self._beamline_image
+            self._beamline_image = stacker.composite()
+            self._fft_images_to_stack = stacker.get_fft_images_to_stack()
+        elif not isinstance(self._beamline_image, Image):
+            self._beamline_image = Image.from_file(self._beamline_image)
+        return self._beamline_image
+
+    def beamline_image_path(self):
+        """ The file of the beamline image: the file it was read from or, if it wasn't given as a file, the focused
+        image path. """
+        if isinstance(self._beamline_image, FocusStack):
+            return self._focused_image_path
+        if isinstance(self._beamline_image, Image):
+            return self._beamline_image.get_file() or self._focused_image_path
+        return self._beamline_image
+
+    def fft_images_to_stack(self):
+        """ The images of the beamline stack which were focused (used to find the z level of the matches), None
+        if the beamline image wasn't focused from a stack. """
+        return self._fft_images_to_stack
+
+    def save_focused_image(self):
+        """ Save the beamline image to the focused image path, if there is one. """
+        if self._focused_image_path is not None:
+            self.beamline_image().save(self._focused_image_path)
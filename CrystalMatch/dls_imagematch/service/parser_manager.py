@@ -14,6 +14,7 @@ import sys
 from CrystalMatch.dls_focusstack.focus.focus_stack_lap_pyramid import FocusStack
 from CrystalMatch.dls_imagematch import logconfig
 from CrystalMatch.dls_imagematch.service import readable_config_dir
+from CrystalMatch.dls_imagematch.service.match_request import MatchRequest
 from CrystalMatch.dls_imagematch.version import VersionHandler
 from CrystalMatch.dls_imagematch.service.readable_config_dir import ReadableConfigDir
 from CrystalMatch.dls_util.shape import Point
@@ -31,6 +32,8 @@ class ParserManager:
         self.parser = None
         self.images_to_stack = None
         self._script_path = None
+        self._argv = None
+        self._args = None
 
     def build_parser(self):
         """Return an argument parser for the Crystal Matching service.
@@ -80,6 +83,23 @@ class ParserManager:
         parser.add_argument('-j', '--job',
                             metavar="job_id",
                             help="Specify a job_id - this will be reported in the output to help identify this run.")
+        parser.add_argument('--stream',
+                            action='store_true',
+                            help="Start focusing while the images of the stack are still being written to "
+                                 "beamline_stack_path - each image is processed as soon as its file is complete. "
+                                 "Give --stack_size as well: without it the stack is only finished once the "
+                                 "directory has not changed for the stream timeout, which delays the result by that "
+                                 "time.")
+        parser.add_argument('--stack_size',
+                            metavar="n",
+                            type=int,
+                            help="Number of images in the stack. With --stream the stack is finished as soon as this "
+                                 "many images have been written, otherwise when the directory stops changing.")
+        parser.add_argument('--stream_timeout',
+                            metavar="seconds",
+                            type=float,
+                            help="With --stream, the stack is finished when the directory has not changed for this "
+                                 "time. Overrides the 'Stream Timeout (s)' setting of the focus stack config.")
         parser.add_argument('--to_json',
                             action='store_true',
                             help="Output a JSON object.")
@@ -91,8 +111,20 @@ class ParserManager:
                             help="Write log files to the directory specified by path.")
         self.parser = parser
 
+    def set_argv(self, argv):
+        """ Parse the given list of arguments instead of the ones on the command line (sys.argv). """
+        self._argv = argv
+        self._args = None
+
     def get_args(self):
-        return self.parser.parse_args()
+        if self._args is None:
+            self._args = self.parser.parse_args(self._argv)
+        return self._args
+
+    def close_files(self):
+        """ Close the files opened by the parser (the Formulatrix image). """
+        if self._args is not None:
+            self._args.Formulatrix_image.close()
 
     def get_config_dir(self):
         config_directory = self.get_args().config
@@ -147,12 +179,41 @@ class ParserManager:
                     log.warning("Selected point with invalid format will be ignored - '" + point_string + "'")
         return selected_points
 
-    def get_focused_image(self):
+    def get_match_request(self, focus_pool=None):
+        """ The MatchRequest for the command line arguments. The image files are checked here, but not read until
+        the match needs them.
+        :param focus_pool: WorkerPool used to focus the beamline stack, a pool is started for the stack if None """
+        formulatrix_image_path = self.get_formulatrix_image_path()
         focusing_path = abspath(self.get_args().beamline_stack_path)
         if "." not in focusing_path:
+            beamline_image = self._get_focus_stack(focusing_path, focus_pool)
+        else:
+            self._check_is_file(focusing_path)
+            beamline_image = focusing_path
+        return MatchRequest(formulatrix_image_path, beamline_image,
+                            points=self.parse_selected_points_from_args(),
+                            job_id=self.get_job_id(),
+                            focused_image_path=self.get_out_file_path(),
+                            scale=self.get_scale_override())
+
+    def _get_focus_stack(self, focusing_path, pool=None):
+        if self.get_args().stream:
+            if self.get_args().stack_size is None:
+                log = logging.getLogger(".".join([__name__]))
+                log.addFilter(logconfig.ThreadContextFilter())
+                log.warning("Streaming without --stack_size: the stack is finished by the stream timeout")
+            stacker = FocusStack([], self.get_args().config, pool)
+            stacker.stream_from(focusing_path, self.get_args().stack_size, self.get_args().stream_timeout)
+        else:
             files = self._sort_files_according_to_names(focusing_path)
+            stacker = FocusStack(files, self.get_args().config, pool)
+        return stacker
+
+    def get_focused_image(self):
+        focusing_path = abspath(self.get_args().beamline_stack_path)
+        if "." not in focusing_path:
+            stacker = self._get_focus_stack(focusing_path)
             # Run focusstack
-            stacker = FocusStack(files, self.get_args().config)
             focused_image = stacker.composite()
 
             self.images_to_stack = stacker.get_fft_images_to_stack()
@@ -1,6 +1,7 @@
 import logging
 import sys
 import time
+from multiprocessing.pool import ThreadPool
 
 from CrystalMatch.dls_imagematch import logconfig
 from CrystalMatch.dls_imagematch.crystal.align import AlignConfig
@@ -10,6 +11,7 @@ from CrystalMatch.dls_imagematch.crystal.match import CrystalMatchConfig
 from CrystalMatch.dls_imagematch.crystal.match.matcher import CrystalMatcher
 from CrystalMatch.dls_imagematch.crystal.match.match import CrystalMatchStatus
 from CrystalMatch.dls_imagematch.feature.detector import DetectorConfig
+from CrystalMatch.dls_imagematch.feature.detector.factory import DetectorFactory
 from CrystalMatch.dls_imagematch.service.service_result import ServiceResult
 from CrystalMatch.dls_util.imaging import Image
 
@@ -31,10 +33,10 @@ class CrystalMatch:
         self._config_align = AlignConfig(config_directory, scale_override=scale_override)
         self._config_crystal = CrystalMatchConfig(config_directory)
 
-    def perform_match(self, parser_manager):
+    def perform_match(self, request):
         """
         Perform image alignment and crystal matching returning a results object.
-        :param .
+        :param request: MatchRequest giving the images and the points to match.
         :return: ServiceResult object.
         """
         log = logging.getLogger(".".join([__name__, self.__class__.__name__]))
@@ -45,29 +47,34 @@ class CrystalMatch:
         log.info("Matching Started")
         log.debug(extra)
 
-        input_poi = parser_manager.parse_selected_points_from_args()
-        beamline_image = parser_manager.get_focused_image()
-        parser_manager.save_focused_image(beamline_image)
-        focused_image_path = parser_manager.get_focused_image_path()
-        formulatrix_image_path = parser_manager.get_formulatrix_image_path()
-        job_id = parser_manager.get_job_id()
+        input_poi = request.points()
+        pixel_sizes = None
+        if request.scale() is not None:
+            pixel_sizes = self._config_align.scale_pixel_sizes(request.scale())
+        if self._config_align.pipelined.value():
+            prepared_image1 = self._prepare_images_pipelined(request, pixel_sizes)
+        else:
+            request.save_focused_image()
+            prepared_image1 = None
 
         # Create the images
-        image1 = Image.from_file(formulatrix_image_path)
-        image2 = beamline_image
+        image1 = request.formulatrix_image()
+        image2 = request.beamline_image()
 
         # Create results object
-        service_result = ServiceResult(job_id, formulatrix_image_path, focused_image_path)
+        service_result = ServiceResult(request.job_id(), request.formulatrix_image_path(),
+                                       request.beamline_image_path())
 
         # Perform alignment
         try:
 
-            aligned_images, scaled_poi = self._perform_alignment(image1, image2, input_poi)
+            aligned_images, scaled_poi = self._perform_alignment(image1, image2, input_poi, prepared_image1,
+                                                                 pixel_sizes)
             service_result.set_image_alignment_results(aligned_images)
 
             # Perform Crystal Matching - only proceed if we have a valid alignment
             if aligned_images.alignment_status_code() == ALIGNED_IMAGE_STATUS_OK:
-                match_results = self._perform_matching(aligned_images, scaled_poi, parser_manager)
+                match_results = self._perform_matching(aligned_images, scaled_poi, request)
 
                 service_result.append_crystal_matching_results(match_results)
 
@@ -80,7 +87,35 @@ class CrystalMatch:
 
         return service_result
 
-    def _perform_alignment(self, formulatrix_image, beamline_image, formulatrix_points):
+    def _prepare_images_pipelined(self, request, pixel_sizes=None):
+        """
+        Focus the beamline stack (and save the focused image) while the formulatrix image is read and prepared for
+        alignment in another thread, as none of the formulatrix image work needs the beamline image.
+        :param pixel_sizes: the pixel sizes of the images for the request, None for those of the configuration
+        :return: The prepared formulatrix image (see ImageAligner.prepare_image_1).
+        """
+        start = time.time()
+        pool = ThreadPool(1)
+        try:
+            preparation = pool.apply_async(self._prepare_formulatrix_image, (request, pixel_sizes))
+            request.beamline_image()
+            request.save_focused_image()
+            beamline_time = time.time() - start
+            prepared_image1, formulatrix_time = preparation.get()
+        finally:
+            pool.close()
+            pool.join()
+        self._log_pipeline_times(beamline_time, formulatrix_time, time.time() - start)
+        return prepared_image1
+
+    def _prepare_formulatrix_image(self, request, pixel_sizes):
+        start = time.time()
+        prepared_image1 = ImageAligner.prepare_image_1(request.formulatrix_image(), self._config_align,
+                                                       self._config_detector, pixel_sizes)
+        return prepared_image1, time.time() - start
+
+    def _perform_alignment(self, formulatrix_image, beamline_image, formulatrix_points, prepared_image1=None,
+                           pixel_sizes=None):
         """
         Perform alignment on the two images, returning an AlignedImages object. As the formulatrix image will be
         scaled the formulatrix_points will alos be scaled to map to the new resolution.
@@ -88,36 +123,62 @@ class CrystalMatch:
         :param beamline_image: image onto which points are projected
         :param formulatrix_points: points on the formulatrix image - these will be rescaled along
         with the formulatrix_image
+        :param prepared_image1: the formulatrix image prepared in advance (see ImageAligner.prepare_image_1), if any
+        :param pixel_sizes: the pixel sizes of the images (see MatchRequest.scale), None for those of the configuration
         :return: An AlignedImages object and a scaled array of formulatrix points.
         """
-        aligner = ImageAligner(formulatrix_image, beamline_image, self._config_align, self._config_detector)
+        aligner = ImageAligner(formulatrix_image, beamline_image, self._config_align, self._config_detector,
+                               prepared_image1=prepared_image1, pixel_sizes=pixel_sizes)
         aligned_images = aligner.align()
         scaled_formulatrix_points = aligner.scale_points(formulatrix_points)
         self._log_alignment_status(aligned_images)
 
         return aligned_images, scaled_formulatrix_points
 
-    def _perform_matching(self, aligned_images, selected_points, parser_manager):
+    def _perform_matching(self, aligned_images, selected_points, request):
 
         time_start = time.time()
+        pool = DetectorFactory.INSTANCE_POOL
+        pool_start = (pool.hits(), pool.misses())
         matcher = CrystalMatcher(aligned_images, self._config_detector)
-        matcher.set_fft_images_to_stack(parser_manager.get_fft_images_to_stack())
+        matcher.set_fft_images_to_stack(request.fft_images_to_stack())
         matcher.set_from_crystal_config(self._config_crystal)
 
         crystal_match_results = matcher.match(selected_points)
-        self._log_matching_time(time.time() - time_start)
+        self._log_matching_time(time.time() - time_start, pool_start)
 
         return crystal_match_results
 
     @staticmethod
-    def _log_matching_time(time):
+    def _log_matching_time(time, pool_start):
+        """ Log the matching time and the detector instance pool hits and misses of this match. The pool is shared
+        by every match the process runs, so its counts when the matching started (pool_start) are subtracted. """
         log = logging.getLogger(".".join([__name__]))
         log.addFilter(logconfig.ThreadContextFilter())
-        extra = {'matching_time': time}
+        pool = DetectorFactory.INSTANCE_POOL
+        hits_start, misses_start = pool_start
+        extra = {'matching_time': time,
+                 'detector_pool_hits': pool.hits() - hits_start,
+                 'detector_pool_misses': pool.misses() - misses_start}
         log = logging.LoggerAdapter(log, extra)
         log.info("Matching Complete")
         log.debug(extra)
 
+    @staticmethod
+    def _log_pipeline_times(beamline_time, formulatrix_time, critical_path_time):
+        """ Log the times of the two branches run at the same time and of the critical path - the time taken by
+        both, which is the time of the longer branch plus any waiting for a core. """
+        log = logging.getLogger(".".join([__name__]))
+        log.addFilter(logconfig.ThreadContextFilter())
+        extra = {'pipeline_beamline_time': beamline_time,
+                 'pipeline_formulatrix_time': formulatrix_time,
+                 'pipeline_critical_path_time': critical_path_time,
+                 'pipeline_saved_time': beamline_time + formulatrix_time - critical_path_time}
+        log = logging.LoggerAdapter(log, extra)
+        log.info("Beamline image ({:.3f}s) and formulatrix image ({:.3f}s) prepared in {:.3f}s".format(
+            beamline_time, formulatrix_time, critical_path_time))
+        log.debug(extra)
+
     @staticmethod
     def _log_alignment_status(aligned):
         log = logging.getLogger(".".join([__name__]))
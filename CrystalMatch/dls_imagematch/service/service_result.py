@@ -76,8 +76,9 @@ class ServiceResult:
         """
         self._job_id = job_id
         self.SEPARATOR = " ; "
-        self._image_path_formulatrix = abspath(formulatrix_image_path)
-        self._image_path_beamline = abspath(focused_image_path)
+        # The images of a match run from Python may not have files
+        self._image_path_formulatrix = abspath(formulatrix_image_path) if formulatrix_image_path else ""
+        self._image_path_beamline = abspath(focused_image_path) if focused_image_path else ""
         self._alignment_transform_scale = 1.0
         self._alignment_transform_offset = Point(0, 0)
         self._alignment_status_code = ALIGNED_IMAGE_STATUS_NOT_SET
@@ -144,8 +145,21 @@ class ServiceResult:
             return self._print_json_object()
         return self._print_human_readable()
 
+    def results_text(self, jason_output):
+        """ The lines of text that print_results() prints to the console. """
+        if jason_output:
+            return [json.dumps(self.json_object(), cls=DecimalEncoder)]
+        return self._human_readable_lines()
+
     def _print_human_readable(self):
+        output = self._human_readable_lines()
+
+        # Print human readable
+        for line in output:
+            print(line)
+        return output
 
+    def _human_readable_lines(self):
         output = []
         if self._job_id and self._job_id != "":
             output = ['job_id:"' + str(self._job_id) + '"']
@@ -158,14 +172,15 @@ class ServiceResult:
                    ]
 
         self._append_crystal_match_results(output)
-
-        # Print human readable
-        for line in output:
-            print(line)
         return output
 
-
     def _print_json_object(self):
+        output_obj = self.json_object()
+        print(json.dumps(output_obj, cls=DecimalEncoder))
+        return output_obj
+
+    def json_object(self):
+        """ The results as the object printed (as JSON) by print_results(). """
         output_obj = {'exit_code': self._exit_code.to_json_array()}
 
         # Global alignment transform
@@ -201,7 +216,6 @@ class ServiceResult:
                 'mean_error': mean_error
             })
         output_obj['poi'] = poi_array
-        print(json.dumps(output_obj, cls=DecimalEncoder))
         return output_obj
 
 
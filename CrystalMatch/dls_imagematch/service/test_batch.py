@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import tempfile
+from os.path import join, dirname, abspath
+from unittest import TestCase
+
+import cv2
+from mock import patch
+
+from CrystalMatch.dls_imagematch.service import batch
+from CrystalMatch.dls_imagematch.service.batch import BatchJob, BatchManifest, BatchRunner
+from CrystalMatch.dls_imagematch.service.daemon import CrystalMatchDaemon
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+RESOURCES = join(dirname(abspath(__file__)), "..", "..", "..", "system-tests", "resources")
+
+
+class TestBatchManifest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return BatchManifest(path)
+
+    def test_json_manifest(self):
+        manifest = self._write("jobs.json", json.dumps([
+            {"formulatrix_image": "a.jpg", "beamline_stack": "stack", "points": [[1, 2], "3,4"], "scale": "1:2",
+             "job_id": "well"},
+            {"formulatrix_image": "b.jpg", "beamline_stack": "b2.jpg"}]))
+        jobs = manifest.read_jobs()
+
+        self.assertEqual([job.points for job in jobs], [["1,2", "3,4"], []])
+        self.assertEqual([job.scale for job in jobs], ["1:2", None])
+        self.assertEqual([job.job_id for job in jobs], ["well", "2"])
+        self.assertEqual(manifest.directory(), self.directory)
+
+    def test_csv_manifest(self):
+        manifest = self._write("jobs.csv", 'formulatrix_image,beamline_stack,points,scale,job_id\n'
+                                           'a.jpg,stack,"1,2 3,4",1:2,well\n'
+                                           'b.jpg,b2.jpg,,,\n')
+        jobs = manifest.read_jobs()
+
+        self.assertEqual([job.formulatrix_image for job in jobs], ["a.jpg", "b.jpg"])
+        self.assertEqual([job.points for job in jobs], [["1,2", "3,4"], []])
+        self.assertEqual([job.scale for job in jobs], ["1:2", None])
+        self.assertEqual([job.job_id for job in jobs], ["well", "2"])
+
+    def test_row_without_image_is_an_error(self):
+        manifest = self._write("jobs.json", json.dumps([{"formulatrix_image": "a.jpg"}]))
+        self.assertRaises(ValueError, manifest.read_jobs)
+
+    def test_job_arguments(self):
+        job = BatchJob(3, "a.jpg", "stack", points=["1,2"], scale="1:2", job_id="well")
+        args = job.to_args("/out", ["--config", "/config"])
+
+        self.assertEqual(args[:3], ["a.jpg", "stack", "1,2"])
+        self.assertEqual(args[args.index('--output') + 1], os.path.join("/out", "3"))
+        self.assertEqual(args[args.index('--job') + 1], "well")
+        self.assertEqual(args[args.index('--scale') + 1], "1:2")
+        self.assertIn('--to_json', args)
+        self.assertEqual(args[-2:], ["--config", "/config"])
+
+
+class TestBatchRunner(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @patch.object(batch, '_worker_daemon', create=True)
+    def test_job_which_does_not_run_gives_an_error_result(self, mock_daemon):
+        mock_daemon.run_request.return_value = {'id': "well", 'exit_status': 2, 'error': "usage: ...\nno such file\n"}
+        job = BatchJob(1, "a.jpg", "b.jpg", job_id="well")
+        result = batch._run_job((job.to_args("/out", []), "/images", job))
+
+        self.assertEqual(result['exit_code']['code'], -1)
+        self.assertEqual(result['exit_code']['err_msg'], "no such file")
+        self.assertEqual(result['job_id'], "well")
+        self.assertEqual(result['input_image'], os.path.join("/images", "a.jpg"))
+
+    def test_job_with_an_invalid_scale_gives_an_error_result(self):
+        for name in ["a.jpg", "b.jpg"]:
+            open(os.path.join(self.directory, name), "w").close()
+        job = BatchJob(2, "a.jpg", "b.jpg", scale="abc:1")
+        # the log directory is next to the script directory
+        daemon = CrystalMatchDaemon(os.path.join(self.directory, "scripts"))
+        with patch.object(batch, '_worker_daemon', daemon, create=True):
+            result = batch._run_job((job.to_args(os.path.join(self.directory, "out"), []), self.directory, job))
+
+        self.assertEqual(result['exit_code']['code'], -1)
+        self.assertIn("abc:1", result['exit_code']['err_msg'])
+        self.assertEqual(result['job_id'], "2")
+
+    def test_run_writes_a_result_line_for_each_job(self):
+        manifest_path = os.path.join(self.directory, "jobs.json")
+        with open(manifest_path, 'w') as f:
+            json.dump([{"formulatrix_image": "missing1.jpg", "beamline_stack": "b.jpg", "job_id": "one"},
+                       {"formulatrix_image": "missing2.jpg", "beamline_stack": "b.jpg", "job_id": "two"}], f)
+        output = StringIO()
+        # the log directory is next to the script directory
+        runner = BatchRunner(os.path.join(self.directory, "scripts"), processes=2)
+        failed = runner.run(BatchManifest(manifest_path), os.path.join(self.directory, "out"), [], output)
+
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(failed, 2)
+        self.assertEqual(sorted(result['job_id'] for result in results), ["one", "two"])
+
+    def test_stack_is_focused_in_a_worker_with_worker_processes_set(self):
+        stack_dir = os.path.join(self.directory, "stack")
+        os.mkdir(stack_dir)
+        # small crops of the images, to keep the test quick
+        level_image = cv2.imread(join(RESOURCES, "A01_2.jpg"))[1000:1400, 1000:1600]
+        for level in range(3):
+            cv2.imwrite(os.path.join(stack_dir, "FL{}.jpg".format(level)), level_image)
+        formulatrix_image = cv2.imread(join(RESOURCES, "A01_1.jpg"))[1000:1400, 1000:1600]
+        cv2.imwrite(os.path.join(self.directory, "A01_1.jpg"), formulatrix_image)
+        config_dir = os.path.join(self.directory, "config")
+        os.mkdir(config_dir)
+        with open(os.path.join(config_dir, "focus_stack.ini"), 'w') as f:
+            f.write("Worker Processes=2\n")
+        manifest_path = os.path.join(self.directory, "jobs.json")
+        with open(manifest_path, 'w') as f:
+            json.dump([{"formulatrix_image": "A01_1.jpg", "beamline_stack": "stack", "job_id": "stack"}], f)
+        output = StringIO()
+        runner = BatchRunner(os.path.join(self.directory, "scripts"), processes=1)
+        failed = runner.run(BatchManifest(manifest_path), os.path.join(self.directory, "out"),
+                            ['--config', config_dir], output)
+
+        result = json.loads(output.getvalue())
+        self.assertEqual(result['exit_code']['code'], 0, result['exit_code'])
+        self.assertEqual(failed, 0)
+        self.assertTrue(os.path.isfile(result['output_image']))
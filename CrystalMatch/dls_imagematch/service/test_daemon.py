@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from mock import patch, MagicMock
+
+from CrystalMatch.dls_imagematch.service.daemon import CrystalMatchDaemon
+from CrystalMatch.dls_imagematch.service.parser_manager import ParserManager
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+class TestCrystalMatchDaemon(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.image = os.path.join(self.directory, "image.jpg")
+        open(self.image, "w").close()
+        # the log directory is next to the script directory
+        self.daemon = CrystalMatchDaemon(os.path.join(self.directory, "scripts"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _request(self, args, request_id=1):
+        return json.dumps({'args': args, 'cwd': self.directory, 'id': request_id})
+
+    def test_invalid_json_gives_an_error_response(self):
+        response = self.daemon.handle_request("not json")
+        self.assertEqual(response['exit_status'], 2)
+        self.assertIn("Invalid request", response['error'])
+
+    def test_missing_args_gives_an_error_response(self):
+        response = self.daemon.handle_request(json.dumps({'id': 3}))
+        self.assertEqual(response['exit_status'], 2)
+
+    def test_invalid_args_return_the_usage_message(self):
+        response = self.daemon.handle_request(self._request(["--no_such_flag"], request_id=7))
+        self.assertEqual(response['id'], 7)
+        self.assertEqual(response['exit_status'], 2)
+        self.assertIn("usage:", response['error'])
+        self.assertNotIn('result', response)
+
+    def test_invalid_scale_gives_an_error_response(self):
+        for scale in ["1", "abc:1"]:
+            response = self.daemon.handle_request(self._request(["image.jpg", "image.jpg", "--scale", scale]))
+            self.assertEqual(response['exit_status'], 1)
+            self.assertIn('error', response)
+            self.assertNotIn('result', response)
+
+    def test_help_is_returned_as_output(self):
+        response = self.daemon.handle_request(self._request(["--help"]))
+        self.assertEqual(response['exit_status'], 0)
+        self.assertNotIn('error', response)
+        self.assertTrue(any("usage:" in line for line in response['output']))
+
+    def test_working_directory_is_restored(self):
+        working_dir = os.getcwd()
+        self.daemon.handle_request(self._request(["--help"]))
+        self.assertEqual(os.getcwd(), working_dir)
+
+    @patch('CrystalMatch.dls_imagematch.service.daemon.logconfig.remove_additional_handler')
+    @patch('CrystalMatch.dls_imagematch.service.daemon.logconfig.set_additional_handler')
+    @patch('CrystalMatch.dls_imagematch.service.daemon.CrystalMatch')
+    def test_service_is_created_once_per_configuration(self, mock_service_class, mock_set_handler,
+                                                       mock_remove_handler):
+        service_result = MagicMock()
+        service_result.json_object.return_value = {'exit_code': {'code': 0}}
+        service_result.results_text.return_value = ["line"]
+        mock_service_class.return_value.perform_match.return_value = service_result
+
+        for request_id in range(3):
+            response = self.daemon.handle_request(self._request(["image.jpg", "image.jpg"], request_id))
+            self.assertEqual(response['result'], {'exit_code': {'code': 0}})
+            self.assertEqual(response['output'], ["line"])
+
+        self.assertEqual(mock_service_class.call_count, 1)
+        self.assertEqual(mock_service_class.return_value.perform_match.call_count, 3)
+        self.assertEqual(mock_set_handler.call_count, 3)
+        self.assertEqual(mock_remove_handler.call_count, 3)
+
+    @patch('CrystalMatch.dls_imagematch.service.daemon.CrystalMatch')
+    def test_scale_is_given_with_the_request_to_the_same_service(self, mock_service_class):
+        requests = []
+        def perform_match(request):
+            requests.append(request)
+            return MagicMock(**{'json_object.return_value': {}, 'results_text.return_value': []})
+        mock_service_class.return_value.perform_match.side_effect = perform_match
+
+        for request_id, scale in enumerate([None, "1:2", "3:4"]):
+            args = ["image.jpg", "image.jpg"] + (["--scale", scale] if scale else [])
+            self.daemon.handle_request(self._request(args, request_id))
+
+        self.assertEqual(mock_service_class.call_count, 1)
+        self.assertEqual([request.scale() for request in requests], [None, (1.0, 2.0), (3.0, 4.0)])
+
+    @patch('CrystalMatch.dls_imagematch.service.daemon.CrystalMatch')
+    def test_focus_pool_is_kept_between_requests(self, mock_service_class):
+        requests = []
+        def perform_match(request):
+            requests.append(request)
+            return MagicMock(**{'json_object.return_value': {}, 'results_text.return_value': []})
+        mock_service_class.return_value.perform_match.side_effect = perform_match
+        os.mkdir(os.path.join(self.directory, "stack"))
+        daemon = CrystalMatchDaemon(os.path.join(self.directory, "scripts"), focus_workers=2)
+
+        for request_id in range(2):
+            daemon.handle_request(self._request(["image.jpg", "stack"], request_id))
+
+        pools = [request._beamline_image._pool for request in requests]
+        self.assertIsNotNone(pools[0])
+        self.assertIs(pools[0], pools[1])
+        self.assertEqual(pools[0].workers(), 2)
+        with patch.object(pools[0], 'close') as mock_close:
+            daemon.close()
+        mock_close.assert_called_once_with()
+
+    @patch('CrystalMatch.dls_imagematch.service.daemon.CrystalMatch')
+    def test_log_file_of_a_request_only_has_the_log_of_the_request(self, mock_service_class):
+        def perform_match(request):
+            logging.getLogger(__name__).warning("Matching " + request.job_id())
+            return MagicMock(**{'json_object.return_value': {}, 'results_text.return_value': []})
+        mock_service_class.return_value.perform_match.side_effect = perform_match
+        root_handlers = list(logging.getLogger().handlers)
+
+        log_dirs = [os.path.join(self.directory, "log1"), os.path.join(self.directory, "log2")]
+        for job, log_dir in zip(["job1", "job2"], log_dirs):
+            self.daemon.handle_request(self._request(["image.jpg", "image.jpg", "--job", job, "--log", log_dir]))
+
+        self.assertEqual(logging.getLogger().handlers, root_handlers)
+        for job, log_dir in zip(["job1", "job2"], log_dirs):
+            with open(os.path.join(log_dir, ParserManager.LOG_FILE_NAME)) as log_file:
+                log_text = log_file.read()
+            self.assertIn("Matching " + job, log_text)
+            self.assertEqual(log_text.count("Matching job"), 1)
+
+    def test_serve_stream_writes_one_response_per_request(self):
+        requests = StringIO(u"\n".join([self._request(["--help"], 1), u"", self._request(["--bad"], 2)]) + u"\n")
+        responses = StringIO()
+        self.daemon.serve_stream(requests, responses)
+
+        lines = responses.getvalue().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [1, 2])
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from mock import patch, create_autospec
+
+from CrystalMatch.dls_focusstack.focus.focus_stack_lap_pyramid import FocusStack
+from CrystalMatch.dls_imagematch.service.match_request import MatchRequest
+from CrystalMatch.dls_util.imaging import Image
+from CrystalMatch.dls_util.shape import Point
+
+
+class TestMatchRequest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.image_path = os.path.join(self.directory, "image.png")
+        Image(np.zeros((10, 12, 3), dtype=np.uint8)).save(self.image_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_image_files_are_read_once(self):
+        request = MatchRequest(self.image_path, self.image_path)
+        with patch.object(Image, "from_file", wraps=Image.from_file) as from_file:
+            for _ in range(2):
+                request.formulatrix_image()
+                request.beamline_image()
+        self.assertEqual(from_file.call_count, 2)
+        self.assertEqual(request.formulatrix_image_path(), self.image_path)
+        self.assertEqual(request.beamline_image_path(), self.image_path)
+
+    def test_images_in_memory(self):
+        image = Image(np.zeros((10, 12, 3), dtype=np.uint8))
+        focused_path = os.path.join(self.directory, "focused.tif")
+        request = MatchRequest(image, image, points=[Point(1, 2)], job_id="job", focused_image_path=focused_path)
+
+        self.assertIs(request.formulatrix_image(), image)
+        self.assertIs(request.beamline_image(), image)
+        self.assertIsNone(request.formulatrix_image_path())
+        self.assertEqual(request.beamline_image_path(), focused_path)
+        self.assertEqual(request.points(), [Point(1, 2)])
+        self.assertEqual(request.job_id(), "job")
+        self.assertIsNone(request.scale())
+        self.assertIsNone(request.fft_images_to_stack())
+
+    def test_focus_stack_is_focused_once(self):
+        stacker = create_autospec(FocusStack, instance=True)
+        focused = Image(np.zeros((10, 12, 3), dtype=np.uint8))
+        stacker.composite.return_value = focused
+        stacker.get_fft_images_to_stack.return_value = ["fft"]
+        focused_path = os.path.join(self.directory, "focused.tif")
+        request = MatchRequest(self.image_path, stacker, focused_image_path=focused_path)
+
+        self.assertEqual(request.beamline_image_path(), focused_path)
+        request.save_focused_image()
+        self.assertIs(request.beamline_image(), focused)
+        self.assertEqual(stacker.composite.call_count, 1)
+        self.assertEqual(request.fft_images_to_stack(), ["fft"])
+        self.assertTrue(os.path.isfile(focused_path))
+
+    def test_focused_image_is_not_saved_without_a_path(self):
+        request = MatchRequest(self.image_path, self.image_path)
+        request.save_focused_image()
+        self.assertEqual(os.listdir(self.directory), ["image.png"])
@@ -7,7 +7,7 @@ import numpy as np
 from os.path import join, isfile, split, abspath, exists, dirname
 import shutil
 
-from mock import Mock
+from mock import Mock, patch
 
 from CrystalMatch.dls_imagematch.service.parser_manager import ParserManager
 from CrystalMatch.dls_util.imaging import Image
@@ -108,12 +108,21 @@ class TestParserManager(unittest.TestCase):
 
     def test_get_focused_image_returns_an_instance_of_image_when_directory_path_is_passed(self):
         path = 'system-tests/resources/stacking/levels'
-        self.pm.get_args = Mock(return_value=Mock(beamline_stack_path=path, config="test_config"))
+        self.pm.get_args = Mock(return_value=Mock(beamline_stack_path=path, config="test_config", stream=False))
         im = self.pm.get_focused_image()
         self.assertIsInstance(im, Image)
         tulp = (0, 0)
         self.assertGreater(im.size(), tulp)
 
+    def test_get_focused_image_streams_the_stack_when_stream_is_set(self):
+        path = 'system-tests/resources/stacking/levels'
+        self.pm.get_args = Mock(return_value=Mock(beamline_stack_path=path, config="test_config", stream=True,
+                                                  stack_size=11, stream_timeout=2.5))
+        with patch('CrystalMatch.dls_imagematch.service.parser_manager.FocusStack') as stack_class:
+            self.pm.get_focused_image()
+        stack_class.return_value.stream_from.assert_called_once_with(abspath(path), 11, 2.5)
+        stack_class.return_value.composite.assert_called_once()
+
     def test_sort_files_according_to_names(self):
         path = 'system-tests/resources/stacking/levels'
         files = ParserManager._sort_files_according_to_names(path)
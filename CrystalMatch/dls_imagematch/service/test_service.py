@@ -0,0 +1,100 @@
+import logging
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import cv2
+import numpy as np
+from mock import patch
+
+from CrystalMatch.dls_imagematch.crystal.align.aligner import ImageAligner
+from CrystalMatch.dls_imagematch.feature.detector.opencv_detector_interface import OpencvDetectorInterface
+from CrystalMatch.dls_imagematch.service.match_request import MatchRequest
+from CrystalMatch.dls_imagematch.service.service import CrystalMatch
+from CrystalMatch.dls_util.imaging import Image
+
+
+class _RecordHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestPipelinedMatch(TestCase):
+    def setUp(self):
+        OpencvDetectorInterface.OPENCV_MAJOR = cv2.__version__[0]
+        self.directory = tempfile.mkdtemp()
+        # image 2 is a region of image 1 (starting at (120, 70)) at half the resolution
+        rng = np.random.RandomState(3)
+        texture = cv2.GaussianBlur(rng.randint(0, 255, (600, 800)).astype(np.uint8), (7, 7), 0)
+        self.formulatrix_path = os.path.join(self.directory, "formulatrix.png")
+        Image(cv2.cvtColor(texture, cv2.COLOR_GRAY2BGR)).save(self.formulatrix_path)
+        region = cv2.resize(texture[70:470, 120:520], (200, 200))
+        self.beamline_image = Image(cv2.cvtColor(region, cv2.COLOR_GRAY2BGR))
+        self.focused_path = os.path.join(self.directory, "focused.png")
+
+        self.service = CrystalMatch(os.path.join(self.directory, "config"))
+        self.service._config_align.pipelined.set_override(True)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _request(self, formulatrix_path=None):
+        return MatchRequest(formulatrix_path or self.formulatrix_path, self.beamline_image,
+                            focused_image_path=self.focused_path, scale=(1.0, 2.0))
+
+    def test_prepared_image_is_aligned_without_rescaling_again(self):
+        prepared = []
+        prepare_image_1 = ImageAligner.prepare_image_1
+
+        def prepare(*args, **kwargs):
+            prepared.append(prepare_image_1(*args, **kwargs))
+            return prepared[-1]
+
+        with patch.object(ImageAligner, "prepare_image_1", side_effect=prepare), \
+                patch.object(ImageAligner, "_rescale_image_1", wraps=ImageAligner._rescale_image_1) as rescale, \
+                patch.object(ImageAligner, "align", autospec=True, side_effect=ImageAligner.align) as align:
+            self.service.perform_match(self._request())
+
+        self.assertEqual(len(prepared), 1)
+        self.assertEqual(rescale.call_count, 1)
+        aligner = align.call_args[0][0]
+        self.assertIs(aligner._image1, prepared[0])
+        self.assertEqual(aligner._image1.size(), (400, 300))
+
+    def test_focused_image_is_saved(self):
+        self.service.perform_match(self._request())
+        self.assertTrue(os.path.isfile(self.focused_path))
+
+    def test_critical_path_times_are_logged(self):
+        log = logging.getLogger("CrystalMatch.dls_imagematch.service.service")
+        handler = _RecordHandler()
+        level = log.level
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        try:
+            self.service.perform_match(self._request())
+        finally:
+            log.removeHandler(handler)
+            log.setLevel(level)
+
+        records = [record for record in handler.records if hasattr(record, 'pipeline_critical_path_time')]
+        self.assertEqual(len(records), 1)
+        record = records[0]
+        self.assertGreaterEqual(record.pipeline_critical_path_time, record.pipeline_beamline_time)
+        self.assertGreaterEqual(record.pipeline_critical_path_time, record.pipeline_formulatrix_time)
+
+    def test_formulatrix_image_error_is_raised_as_when_not_pipelined(self):
+        missing_path = os.path.join(self.directory, "missing.png")
+        errors = []
+        for pipelined in [False, True]:
+            self.service._config_align.pipelined.set_override(pipelined)
+            with self.assertRaises(ValueError) as context:
+                self.service.perform_match(self._request(missing_path))
+            errors.append(str(context.exception))
+        self.assertEqual(errors[0], errors[1])
+        self.assertIn(missing_path, errors[1])
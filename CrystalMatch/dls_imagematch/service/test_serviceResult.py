@@ -272,3 +272,15 @@ class TestServiceResult(TestCase):
         # Test for exit status of -1 in JSON object
         self.assertEqual(-1, json_obj['exit_code']['code'])
         self.assertEqual('test exception', json_obj['exit_code']['err_msg'])
+
+    @patch('CrystalMatch.dls_imagematch.service.service_result.print', create=True)
+    def test_results_text_is_the_printed_output(self, mock_print):
+        mock_aligned_image = self.mock_aligned_images(9.8, ALIGNED_IMAGE_STATUS_OK, (1.0, Point(3.0, 4.0)))
+        result = ServiceResult("job-id", "fomulatrix", "beamline")
+        result.set_image_alignment_results(mock_aligned_image)
+
+        for jason_output in [False, True]:
+            mock_print.reset_mock()
+            result.print_results(jason_output)
+            printed = [method_call[0][0] for method_call in mock_print.call_args_list]
+            self.assertEqual(printed, result.results_text(jason_output))
@@ -49,6 +49,10 @@ class ConfigItem:
         """ Set an override which is returned in place of the value from the configuration. """
         self._override = self._clean(value)
 
+    def clean(self, value):
+        """ The value as this item would hold it if it was set (converted and, if need be, limited). """
+        return self._clean(value)
+
     def set_comment(self, comment):
         """ Set the comment string for this item. """
         self._comment = comment
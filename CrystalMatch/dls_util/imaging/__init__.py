@@ -1 +1,2 @@
 from CrystalMatch.dls_util.imaging.image import Image
+from CrystalMatch.dls_util.imaging.window import Window
@@ -15,6 +15,8 @@ class Image:
     def __init__(self, img):
         self._img = img
         self._file = None
+        self._cache = {}
+        self._cache_key = None
 
     def get_file(self):
         return self._file
@@ -31,6 +33,30 @@ class Image:
     def size(self):
         return self.width(), self.height()
 
+    def cached(self, name, factory):
+        """ Return a representation derived from this image (e.g. the mono version), created by calling
+        factory(image) the first time it is asked for. It is kept until the pixel buffer of the image changes -
+        when the image array is replaced or paste() is used - or until invalidate_cache() is called.
+        Derived images are shared by every user of the image, so they must not be modified. """
+        key = self._buffer_key()
+        if key != self._cache_key:
+            self._cache = {}
+            self._cache_key = key
+
+        if name not in self._cache:
+            self._cache[name] = factory(self)
+        return self._cache[name]
+
+    def invalidate_cache(self):
+        """ Drop the cached derived representations - call after changing the image array in place. """
+        self._cache = {}
+
+    def _buffer_key(self):
+        img = self._img
+        if isinstance(img, np.ndarray):
+            return id(img), img.__array_interface__['data'][0], img.shape, img.dtype.str
+        return id(img)
+
     def bounds(self):
         """ Return a rectangle that bounds the image (0,0,w,h). """
         return Rectangle(Point(), Point(self.width(), self.height()))
@@ -127,6 +153,8 @@ class Image:
             # No alpha blending
             target[y1:y2, x1:x2] = source[sy1:sy2, sx1:sx2]
 
+        self.invalidate_cache()
+
     def rotate(self, angle, center):
         """ Rotate the image around the specified center. Note that this will
         cut off any areas that are rotated out of the frame.
@@ -153,7 +181,11 @@ class Image:
             return None
 
     def to_mono(self):
-        """ Return a grayscale version of the image. """
+        """ Return a grayscale version of the image. The conversion is only done once, the result is cached
+        (see cached()) and must not be modified. """
+        return self.cached("mono", lambda image: image._mono())
+
+    def _mono(self):
         if self.channels() == 3:
             mono = cv2.cvtColor(self._img, cv2.COLOR_BGR2GRAY)
         elif self.channels() == 4:
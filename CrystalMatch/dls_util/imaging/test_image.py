@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+import numpy as np
+
+from CrystalMatch.dls_util.imaging import Image
+from CrystalMatch.dls_util.shape import Point
+
+
+class TestImageCache(TestCase):
+    def setUp(self):
+        random = np.random.RandomState(3)
+        self.color = random.randint(0, 255, (20, 30, 3)).astype(np.uint8)
+
+    def test_to_mono_is_only_converted_once(self):
+        image = Image(self.color)
+        mono = image.to_mono()
+        self.assertIs(image.to_mono(), mono)
+        self.assertEqual(mono.channels(), 1)
+
+    def test_cached_calls_the_factory_once_per_name(self):
+        image = Image(self.color)
+        calls = []
+
+        def factory(img):
+            calls.append(img)
+            return len(calls)
+
+        self.assertEqual(image.cached("a", factory), 1)
+        self.assertEqual(image.cached("a", factory), 1)
+        self.assertEqual(image.cached("b", factory), 2)
+        self.assertEqual(calls, [image, image])
+
+    def test_cache_is_dropped_when_the_array_is_replaced(self):
+        image = Image(self.color)
+        mono = image.to_mono()
+        image._img = self.color.copy()
+        self.assertIsNot(image.to_mono(), mono)
+
+    def test_cache_is_dropped_when_an_image_is_pasted(self):
+        image = Image(self.color.copy())
+        mono = image.to_mono()
+        image.paste(Image(np.zeros((5, 5, 3), dtype=np.uint8)), Point(0, 0))
+        self.assertIsNot(image.to_mono(), mono)
+        self.assertTrue(np.all(image.to_mono().raw()[:5, :5] == 0))
+
+    def test_invalidate_cache_drops_derived_images(self):
+        image = Image(self.color.copy())
+        mono = image.to_mono()
+        image.raw()[:] = 0
+        image.invalidate_cache()
+        self.assertIsNot(image.to_mono(), mono)
+        self.assertTrue(np.all(image.to_mono().raw() == 0))
+
+    def test_cache_is_not_shared_between_images(self):
+        self.assertIsNot(Image(self.color).to_mono(), Image(self.color).to_mono())
@@ -0,0 +1,79 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from CrystalMatch.dls_util.imaging import Image, Window
+from CrystalMatch.dls_util.shape import Point, Rectangle
+
+
+class TestWindow(TestCase):
+    def setUp(self):
+        self.array = np.arange(20 * 30, dtype=np.float64).reshape((20, 30))
+        self.RECT_TEST_CASES = [Rectangle(Point(5, 6), Point(15, 12)),
+                                Rectangle(Point(2.4, 3.6), Point(12.5, 13.5)),
+                                Rectangle(Point(-5.2, -3), Point(4, 8.7)),
+                                Rectangle(Point(25, 15), Point(40.6, 30)),
+                                Rectangle(Point(-10, -10), Point(50, 50)),
+                                Rectangle(Point(31, 5), Point(40, 10)),
+                                Rectangle(Point(5, -10), Point(10, -2)),
+                                Rectangle(Point(30, 20), Point(35, 25))]
+
+    def test_view_is_the_same_as_image_crop(self):
+        for rect in self.RECT_TEST_CASES:
+            expected = Image(self.array).crop(rect).raw()
+            window = Window.from_rect(self.array, rect)
+            self.assertTrue(np.array_equal(window.view(), expected), str(rect))
+            self.assertEqual(window.shape(), expected.shape)
+
+    def test_from_center_is_the_same_as_rectangle_from_center(self):
+        for center in [Point(10, 10), Point(0.5, 19.5), Point(-3, 4), Point(29.2, 0.7)]:
+            expected = Image(self.array).crop(Rectangle.from_center(center, 9, 7)).raw()
+            self.assertTrue(np.array_equal(Window.from_center(self.array, center, 9, 7).view(), expected))
+
+    def test_view_does_not_copy_the_array(self):
+        view = Window.from_rect(self.array, Rectangle(Point(5, 6), Point(15, 12))).view()
+        self.assertTrue(np.shares_memory(view, self.array))
+
+    def test_offset_is_the_first_pixel_of_the_window(self):
+        self.assertEqual(Window.from_rect(self.array, Rectangle(Point(2.4, 3.6), Point(12, 13))).offset(), Point(2, 4))
+        self.assertEqual(Window.from_rect(self.array, Rectangle(Point(-5, -3), Point(4, 8))).offset(), Point(0, 0))
+        window = Window.from_rect(self.array, Rectangle(Point(2.4, 3.6), Point(12, 13)))
+        self.assertEqual(self.array[window.offset().y, window.offset().x], window.view()[0, 0])
+
+    def test_window_outside_the_array_is_empty(self):
+        window = Window.from_rect(self.array, Rectangle(Point(31, 5), Point(40, 10)))
+        self.assertTrue(window.is_empty())
+        self.assertEqual(window.shape(), (0, 0))
+        self.assertEqual(window.bounds(), Rectangle(Point(0, 0), Point(0, 0)))
+
+    def test_padded_is_the_view_when_the_window_is_inside_the_array(self):
+        window = Window.from_rect(self.array, Rectangle(Point(5, 6), Point(15, 12)))
+        self.assertIs(window.padded().base, window.view().base)
+        self.assertTrue(np.shares_memory(window.padded(), self.array))
+
+    def test_padded_has_the_requested_size_and_fills_the_border(self):
+        window = Window.from_center(self.array, Point(1, 1), 6, 4)
+        padded = window.padded(value=-1)
+        self.assertEqual(padded.shape, (4, 6))
+        self.assertTrue(np.all(padded[:1, :] == -1))
+        self.assertTrue(np.all(padded[:, :2] == -1))
+        self.assertTrue(np.array_equal(padded[1:, 2:], self.array[:3, :4]))
+
+    def test_padded_can_mirror_the_border(self):
+        window = Window.from_rect(self.array, Rectangle(Point(-1, 0), Point(3, 2)))
+        padded = window.padded(cv2.BORDER_REFLECT_101)
+        self.assertTrue(np.array_equal(padded[:, 0], self.array[:2, 1]))
+
+    def test_padded_window_outside_the_array_is_all_fill_value(self):
+        padded = Window.from_rect(self.array, Rectangle(Point(31, 5), Point(40, 10))).padded(value=7)
+        self.assertEqual(padded.shape, (5, 9))
+        self.assertTrue(np.all(padded == 7))
+
+    def test_stack_crops_the_window_from_each_array(self):
+        arrays = [self.array, self.array * 2, self.array * 3]
+        window = Window.from_rect(self.array, Rectangle(Point(-2, 4), Point(7, 9)))
+        stacked = window.stack(arrays)
+        self.assertEqual(stacked.shape, (3, 5, 7))
+        for array, crop in zip(arrays, stacked):
+            self.assertTrue(np.array_equal(crop, Image(array).crop(Rectangle(Point(-2, 4), Point(7, 9))).raw()))
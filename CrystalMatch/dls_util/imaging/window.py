@@ -0,0 +1,90 @@
+from __future__ import division
+
+import cv2
+import numpy as np
+
+from CrystalMatch.dls_util.shape import Point, Rectangle
+
+
+class Window:
+    """ A rectangular region of an image array. Only the integer bounds of the region are kept, clamped
+    to the array, so a window is cheap to create and view() gives the pixels without copying them.
+    The bounds are the same as the ones Image.crop() uses: the region is clipped to the image and then
+    rounded to whole pixels.
+    """
+    def __init__(self, array, x1, y1, x2, y2):
+        """ Create a window from float bounds (x1, y1) - (x2, y2), which may run off the array. """
+        self._array = array
+        height, width = array.shape[:2]
+
+        # The requested region in whole pixels, used by padded()
+        self._requested = (_round(x1), _round(y1), _round(x2), _round(y2))
+
+        if x1 > width or 0 > x2 or y1 > height or 0 > y2:
+            # Same as Rectangle.intersection() of regions which do not overlap
+            self._x1, self._y1, self._x2, self._y2 = 0, 0, 0, 0
+        else:
+            self._x1 = _round(max(x1, 0))
+            self._y1 = _round(max(y1, 0))
+            self._x2 = _round(min(x2, width))
+            self._y2 = _round(min(y2, height))
+
+    @staticmethod
+    def from_center(array, center, width, height):
+        """ Create a window of the specified dimensions, centered around the specified point. """
+        half_width, half_height = width / 2.0, height / 2.0
+        return Window(array, center.x - half_width, center.y - half_height,
+                      center.x + half_width, center.y + half_height)
+
+    @staticmethod
+    def from_rect(array, rect):
+        """ Create a window covering the specified Rectangle. """
+        return Window(array, rect.x1, rect.y1, rect.x2, rect.y2)
+
+    def view(self):
+        """ The pixels of the window, as a view of the array (no copy is made). """
+        return self._array[self._y1:self._y2, self._x1:self._x2]
+
+    def padded(self, border_type=cv2.BORDER_CONSTANT, value=0):
+        """ The pixels of the whole requested region. Where the region runs off the array it is filled
+        using the OpenCV border_type. Only in that case is a copy made - otherwise this is view(). """
+        x1, y1, x2, y2 = self._requested
+        top = max(self._y1 - y1, 0)
+        bottom = max(y2 - self._y2, 0)
+        left = max(self._x1 - x1, 0)
+        right = max(x2 - self._x2, 0)
+        if top == bottom == left == right == 0:
+            return self.view()
+
+        if self.is_empty():
+            shape = (y2 - y1, x2 - x1) + self._array.shape[2:]
+            return np.full(shape, value, dtype=self._array.dtype)
+        return cv2.copyMakeBorder(self.view(), top, bottom, left, right, border_type, value=value)
+
+    def stack(self, arrays):
+        """ Copy the pixels of this window from each of the arrays (which must have the same size as the
+        window's array) into one array of shape (len(arrays), height, width) - for batch processing. """
+        stacked = np.zeros((len(arrays),) + self.shape() + self._array.shape[2:], dtype=self._array.dtype)
+        for i, array in enumerate(arrays):
+            stacked[i] = array[self._y1:self._y2, self._x1:self._x2]
+        return stacked
+
+    def offset(self):
+        """ Position of the top-left pixel of the window in the array. """
+        return Point(self._x1, self._y1)
+
+    def shape(self):
+        """ (height, width) of the window, in pixels. """
+        return self._y2 - self._y1, self._x2 - self._x1
+
+    def is_empty(self):
+        return self._x2 <= self._x1 or self._y2 <= self._y1
+
+    def bounds(self):
+        """ Rectangle covered by the window in the array. """
+        return Rectangle(Point(self._x1, self._y1), Point(self._x2, self._y2))
+
+
+def _round(value):
+    # Same rounding as Point.intify()
+    return int(round(value, 0))
@@ -0,0 +1,65 @@
+# Compares phase correlation with ORB feature matching for the whole image alignment of the system test images:
+# the time taken to align, the offset found, the phase correlation response and the overlap metric of the
+# alignment (lower is better). Run from the repository root:
+#     PYTHONPATH=. python scripts/benchmark_alignment_method.py
+from __future__ import print_function
+
+import shutil
+import tempfile
+import time
+from os.path import join
+
+from CrystalMatch.dls_imagematch.crystal.align.aligner import ImageAligner
+from CrystalMatch.dls_imagematch.crystal.align.config import AlignConfig
+from CrystalMatch.dls_imagematch.crystal.align.phase_correlation import PhaseCorrelation
+from CrystalMatch.dls_imagematch.feature.detector import DetectorType
+from CrystalMatch.dls_imagematch.feature.detector.config import DetectorConfig
+from CrystalMatch.dls_util.imaging import Image
+
+# CONFIGURATION
+######################################################################
+RESOURCES = join("system-tests", "resources")
+IMAGE_PAIRS = [("A01_1.jpg", "A01_2.jpg"), ("A10_1.jpg", "A10_2.jpg"), ("A02.jpg", "A02_crop.jpg"),
+               ("A03.jpg", "A03_crop.jpg")]
+REPEATS = 3
+######################################################################
+
+
+def best_time(function, repeats):
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.time()
+        result = function()
+        times.append(time.time() - start)
+    return min(times), result
+
+
+def run():
+    config_dir = tempfile.mkdtemp()
+    try:
+        align_config = AlignConfig(config_dir)
+        align_config.align_detector.set_override(DetectorType.ORB)
+        detector_config = DetectorConfig(config_dir)
+
+        print("images                    method                  align (s)  response  offset              metric")
+        for name1, name2 in IMAGE_PAIRS:
+            image1 = Image.from_file(join(RESOURCES, name1))
+            image2 = Image.from_file(join(RESOURCES, name2))
+            response = PhaseCorrelation(image1.to_mono(), image2.to_mono()).calculate()[1]
+            for method in ImageAligner.METHODS:
+                align_config.align_method.set_override(method)
+
+                def align():
+                    return ImageAligner(image1, image2, align_config, detector_config).align()
+
+                align_time, aligned = best_time(align, REPEATS)
+                print("{:<25} {:<22} {:>9.3f} {:>9.3f}  {:<18}  {:.2f}".format(
+                    name1 + " " + name2, aligned.method, align_time, response, str(aligned.pixel_offset()),
+                    aligned.overlap_metric()))
+    finally:
+        shutil.rmtree(config_dir)
+
+
+if __name__ == '__main__':
+    run()
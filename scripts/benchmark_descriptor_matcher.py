@@ -0,0 +1,66 @@
+# Compares the descriptor matching strategies (brute force, FLANN LSH and kNN ratio test) on the whole image
+# alignment of the system test images: the time taken to detect and match the features, the number of matches and
+# the overlap metric of the resulting alignment (lower is better). Run from the repository root:
+#     PYTHONPATH=. python scripts/benchmark_descriptor_matcher.py
+from __future__ import print_function
+
+import shutil
+import tempfile
+import time
+from os.path import join
+
+from CrystalMatch.dls_imagematch.crystal.align.aligner import ImageAligner
+from CrystalMatch.dls_imagematch.crystal.align.config import AlignConfig
+from CrystalMatch.dls_imagematch.feature.detector.config import DetectorConfig
+from CrystalMatch.dls_imagematch.feature.match import DescriptorMatcherType
+from CrystalMatch.dls_util.imaging import Image
+
+# CONFIGURATION
+######################################################################
+RESOURCES = join("system-tests", "resources")
+IMAGE_PAIRS = [("A01_1.jpg", "A01_2.jpg"), ("A10_1.jpg", "A10_2.jpg"), ("A02.jpg", "A02_crop.jpg"),
+               ("A03.jpg", "A03_crop.jpg")]
+ORB_FEATURES = [500, 2000]
+REPEATS = 3
+######################################################################
+
+
+def best_time(function, repeats):
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.time()
+        result = function()
+        times.append(time.time() - start)
+    return min(times), result
+
+
+def run():
+    config_dir = tempfile.mkdtemp()
+    try:
+        align_config = AlignConfig(config_dir)
+        detector_config = DetectorConfig(config_dir)
+
+        print("images                    features  matcher          align (s)  match (s)  matches  offset        metric")
+        for name1, name2 in IMAGE_PAIRS:
+            image1 = Image.from_file(join(RESOURCES, name1))
+            image2 = Image.from_file(join(RESOURCES, name2))
+            for n_features in ORB_FEATURES:
+                detector_config.orb.n_features.set_override(n_features)
+                for matcher_type in DescriptorMatcherType.LIST_ALL:
+                    align_config.descriptor_matcher.set_override(matcher_type)
+
+                    def align():
+                        return ImageAligner(image1, image2, align_config, detector_config).align()
+
+                    align_time, aligned = best_time(align, REPEATS)
+                    result = aligned.feature_match_result
+                    print("{:<25} {:>8}  {:<15} {:>10.3f} {:>10.3f} {:>8}  {:<12}  {:.2f}".format(
+                        name1 + " " + name2, n_features, matcher_type, align_time, result.time_match(),
+                        result.num_matches(), str(aligned.pixel_offset()), aligned.overlap_metric()))
+    finally:
+        shutil.rmtree(config_dir)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,82 @@
+# Compares the two ways PyramidCollection.fuse() can pass the laplacians of each pyramid level to the worker
+# processes: pickling a copy of every level into the pool, or writing them once to a shared LaplacianBuffer and
+# sending only a descriptor. Run from the repository root:
+#     PYTHONPATH=. python scripts/benchmark_pyramid_fusion.py
+from __future__ import print_function
+
+import pickle
+import time
+
+import numpy as np
+
+from CrystalMatch.dls_focusstack.focus.pyramid import Pyramid
+from CrystalMatch.dls_focusstack.focus.pyramid_collection import PyramidCollection
+from CrystalMatch.dls_focusstack.focus.pyramid_level import PyramidLevel
+
+# CONFIGURATION
+######################################################################
+IMAGE_SIZES = [(480, 640), (960, 1280)]
+LAYERS = 12
+PYRAMID_MIN_SIZE = 32
+KERNEL_SIZE = 5
+REPEATS = 3
+######################################################################
+
+
+def make_collection(shape, random):
+    sizes = [shape]
+    while min(sizes[-1]) // 2 >= PYRAMID_MIN_SIZE:
+        sizes.append((sizes[-1][0] // 2, sizes[-1][1] // 2))
+
+    collection = PyramidCollection()
+    for layer in range(LAYERS):
+        pyramid = Pyramid(layer, len(sizes))
+        for level, size in enumerate(sizes):
+            pyramid.add_lower_resolution_level(PyramidLevel(random.uniform(-50, 50, size), layer, level))
+        collection.add_pyramid(pyramid)
+    return collection
+
+
+def transferred_bytes(collection, fusion_mode):
+    """Bytes pickled to and from the worker processes for the fusion of the levels (the base level is fused the
+    same way in both modes)."""
+    depth = collection.get_pyramid(0).get_depth()
+    levels = list(range(depth - 2, -1, -1))
+    region_kernel = collection.get_region_kernel()
+    total = 0
+    for level in levels:
+        shape = collection.get_pyramid(0).get_level(level).get_array().shape
+        if fusion_mode == PyramidCollection.FUSION_PICKLE:
+            laplacians = np.zeros((LAYERS,) + shape, dtype=np.float64)
+            result = PyramidLevel(np.zeros(shape, dtype=np.float64), 0, level)
+            total += len(pickle.dumps((laplacians, region_kernel, level), pickle.HIGHEST_PROTOCOL))
+            total += len(pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+        else:
+            descriptor = ("/dev/shm/laplacians_xxxxxxxx.dat", 0, 0, LAYERS) + shape
+            total += len(pickle.dumps((descriptor, region_kernel, level), pickle.HIGHEST_PROTOCOL))
+            total += len(pickle.dumps(level, pickle.HIGHEST_PROTOCOL))
+    return total
+
+
+def best_time(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.time()
+        function()
+        times.append(time.time() - start)
+    return min(times)
+
+
+def run():
+    random = np.random.RandomState(0)
+    print("size        mode            transferred (MB)  wall time (s)")
+    for shape in IMAGE_SIZES:
+        collection = make_collection(shape, random)
+        for mode in PyramidCollection.FUSION_MODES:
+            wall_time = best_time(lambda: collection.fuse(KERNEL_SIZE, mode), REPEATS)
+            print("{:<11} {:<15} {:<17.3f} {:.3f}".format(
+                "x".join(str(s) for s in shape), mode, transferred_bytes(collection, mode) / 1e6, wall_time))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,69 @@
+# Compares the per-pixel loop implementation of the base level fusion operators (entropy and deviation) with the
+# sliding window implementation now used by PyramidLevel. Run from the repository root:
+#     PYTHONPATH=. python scripts/benchmark_pyramid_level.py
+# The loop implementation is slow - large images with large kernels take a few minutes.
+from __future__ import print_function
+
+import time
+
+import numpy as np
+
+from CrystalMatch.dls_focusstack.focus.pyramid_level import PyramidLevel
+
+# CONFIGURATION
+######################################################################
+IMAGE_SIZES = [(32, 43), (64, 85), (128, 171), (256, 341)]
+KERNEL_SIZES = [3, 5, 9, 15]
+REPEATS = 3
+######################################################################
+
+
+def loop_entropy(layer, kernel_size):
+    probabilities = layer.get_probabilities()
+    pad_amount, padded_image, offset = layer.padding(kernel_size)
+    entropies = np.zeros(layer.get_array().shape[:2], dtype=np.float64)
+    for row in range(entropies.shape[0]):
+        for column in range(entropies.shape[1]):
+            area = padded_image[row + pad_amount + offset[:, np.newaxis], column + pad_amount + offset]
+            entropies[row, column] = PyramidLevel._area_entropy(area, probabilities)
+    return entropies
+
+
+def loop_deviation(layer, kernel_size):
+    pad_amount, padded_image, offset = layer.padding(kernel_size)
+    deviations = np.zeros(layer.get_array().shape[:2], dtype=np.float64)
+    for row in range(deviations.shape[0]):
+        for column in range(deviations.shape[1]):
+            area = padded_image[row + pad_amount + offset[:, np.newaxis], column + pad_amount + offset]
+            deviations[row, column] = PyramidLevel._area_deviation(area)
+    return deviations
+
+
+def best_time(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.time()
+        function()
+        times.append(time.time() - start)
+    return min(times)
+
+
+def run():
+    random = np.random.RandomState(0)
+    print("size       kernel  loop (s)   window (s)  speedup  max abs diff")
+    for shape in IMAGE_SIZES:
+        array = random.uniform(0, 255, shape).astype(np.float64)
+        layer = PyramidLevel(array, 0, 0)
+        for kernel_size in KERNEL_SIZES:
+            loop_time = best_time(lambda: (loop_entropy(layer, kernel_size), loop_deviation(layer, kernel_size)), 1)
+            window_time = best_time(lambda: (layer.entropy(kernel_size), layer.deviation(kernel_size)), REPEATS)
+
+            difference = max(np.max(np.abs(layer.get_entropies() - loop_entropy(layer, kernel_size))),
+                             np.max(np.abs(layer.get_deviations() - loop_deviation(layer, kernel_size))))
+            print("{:<10} {:<7} {:<10.4f} {:<11.5f} {:<8.0f} {:.2e}".format(
+                "x".join(str(s) for s in shape), kernel_size, loop_time, window_time,
+                loop_time / max(window_time, 1e-9), difference))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,58 @@
+# Compares finding the z level of each point of interest one at a time (PointFFTManager.find_z_level_for_point)
+# with finding the z levels of all the points together (PointFFTManager.find_z_levels_for_points). Run from the
+# repository root:
+#     PYTHONPATH=. python scripts/benchmark_z_level.py
+from __future__ import print_function
+
+import time
+
+import numpy as np
+
+from CrystalMatch.dls_focusstack.focus.imagefft import ImageFFT
+from CrystalMatch.dls_focusstack.focus.point_fft_manager import PointFFTManager
+from CrystalMatch.dls_util.shape import Point
+
+# CONFIGURATION
+######################################################################
+IMAGE_SIZE = (1024, 1280)
+SLICES = [10, 40]
+POINTS = [1, 10, 30]
+REGION_SIZE = 80
+REPEATS = 3
+######################################################################
+
+
+def best_time(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.time()
+        function()
+        times.append(time.time() - start)
+    return min(times)
+
+
+def run():
+    random = np.random.RandomState(0)
+    print("slices  points  per point (s)  batched (s)  speedup  same levels")
+    for slices in SLICES:
+        fft_images = [ImageFFT(random.uniform(0, 255, IMAGE_SIZE).astype(np.float32), number, str(number))
+                      for number in range(slices)]
+        for count in POINTS:
+            points = [Point(random.uniform(0, IMAGE_SIZE[1]), random.uniform(0, IMAGE_SIZE[0]))
+                      for _ in range(count)]
+
+            def per_point():
+                return [PointFFTManager(fft_images, point, REGION_SIZE).find_z_level_for_point() for point in points]
+
+            def batched():
+                return PointFFTManager.find_z_levels_for_points(fft_images, points, REGION_SIZE)
+
+            per_point_time = best_time(per_point, REPEATS)
+            batched_time = best_time(batched, REPEATS)
+            print("{:<7} {:<7} {:<14.4f} {:<12.4f} {:<8.1f} {}".format(
+                slices, count, per_point_time, batched_time, per_point_time / max(batched_time, 1e-9),
+                per_point() == batched()))
+
+
+if __name__ == '__main__':
+    run()
@@ -36,7 +36,10 @@ setuptools.setup(
         'Programming Language :: Python :: 2.7',
     ],
 
-    entry_points={'console_scripts': ['CrystalMatch = CrystalMatch.dls_imagematch.main_service:main']},  # this makes a script
+    entry_points={'console_scripts': ['CrystalMatch = CrystalMatch.dls_imagematch.main_service:main',
+                                      'CrystalMatchDaemon = CrystalMatch.dls_imagematch.main_daemon:main',
+                                      'CrystalMatchClient = CrystalMatch.dls_imagematch.main_client:main',
+                                      'CrystalMatchBatch = CrystalMatch.dls_imagematch.main_batch:main']},  # this makes a script
 
     install_requires=['numpy>=1.11.1', 'scipy>=0.19.1', 'pygelf>=0.3.1'],
 